@@ -1,85 +1,91 @@
+import argparse
+import json
 import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from datetime import datetime
-
-from nev_weekly.config_loader import load_yaml_list, load_yaml_map
-from nev_weekly.tavily_client import TavilyWrapper
-from nev_weekly.aggregators import (
-    get_sales_rankings,
-    get_new_car_launches,
-    get_upcoming_releases,
-    get_vip_voices,
-    get_smart_dimming_news,
-)
-from nev_weekly.llm_helper import format_weekly_report, format_competitor_report
-from nev_weekly.renderer import render_html
-from nev_weekly.competitor_analysis import analyze_competitors
-from nev_weekly.link_checker import check_links
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from nev_weekly.metrics import METRICS
+from nev_weekly.pipeline import Stage, run_pipeline
 
 
 # Entry point orchestrates the weekly newsletter generation.
 # It reads YAML configs, runs Tavily-powered searches for each task,
 # summarizes with an LLM (or fallback), and writes public/index.html.
+# Tasks run as a dependency graph: independent searches run concurrently and
+# each downstream stage starts as soon as its inputs are ready.
+#
+#   python main.py                          fetch everything, render, report, check links
+#   python main.py fetch --sections vip,dimming
+#   python main.py render | report | links  reuse the last fetched sections (data/sections.json)
+#   python main.py backfill --from 2025-01-06 --to 2025-12-29
+#                                           past issues into public/archive/<week>/
+#
+# Heavy SDKs (tavily, openai, httpx) are imported inside the stages
+# that use them, so render-only and single-section runs start quickly.
 
+DATA_SECTIONS = ["sales", "launches", "upcoming", "vip_voices", "dimming_news", "competitors"]
+NEWSLETTER = DATA_SECTIONS[:5]
+SECTION_ALIASES = {"vip": "vip_voices", "vips": "vip_voices", "dimming": "dimming_news", "competitor": "competitors"}
+EMPTY_SECTIONS: Dict[str, Any] = {
+    "sales": {"over_250k": [], "over_350k": []},
+    "launches": [],
+    "upcoming": [],
+    "vip_voices": [],
+    "dimming_news": [],
+    "competitors": {},
+}
+DEFAULT_SECTIONS_PATH = Path("data") / "sections.json"
+COMMANDS = {
+    "fetch": "run the searches for --sections (default: all) and save data/sections.json",
+    "render": "summarize and render the site from the saved sections",
+    "report": "write the competitor report from the saved sections",
+    "links": "check the saved competitor links",
+}
 
-def ensure_public_dir() -> Path:
-    out_dir = Path("public")
-    out_dir.mkdir(parents=True, exist_ok=True)
-    return out_dir
-
-
-def main() -> None:
-    root = Path(__file__).parent
-    config_dir = root / "config"
-
-    competitors = load_yaml_list(config_dir / "competitors.yaml")
-    vips = load_yaml_list(config_dir / "vips.yaml")
-    keywords = load_yaml_list(config_dir / "keywords.yaml")
-    comp_urls = load_yaml_map(config_dir / "competitor_urls.yaml")
 
-    tavily = TavilyWrapper(api_key=os.getenv("TAVILY_API_KEY"))
+def sections_path() -> Path:
+    return Path(os.getenv("NEV_SECTIONS_PATH") or DEFAULT_SECTIONS_PATH)
 
-    # Task A: Weekly NEV sales rankings for China.
-    # Queries target CPCA (乘联会) and Dongchedi (懂车帝) summaries.
-    sales = get_sales_rankings(tavily=tavily, top_n=10)
 
-    # Task B: New car launches (past week) and upcoming releases (next month).
-    launches = get_new_car_launches(tavily=tavily, max_items=3)
-    upcoming = get_upcoming_releases(tavily=tavily, max_items=5)
+def load_sections() -> Dict[str, Any]:
+    try:
+        return json.loads(sections_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
 
-    # Task C: VIP voices (last 7 days) based on vips.yaml.
-    vip_items = get_vip_voices(tavily=tavily, vip_names=vips)
 
-    # Task D: Smart dimming industry intelligence combining competitors + keywords.
-    dimming_news = get_smart_dimming_news(
-        tavily=tavily, competitors=competitors, keywords=keywords, target_count=50, top_n=10
-    )
+def save_sections(sections: Dict[str, Any]) -> None:
+    path = sections_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(sections, ensure_ascii=False, indent=1), encoding="utf-8")
 
-    competitor_summary = analyze_competitors(tavily=tavily, url_map=comp_urls, min_search=100)
 
-    sections = {
-        "meta": {"generated_at": datetime.utcnow().isoformat().replace("T", " ") + "Z"},
-        "sales": sales,
-        "launches": launches,
-        "upcoming": upcoming,
-        "vip_voices": vip_items,
-        "dimming_news": dimming_news,
-        "competitors": competitor_summary,
-    }
+def parse_sections(value: str) -> List[str]:
+    names = []
+    for raw in value.split(","):
+        name = SECTION_ALIASES.get(raw.strip().lower(), raw.strip().lower())
+        if name not in DATA_SECTIONS:
+            choices = ", ".join(DATA_SECTIONS + sorted(SECTION_ALIASES))
+            raise argparse.ArgumentTypeError(f"unknown section {raw!r} (choose from {choices})")
+        names.append(name)
+    return names
 
-    # Use LLM helper to turn raw data into a professional weekly report narrative.
-    narrative = format_weekly_report(sections)
 
-    html = render_html(narrative=narrative, sections=sections)
+def ensure_public_dir() -> Path:
+    out_dir = Path("public")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir
 
-    out_dir = ensure_public_dir()
-    (out_dir / "index.html").write_text(html, encoding="utf-8")
 
+def ensure_stylesheet(out_dir: Path) -> None:
     # Ensure a basic stylesheet exists for clean presentation.
     style_path = out_dir / "style.css"
     if not style_path.exists():
         style_path.write_text(
-            
             ".container{max-width:960px;margin:2rem auto;padding:0 1rem}"
             "body{font-family:-apple-system,BlinkMacSystemFont,Segoe UI,Roboto,Helvetica,Arial,sans-serif;"
             "color:#1f2937;background:#f9fafb}"
@@ -92,18 +98,427 @@ def main() -> None:
             encoding="utf-8",
         )
 
-    print("Generated public/index.html")
 
-    comp_md = format_competitor_report(competitor_summary) or ""
-    (out_dir / "competitor_report.md").write_text(comp_md, encoding="utf-8")
+ARCHIVE_DIR = "archive"
+
+
+def publish_archive_page(publisher: Any, week: str, page: str, generated_at: str) -> bool:
+    # Archive pages sit two levels down, so fingerprinted assets are referenced via ../../
+    name = f"{ARCHIVE_DIR}/{week}/index.html"
+    return publisher.write(name, publisher.rewrite_assets(page, prefix="../../"), volatile=[generated_at])
+
+
+def publish_archive_index(publisher: Any) -> bool:
+    from nev_weekly.history import HistoryStore
+    from nev_weekly.renderer import render_archive_index
+
+    root = publisher.out_dir / ARCHIVE_DIR
+    weeks = sorted(p.parent.name for p in root.glob("*/index.html")) if root.is_dir() else []
+    store = HistoryStore()
+    try:
+        issues = [{"week": w, "generated_at": ((store.load(w) or {}).get("meta") or {}).get("generated_at", "")} for w in weeks]
+    finally:
+        store.close()
+    page = publisher.rewrite_assets(render_archive_index(issues), prefix="../")
+    # A re-run of the current week only moves its timestamp, which is not a change.
+    return publisher.write(f"{ARCHIVE_DIR}/index.html", page, volatile=[it["generated_at"] for it in issues])
+
+
+def run(commands: List[str], fetch: Optional[List[str]] = None) -> None:
+    """Run the stages for `commands`; with "fetch", only the sections in `fetch` are searched again."""
+    fetch = [] if "fetch" not in commands else (fetch or DATA_SECTIONS)
+    previous = load_sections()
+    missing = [name for name in DATA_SECTIONS if name not in fetch and name not in previous]
+    if missing:
+        print(f"No saved data for {', '.join(missing)} in {sections_path()}; run `python main.py fetch` to collect it")
+
+    from nev_weekly.history import week_key
+
+    now = datetime.utcnow()
+    # Without new searches the issue keeps the timestamp (and week) of the data it shows.
+    meta = dict(previous.get("meta") or {}) if not fetch else {}
+    meta.setdefault("generated_at", now.isoformat().replace("T", " ") + "Z")
+    meta.setdefault("week", week_key(now))
+    out_dir = ensure_public_dir()
+    closing: List[Any] = []
+    # Shared helpers are built on first use; stages run on worker threads, hence the lock.
+    shared: Dict[str, Any] = {}
+    lock = threading.RLock()
+
+    def publisher() -> Any:
+        # Outputs go through the publisher: atomic writes, unchanged files left alone, precompressed siblings.
+        with lock:
+            if "publisher" not in shared:
+                from nev_weekly.publish import Publisher
+
+                shared["publisher"] = Publisher(out_dir)
+                closing.append(lambda: shared["publisher"].finish())
+            return shared["publisher"]
+
+    def tavily() -> Any:
+        with lock:
+            if "tavily" not in shared:
+                from nev_weekly.budget import BudgetManager
+                from nev_weekly.cache import DiskCache, refresh_requested
+                from nev_weekly.tavily_client import TavilyWrapper
+
+                # Search results are cached on disk for repeat runs; NEV_REFRESH=1 forces fresh queries.
+                cache = DiskCache(namespace="tavily", refresh=refresh_requested())
+                # One query budget and rate limit for the whole run (NEV_QUERY_BUDGET, NEV_CREDIT_BUDGET, NEV_QUERY_RATE).
+                budget = BudgetManager.from_env()
+                shared["tavily"] = TavilyWrapper(api_key=os.getenv("TAVILY_API_KEY"), cache=cache, budget=budget)
+            return shared["tavily"]
+
+    def seen() -> Any:
+        # Items published in earlier issues (within NEV_SEEN_RETENTION_DAYS) are not surfaced again.
+        with lock:
+            if "seen" not in shared:
+                from nev_weekly.seen import SeenStore
+
+                shared["seen"] = SeenStore()
+                closing.append(shared["seen"].close)
+            return shared["seen"]
+
+    def build_sections(**parts) -> dict:
+        return {"meta": meta, **parts}
+
+    stages: List[Stage] = []
+    if fetch:
+        stages += fetch_stages(fetch, previous, tavily(), seen)
+    # Sections that are not fetched again come from the previous run.
+    for name in DATA_SECTIONS:
+        if name not in fetch:
+            stages.append(Stage(name, lambda name=name: previous.get(name, EMPTY_SECTIONS[name])))
+    if fetch:
+        stages.append(Stage("save_sections", lambda **parts: save_sections(build_sections(**parts)),
+                            deps=DATA_SECTIONS, timeout=30))
+
+    if "render" in commands:
+
+        def narrative_stage(**parts) -> str:
+            from nev_weekly.llm_helper import format_weekly_report
+
+            # Use LLM helper to turn raw data into a professional weekly report narrative.
+            return format_weekly_report(build_sections(**parts))
+
+        def fallback_narrative(**parts) -> str:
+            from nev_weekly.llm_helper import _fallback_report
+
+            return _fallback_report(build_sections(**parts))
+
+        def history_stage(**parts) -> dict:
+            from nev_weekly.history import HistoryStore
+
+            # This week's sections are snapshotted to data/history.jsonl; trends are local lookups against it.
+            store = HistoryStore()
+            try:
+                store.save(meta["week"], build_sections(**parts))
+                return store.trends(meta["week"])
+            finally:
+                store.close()
+
+        def render_stage(narrative: str, **parts) -> str:
+            from nev_weekly.renderer import render_site
+
+            # Every layout (index, apple, masonry) is rendered from one view model in a single pass.
+            pages = render_site(narrative=narrative, sections=build_sections(**parts))
+            ensure_stylesheet(out_dir)
+            for css in ("style.css", "apple.css", "masonry.css"):
+                publisher().fingerprint(css)
+            for name, text in pages.items():
+                # The generation timestamp alone does not count as a change.
+                if publisher().write(name, publisher().rewrite_assets(text), volatile=[meta["generated_at"]]):
+                    print(f"Generated public/{name}")
+            # This week's issue is also kept in the archive.
+            publish_archive_page(publisher(), meta["week"], pages["index.html"], meta["generated_at"])
+            publish_archive_index(publisher())
+            return "public/index.html"
+
+        def search_index_stage(render: Optional[str], **parts) -> int:
+            from nev_weekly.search_index import index_issues
+
+            if not render:
+                return 0  # no issue was published, so there is nothing to search for
+            # Only this week's postings are replaced; the other weeks' shards are left as they are.
+            return index_issues(publisher(), [{"week": meta["week"], "sections": build_sections(**parts)}])
+
+        def mark_seen_stage(render: Optional[str], dimming_news: list, competitors: dict) -> int:
+            if not render:
+                return 0  # render failed or timed out: nothing went out this week
+            published = [{"url": it.get("url"), "title": it.get("title")} for it in dimming_news]
+            published += [{"url": u} for u in competitors.get("links", [])]
+            seen().mark(published)
+            return len(published)
+
+        stages += [
+            Stage("narrative", narrative_stage, deps=NEWSLETTER, timeout=180, fallback=fallback_narrative),
+            Stage("trends", history_stage, deps=NEWSLETTER, timeout=60, default={}),
+            # No default: a failed render yields None, which the stages below check.
+            Stage("render", render_stage, deps=["narrative", *NEWSLETTER, "competitors", "trends"], timeout=60),
+            Stage("search_index", search_index_stage, deps=["render", *NEWSLETTER, "competitors"], timeout=60, default=0),
+            # Only what actually went out is marked as seen.
+            Stage("seen", mark_seen_stage, deps=["render", "dimming_news", "competitors"], timeout=60, default=0),
+        ]
+
+    if "report" in commands:
+
+        def competitor_report_stage(competitors: dict) -> str:
+            from nev_weekly.llm_helper import format_competitor_report
+
+            comp_md = format_competitor_report(competitors) or ""
+            publisher().write("competitor_report.md", comp_md)
+            return comp_md
+
+        stages.append(Stage("competitor_report", competitor_report_stage, deps=["competitors"], timeout=180))
+
+    if "links" in commands:
+
+        def link_check_stage(competitors: dict) -> list:
+            from nev_weekly.link_checker import check_links, format_link_report
+            from nev_weekly.link_store import LinkStore
+
+            # Recently validated links are served from the store; NEV_FULL_LINK_CHECK=1 rechecks everything.
+            full_recheck = os.getenv("NEV_FULL_LINK_CHECK", "").strip().lower() in ("1", "true", "yes")
+            link_report = check_links(competitors.get("links", []), store=LinkStore(), full_recheck=full_recheck)
+            publisher().write("link_report.md", format_link_report(link_report))
+            return link_report
+
+        stages.append(Stage("link_check", link_check_stage, deps=["competitors"], timeout=120, default=[]))
+
+    from nev_weekly.resilience import breaker_snapshot, deadline, run_deadline
+
+    # NEV_RUN_DEADLINE bounds the whole run; each stage's timeout bounds its own outbound calls.
+    with deadline(run_deadline()):
+        _, report = run_pipeline(stages)
+
+    for name, info in report.items():
+        if info["status"] != "ok":
+            print(f"Stage {name} {info['status']} after {info['seconds']}s: {info.get('error', '')}")
+    for close in closing:
+        close()
+    if "publisher" in shared:
+        stats = shared["publisher"].stats
+        print(f"Published: {stats['written']} files written, {stats['unchanged']} unchanged")
+    if "seen" in shared and shared["seen"].stats["checked"]:
+        print(f"Seen filter: {shared['seen'].stats['seen']} of {shared['seen'].stats['checked']} results already published")
+    if "tavily" in shared:
+        search = shared["tavily"]
+        spent = search.budget.snapshot()
+        print(f"Query budget: {spent['used']['queries']} used of {spent['max_queries'] or 'unlimited'}, {spent['denied']} denied")
+        print(f"Search cache: {search.cache.stats['hits']} hits, {search.cache.stats['misses']} misses")
+        METRICS.gauge("cache.tavily.hit_rate", round(search.cache.hit_rate(), 3))
+        METRICS.gauge("budget", spent)
+
+    breakers = breaker_snapshot()
+    if breakers:
+        print("Circuit breakers: " + ", ".join(f"{k} {v['state']} ({v['rejected']} rejected)" for k, v in breakers.items()))
+    METRICS.gauge("breakers", breakers)
+
+    # Machine-readable run metrics (build/run_metrics.json) and, with NEV_PROFILE=1, a merged pstats dump.
+    METRICS.gauge("stages", report)
+    print(f"Run metrics written to {METRICS.write()}")
+    profile_path = METRICS.dump_profile()
+    if profile_path:
+        print(f"Profile written to {profile_path} (inspect with python -m pstats)")
+
+
+def fetch_stages(
+    names: List[str],
+    previous: Dict[str, Any],
+    tavily: Any,
+    seen: Callable[[], Any],
+    reference_date: Optional[date] = None,
+) -> List[Stage]:
+    """Search stages for the named sections; the seen store is opened only if a stage needs it.
+
+    With `reference_date`, date windows and queries are anchored to that day instead of today.
+    """
+    from nev_weekly.config_loader import load_yaml_list, load_yaml_map
+
+    config_dir = Path(__file__).parent / "config"
+
+    def sales() -> Any:
+        from nev_weekly.aggregators import get_sales_rankings
+
+        return get_sales_rankings(tavily=tavily, top_n=10, reference_date=reference_date)
+
+    def launches() -> Any:
+        from nev_weekly.aggregators import get_new_car_launches
+
+        return get_new_car_launches(tavily=tavily, max_items=3, reference_date=reference_date)
+
+    def upcoming() -> Any:
+        from nev_weekly.aggregators import get_upcoming_releases
+
+        return get_upcoming_releases(tavily=tavily, max_items=5, reference_date=reference_date)
+
+    def vip_voices() -> Any:
+        from nev_weekly.aggregators import get_vip_voices
+
+        return get_vip_voices(tavily=tavily, vip_names=load_yaml_list(config_dir / "vips.yaml"), reference_date=reference_date)
+
+    def dimming_news() -> Any:
+        from nev_weekly.aggregators import get_smart_dimming_news
+
+        return get_smart_dimming_news(
+            tavily=tavily,
+            competitors=load_yaml_list(config_dir / "competitors.yaml"),
+            keywords=load_yaml_list(config_dir / "keywords.yaml"),
+            target_count=50,
+            top_n=10,
+            seen=seen(),
+            reference_date=reference_date,
+        )
+
+    def competitors() -> Any:
+        from nev_weekly.competitor_analysis import analyze_competitors
+
+        url_map = load_yaml_map(config_dir / "competitor_urls.yaml")
+        return analyze_competitors(tavily=tavily, url_map=url_map, min_search=100, seen=seen())
+
+    tasks = {
+        # Task A: Weekly NEV sales rankings for China.
+        # Queries target CPCA (乘联会) and Dongchedi (懂车帝) summaries.
+        "sales": (sales, 180),
+        # Task B: New car launches (past week) and upcoming releases (next month).
+        "launches": (launches, 180),
+        "upcoming": (upcoming, 180),
+        # Task C: VIP voices (last 7 days) based on vips.yaml.
+        "vip_voices": (vip_voices, 180),
+        # Task D: Smart dimming industry intelligence combining competitors + keywords.
+        "dimming_news": (dimming_news, 300),
+        "competitors": (competitors, 300),
+    }
+    # A section that fails keeps last run's data rather than going blank.
+    return [
+        Stage(name, tasks[name][0], timeout=tasks[name][1], default=previous.get(name, EMPTY_SECTIONS[name]))
+        for name in names
+    ]
+
+
+# Backfill: each week runs in its own process with the usual threaded fetch
+# pipeline inside it. Workers share one query budget (scaled by the number of
+# weeks) through a multiprocessing counter and split the query rate evenly;
+# the parent saves history in week order and renders the archive.
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_backfill_worker(spent: Any, weeks: int, workers: int) -> None:
+    from nev_weekly.budget import BudgetManager
+    from nev_weekly.cache import DiskCache, refresh_requested
+    from nev_weekly.tavily_client import TavilyWrapper
+
+    budget = BudgetManager.from_env(scale=weeks, shared=spent, processes=workers)
+    cache = DiskCache(namespace="tavily", refresh=refresh_requested())
+    _WORKER["tavily"] = TavilyWrapper(api_key=os.getenv("TAVILY_API_KEY"), cache=cache, budget=budget)
+
 
-    link_report = check_links(competitor_summary.get("links", []))
-    bad = [x for x in link_report if not x.get("ok")]
-    lines = ["# Link Validation Report", f"Total checked: {len(link_report)}", f"Invalid: {len(bad)}", "", "## Invalid Links"]
-    for x in bad:
-        lines.append(f"- {x['url']} status={x['status']}")
-    (out_dir / "link_report.md").write_text("\n".join(lines), encoding="utf-8")
+def backfill_week(monday: str) -> Dict[str, Any]:
+    """Fetch and summarize the issue for the week starting `monday` (ISO date)."""
+    from nev_weekly.history import week_key
+    from nev_weekly.llm_helper import _fallback_report, format_weekly_report
+
+    # The issue is written as if generated on the Sunday that closes the week.
+    ref = date.fromisoformat(monday) + timedelta(days=6)
+    # Competitor pages have no history, and published-before filtering does not apply to the past.
+    stages = fetch_stages(NEWSLETTER, {}, _WORKER["tavily"], lambda: None, reference_date=ref)
+    results, report = run_pipeline(stages)
+    sections = {name: results.get(name, EMPTY_SECTIONS[name]) for name in DATA_SECTIONS}
+    sections["meta"] = {"generated_at": f"{ref.isoformat()} 00:00:00Z", "week": week_key(datetime.combine(ref, datetime.min.time()))}
+    try:
+        narrative = format_weekly_report(sections)
+    except Exception:
+        narrative = _fallback_report(sections)
+    failed = [name for name, info in report.items() if info["status"] != "ok"]
+    return {"week": sections["meta"]["week"], "sections": sections, "narrative": narrative, "failed": failed}
+
+
+def backfill_weeks(start: date, end: date) -> List[str]:
+    """Mondays (ISO) of every week from the one containing `start` through the one containing `end`."""
+    monday = start - timedelta(days=start.weekday())
+    weeks = []
+    while monday <= end:
+        weeks.append(monday.isoformat())
+        monday += timedelta(days=7)
+    return weeks
+
+
+def backfill(start: date, end: date, workers: Optional[int] = None) -> None:
+    import multiprocessing
+
+    from nev_weekly.history import HistoryStore
+    from nev_weekly.publish import Publisher
+    from nev_weekly.renderer import render_html
+    from nev_weekly.search_index import index_issues
+
+    weeks = backfill_weeks(start, end)
+    if not weeks:
+        print("No weeks to backfill")
+        return
+    workers = max(1, min(workers or os.cpu_count() or 1, len(weeks)))
+    spent = multiprocessing.Array("d", 2)
+    print(f"Backfilling {len(weeks)} weeks with {workers} processes")
+    issues: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(workers, initializer=_init_backfill_worker, initargs=(spent, len(weeks), workers)) as pool:
+        futures = {pool.submit(backfill_week, monday): monday for monday in weeks}
+        for future in as_completed(futures):
+            try:
+                issue = future.result()
+            except Exception as e:
+                print(f"Week of {futures[future]} failed: {e}")
+                continue
+            if issue["failed"]:
+                print(f"{issue['week']}: {', '.join(issue['failed'])} fell back to empty sections")
+            issues.append(issue)
+    issues.sort(key=lambda it: it["week"])
+
+    out_dir = ensure_public_dir()
+    ensure_stylesheet(out_dir)
+    publisher = Publisher(out_dir)
+    publisher.fingerprint("style.css")
+    # Snapshots go in first, in week order, so each week's trends compare against the one before it.
+    store = HistoryStore()
+    try:
+        for issue in issues:
+            store.save(issue["week"], issue["sections"])
+        for issue in issues:
+            sections = {**issue["sections"], "trends": store.trends(issue["week"])}
+            page = render_html(issue["narrative"], sections)
+            publish_archive_page(publisher, issue["week"], page, sections["meta"]["generated_at"])
+    finally:
+        store.close()
+    publish_archive_index(publisher)
+    indexed = index_issues(publisher, issues)
+    publisher.finish()
+    print(f"Search index: {indexed} items from {len(issues)} weeks")
+    print(f"Archived {len(issues)} of {len(weeks)} weeks; {int(spent[0])} live queries")
+    print(f"Published: {publisher.stats['written']} files written, {publisher.stats['unchanged']} unchanged")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    sections_arg = argparse.ArgumentParser(add_help=False)
+    sections_arg.add_argument(
+        "--sections",
+        type=parse_sections,
+        default=argparse.SUPPRESS,
+        help="comma-separated sections to search again, e.g. vip,dimming (default: all)",
+    )
+    parser = argparse.ArgumentParser(description="Generate the NEV weekly newsletter.", parents=[sections_arg])
+    sub = parser.add_subparsers(dest="command")
+    for name, help_text in COMMANDS.items():
+        sub.add_parser(name, help=help_text, parents=[sections_arg] if name == "fetch" else [])
+    back = sub.add_parser("backfill", help="build past issues into public/archive/<week>/")
+    back.add_argument("--from", dest="start", type=date.fromisoformat, required=True, help="first day (YYYY-MM-DD)")
+    back.add_argument("--to", dest="end", type=date.fromisoformat, default=date.today(), help="last day (default: today)")
+    back.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+    if args.command == "backfill":
+        backfill(args.start, args.end, workers=args.workers)
+        return
+    # Without a subcommand everything runs, as in the weekly job.
+    commands = [args.command] if args.command else list(COMMANDS)
+    run(commands, fetch=getattr(args, "sections", None))
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
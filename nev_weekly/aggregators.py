@@ -1,118 +1,215 @@
+import heapq
 import re
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Set
+from urllib.parse import urlsplit
 
+from .budget import CORE, STANDARD
+from .matcher import keyword_matcher
+from .models_index import default_index
+from .seen import SeenStore
+from .simhash import NearDuplicateIndex, simhash
 from .tavily_client import TavilyWrapper
 
 
-def _extract_models(text: str) -> List[str]:
-    patterns = [
-        r"[A-Z][A-Za-z0-9\-\s]{1,20}\b(?:Pro|Max|Plus)?",
-        r"理想[LM][0-9]?",  # Li Auto L series
-        r"问界[\w\-]+",
-        r"比亚迪[\w\-]+",
-        r"蔚来[\w\-]+",
-        r"小鹏[\w\-]+",
-        r"特斯拉Model\s?[S|3|X|Y]",
-    ]
-    found: List[str] = []
-    for p in patterns:
-        for m in re.findall(p, text):
-            val = m.strip()
-            if val and val not in found:
-                found.append(val)
-    return found[:20]
+# Generic signals of industry news that add to the keyword score of a dimming article.
+DIMMING_TAGS = ["partnership", "合作", "技术", "factory", "工厂", "量产", "专利"]
+
+
+def _today(reference_date: Optional[date]) -> date:
+    return reference_date or datetime.utcnow().date()
+
+
+def _dated(query: str, reference_date: Optional[date]) -> str:
+    # Backfilled weeks pin undated queries to their month; the live run keeps the original query.
+    return query if reference_date is None else f"{query} {reference_date.year}年{reference_date.month}月"
+
+
+def _extract_models(text: str) -> List[Dict]:
+    """Canonical models mentioned in text (see config/models.yaml), in order of first mention."""
+    return default_index().extract(text)[:20]
 
 
-def get_sales_rankings(tavily: TavilyWrapper, top_n: int = 10) -> Dict[str, List[Dict]]:
+# Ranking pages worth reading in full; other top results only fill the remaining page slots.
+SALES_HOSTS = ("cpcaauto.com", "cpca.org.cn", "dongchedi.com")
+BANDS = {"over_250k": 25.0, "over_350k": 35.0}  # 万元
+
+
+def _sales_pages(batches: List[List[Dict]], pages: int) -> List[str]:
+    urls = [it["url"] for items in batches for it in items if it.get("url")]
+    preferred = [u for u in urls if any(h in urlsplit(u).netloc.lower() for h in SALES_HOSTS)]
+    return list(dict.fromkeys(preferred + urls))[:pages]
+
+
+def _price_text(row: Dict) -> str:
+    low, high = row.get("price_low"), row.get("price_high")
+    if low is None:
+        return ""
+    return f"{low:g}万" if low == high else f"{low:g}-{high:g}万"
+
+
+def get_sales_rankings(
+    tavily: TavilyWrapper,
+    top_n: int = 10,
+    reference_date: Optional[date] = None,
+    pages: int = 4,
+    max_bytes: Optional[int] = None,
+) -> Dict[str, List[Dict]]:
+    """Top models per price band, ranked by weekly units where a ranking page reports them.
+
+    The two band searches pick the pages; up to `pages` of them are streamed
+    and their sales tables merged (see sales_tables.py). Models whose price
+    band is known are placed by the midpoint of their price range. Models only
+    mentioned in snippets follow the ones with unit counts, most-cited first.
+    """
     queries = [
-        "中国 新能源 周销量 高端 SUV 轿车 25万以上 乘联会 懂车帝",
-        "中国 新能源 周销量 高端 SUV 轿车 35万以上 乘联会 懂车帝",
+        _dated("中国 新能源 周销量 高端 SUV 轿车 25万以上 乘联会 懂车帝", reference_date),
+        _dated("中国 新能源 周销量 高端 SUV 轿车 35万以上 乘联会 懂车帝", reference_date),
     ]
-    results = [tavily.search(q, max_results=20) for q in queries]
+    results = [r["results"] for r in tavily.search_many(queries, max_results=20)]
+    urls = _sales_pages(results, pages) if pages and tavily.enabled else []
+    table: List[Dict] = []
+    if urls:
+        # httpx is only imported once there are pages to read.
+        from .sales_tables import DEFAULT_PAGE_BYTES, fetch_sales_tables, merge_tables
 
-    def parse(items: List[Dict]) -> List[Dict]:
-        ranking: List[Dict] = []
+        table = merge_tables(fetch_sales_tables(urls, max_bytes=max_bytes or DEFAULT_PAGE_BYTES))
+
+    def mentions(items: List[Dict]) -> Dict[str, Dict]:
+        # Merge mentions of the same canonical model across sources.
+        merged: Dict[str, Dict] = {}
         for it in items:
             models = _extract_models((it.get("title") or "") + "\n" + (it.get("content") or ""))
-            for idx, m in enumerate(models[:top_n]):
-                ranking.append({"model": m, "rank": idx + 1, "price_hint": ">250k", "source": it.get("url")})
-        # dedupe by model
-        seen = set()
-        dedup: List[Dict] = []
-        for r in ranking:
-            if r["model"] in seen:
+            for m in models[:top_n]:
+                entry = merged.setdefault(
+                    m["id"],
+                    {"model": m["name"], "model_id": m["id"], "source": it.get("url"), "sources": [], "mentions": 0},
+                )
+                entry["mentions"] += 1
+                if it.get("url") and it["url"] not in entry["sources"]:
+                    entry["sources"].append(it["url"])
+        return merged
+
+    def rank(band: str, items: List[Dict]) -> List[Dict]:
+        floor = BANDS[band]
+        cited = mentions(items)
+        ranked: List[Dict] = []
+        for row in table:
+            if row["price_low"] is not None:
+                in_band = (row["price_low"] + row["price_high"]) / 2 >= floor
+            else:
+                in_band = row["model_id"] in cited  # no price on the page: trust the band search
+            if not in_band:
                 continue
-            seen.add(r["model"])
-            dedup.append(r)
-        return dedup[:top_n]
+            snippet = cited.pop(row["model_id"], {})
+            ranked.append({
+                "model": row["model"],
+                "model_id": row["model_id"],
+                "units": row["units"],
+                "price_hint": _price_text(row) or f">{band[5:]}",
+                "source": row["sources"][0],
+                "sources": row["sources"] + [u for u in snippet.get("sources", []) if u not in row["sources"]],
+                "mentions": snippet.get("mentions", 0),
+            })
+        ranked += [
+            {**r, "units": None, "price_hint": f">{band[5:]}"}
+            for r in sorted(cited.values(), key=lambda r: -r["mentions"])
+        ]
+        return [{**r, "rank": idx + 1} for idx, r in enumerate(ranked[:top_n])]
 
-    over_250 = parse(results[0])
-    over_350 = [{**r, "price_hint": ">350k"} for r in parse(results[1])]
+    return {"over_250k": rank("over_250k", results[0]), "over_350k": rank("over_350k", results[1])}
 
-    return {"over_250k": over_250, "over_350k": over_350}
 
+def _first_per_model(items: List[Dict], max_items: int, build: Callable[[Dict, Dict], Dict]) -> List[Dict]:
+    """One entry per canonical model, in result order.
 
-def get_new_car_launches(tavily: TavilyWrapper, max_items: int = 3) -> List[Dict]:
-    seven_days_ago = (datetime.utcnow() - timedelta(days=7)).date().isoformat()
-    q = f"过去一周 新车 发布 上市 中国 NEV {seven_days_ago}"
-    items = tavily.search(q, max_results=25)
-    launches: List[Dict] = []
+    Later results about the same model, or near-duplicates of an earlier result
+    (syndicated copies, translations that keep names and numbers), are not
+    dropped: their URLs are kept on the entry as alternate sources.
+    """
+    out: List[Dict] = []
+    by_model: Dict[str, Dict] = {}
+    by_cluster: Dict[int, Dict] = {}
+    index = NearDuplicateIndex()
     for it in items:
-        models = _extract_models(it.get("title", "") + "\n" + it.get("content", ""))
-        if not models:
+        text = it.get("title", "") + "\n" + it.get("content", "")
+        cid, created = index.assign(simhash(text))
+        models = _extract_models(text) if created else []
+        entry = by_cluster.get(cid) if not created else (by_model.get(models[0]["id"]) if models else None)
+        if entry is not None:
+            url = it.get("url")
+            if url and url != entry["source"] and url not in entry["alternates"]:
+                entry["alternates"].append(url)
+            by_cluster.setdefault(cid, entry)
             continue
-        launches.append(
-            {
-                "model": models[0],
-                "price": _find_price(it.get("content", "")),
-                "highlights": _find_highlights(it.get("content", "")),
-                "source": it.get("url"),
-            }
-        )
-        if len(launches) >= max_items:
-            break
-    return launches
+        if not models or len(out) >= max_items:
+            continue
+        entry = {**build(it, models[0]), "alternates": []}
+        by_model[models[0]["id"]] = by_cluster[cid] = entry
+        out.append(entry)
+    return out
 
 
-def get_upcoming_releases(tavily: TavilyWrapper, max_items: int = 5) -> List[Dict]:
-    q = "下月 预计 发布 新车 中国 NEV 上市 预告"
+def get_new_car_launches(
+    tavily: TavilyWrapper, max_items: int = 3, reference_date: Optional[date] = None
+) -> List[Dict]:
+    seven_days_ago = (_today(reference_date) - timedelta(days=7)).isoformat()
+    q = f"过去一周 新车 发布 上市 中国 NEV {seven_days_ago}"
+    items = tavily.search(q, max_results=25)
+    return _first_per_model(
+        items,
+        max_items,
+        lambda it, m: {
+            "model": m["name"],
+            "model_id": m["id"],
+            "price": _find_price(it.get("content", "")),
+            "highlights": _find_highlights(it.get("content", "")),
+            "source": it.get("url"),
+        },
+    )
+
+
+def get_upcoming_releases(
+    tavily: TavilyWrapper, max_items: int = 5, reference_date: Optional[date] = None
+) -> List[Dict]:
+    q = _dated("下月 预计 发布 新车 中国 NEV 上市 预告", reference_date)
     items = tavily.search(q, max_results=30)
-    upcoming: List[Dict] = []
-    for it in items:
-        models = _extract_models(it.get("title", "") + "\n" + it.get("content", ""))
-        if not models:
-            continue
-        upcoming.append(
-            {
-                "model": models[0],
-                "window": "Next Month",
-                "notes": _find_highlights(it.get("content", ""))[:2],
-                "source": it.get("url"),
-            }
-        )
-        if len(upcoming) >= max_items:
-            break
-    return upcoming
+    return _first_per_model(
+        items,
+        max_items,
+        lambda it, m: {
+            "model": m["name"],
+            "model_id": m["id"],
+            "window": "Next Month",
+            "notes": _find_highlights(it.get("content", ""))[:2],
+            "source": it.get("url"),
+        },
+    )
 
 
-def get_vip_voices(tavily: TavilyWrapper, vip_names: List[str]) -> List[Dict]:
-    end = datetime.utcnow().date().isoformat()
-    start = (datetime.utcnow() - timedelta(days=7)).date().isoformat()
+def get_vip_voices(
+    tavily: TavilyWrapper, vip_names: List[str], reference_date: Optional[date] = None
+) -> List[Dict]:
+    end = _today(reference_date).isoformat()
+    start = (_today(reference_date) - timedelta(days=7)).isoformat()
+    queries = [f"{name} 演讲 采访 观点 {start}..{end} 新能源 汽车" for name in vip_names]
+    batches = tavily.search_many(queries, max_results=10)
     out: List[Dict] = []
-    for name in vip_names:
-        q = f"{name} 演讲 采访 观点 {start}..{end} 新能源 汽车"
-        items = tavily.search(q, max_results=10)
+    for name, batch in zip(vip_names, batches):
+        items = batch["results"]
         if not items:
             out.append({"name": name, "quotes": [], "summary": "No recent coverage found", "sources": []})
             continue
         quotes: List[str] = []
         sources: List[str] = []
+        # The same quote is syndicated with small edits; keep one copy of each near-duplicate.
+        index = NearDuplicateIndex()
         for it in items:
             snippet = it.get("content", "")
             for s in re.findall(r"“([^”]{10,200})”|\"([^\"]{10,200})\"", snippet):
                 qtxt = next((x for x in s if x), None)
-                if qtxt and qtxt not in quotes:
+                if qtxt and index.assign(simhash(qtxt))[1]:
                     quotes.append(qtxt)
             if it.get("url"):
                 sources.append(it["url"])
@@ -121,51 +218,118 @@ def get_vip_voices(tavily: TavilyWrapper, vip_names: List[str]) -> List[Dict]:
     return out
 
 
+def _dimming_queries(competitors: List[str], keywords: List[str], reference_date: Optional[date] = None) -> Iterator[str]:
+    for comp in competitors:
+        for kw in keywords:
+            yield _dated(f"{comp} {kw} 智能 调光 玻璃 新闻 合作 工厂 技术", reference_date)
+
+
+# With early_stop, give up after this many consecutive waves that don't change the top-N.
+EARLY_STOP_PATIENCE = 2
+
+
 def get_smart_dimming_news(
     tavily: TavilyWrapper,
     competitors: List[str],
     keywords: List[str],
     target_count: int = 50,
     top_n: int = 10,
+    seen: Optional[SeenStore] = None,
+    early_stop: bool = False,
+    reference_date: Optional[date] = None,
 ) -> List[Dict]:
-    queries = []
-    for comp in competitors:
-        for kw in keywords:
-            queries.append(f"{comp} {kw} 智能 调光 玻璃 新闻 合作 工厂 技术")
-
-    collected: List[Tuple[str, str, str]] = []
-    for q in queries:
-        for it in tavily.search(q, max_results=min(10, target_count)):
-            title = it.get("title", "").strip()
-            url = it.get("url", "").strip()
-            content = it.get("content", "")
-            if title and url:
-                collected.append((title, url, content))
-            if len(collected) >= target_count:
-                break
-        if len(collected) >= target_count:
-            break
+    # score by keyword presence: +2 per configured keyword, +1 per tag, found in one pass over the text
+    matcher = keyword_matcher(tuple(keywords) + tuple(DIMMING_TAGS))
+    ceiling = 2 * len(set(keywords)) + len(DIMMING_TAGS)
 
-    # score by keyword presence
     def score(content: str) -> int:
-        s = 0
-        low = content.lower()
-        for kw in keywords:
-            if kw.lower() in low:
-                s += 2
-        for tag in ["partnership", "合作", "技术", "factory", "工厂", "量产", "专利"]:
-            if tag in low:
-                s += 1
-        return s
+        hits = matcher.counts(content)
+        return 2 * sum(1 for kw in keywords if kw in hits) + sum(1 for tag in DIMMING_TAGS if tag in hits)
 
-    unique: Dict[str, Dict] = {}
-    for title, url, content in collected:
-        if title in unique:
-            continue
-        unique[title] = {"title": title, "url": url, "score": score(content), "summary": _summarize_text(content[:600])}
+    # Results stream through title dedupe -> near-duplicate clustering -> a min-heap of the
+    # top_n clusters. Only heap entries keep their text; everything else is a title or a
+    # fingerprint, and summaries are written for the winners alone.
+    index = NearDuplicateIndex()
+    titles: Set[str] = set()
+    heap: List[list] = []  # [score, -seq, cluster, title, url, content, alternates]
+    ranked: Dict[int, list] = {}  # cluster -> its heap entry
+    best: Dict[int, int] = {}  # cluster -> best score, for clusters outside the heap
+    seq = 0
 
-    ranked = sorted(unique.values(), key=lambda x: x["score"], reverse=True)
-    return ranked[:top_n]
+    def offer(title: str, url: str, content: str) -> bool:
+        points = score(content)
+        cid, created = index.assign(simhash(title + "\n" + content))
+        entry = ranked.get(cid)
+        if entry is not None:
+            # Syndicated copy of a ranked story: keep the better-scored version, list the other.
+            if points > entry[0]:
+                entry[6].append(entry[4])
+                entry[0:6] = [points, -seq, cid, title, url, content]
+                heapq.heapify(heap)
+                return True
+            entry[6].append(url)
+            return False
+        if not created and points <= best[cid]:
+            return False
+        best[cid] = points
+        entry = [points, -seq, cid, title, url, content, []]
+        if len(heap) < top_n:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            dropped = heapq.heapreplace(heap, entry)
+            del ranked[dropped[2]]
+            best[dropped[2]] = dropped[0]
+        else:
+            return False
+        ranked[cid] = entry
+        return True
+
+    # Queries are generated on demand and issued in waves of `tavily.concurrency`,
+    # so we stop spending quota once target_count is met.
+    queries = _dimming_queries(competitors, keywords, reference_date)
+    accepted = 0
+    stale = 0
+    waves = 0
+    while accepted < target_count:
+        wave = list(islice(queries, tavily.concurrency))
+        if not wave:
+            break
+        changed = False
+        # The first wave is part of the core newsletter; topping up to target_count is not.
+        priority = CORE if waves == 0 else STANDARD
+        waves += 1
+        for batch in tavily.search_many(wave, max_results=min(10, target_count), priority=priority):
+            for it in batch["results"]:
+                title = it.get("title", "").strip()
+                url = it.get("url", "").strip()
+                # Articles published in earlier issues don't count toward target_count.
+                if not (title and url) or title in titles or (seen and seen.seen(url, title)):
+                    continue
+                titles.add(title)
+                accepted += 1
+                seq += 1
+                changed = offer(title, url, it.get("content", "")) or changed
+                if accepted >= target_count:
+                    break
+            if accepted >= target_count:
+                break
+        if early_stop and len(heap) >= top_n:
+            # Stop once nothing can beat the weakest winner, or the top-N has stopped moving.
+            stale = 0 if changed else stale + 1
+            if heap[0][0] >= ceiling or stale >= EARLY_STOP_PATIENCE:
+                break
+
+    winners = sorted(heap, key=lambda e: (-e[0], -e[1]))
+    return [
+        {
+            "title": title,
+            "url": url,
+            "score": points,
+            "summary": _summarize_text(content[:600]),
+            "alternates": alternates,
+        }
+        for points, _, _, title, url, content, alternates in winners
+    ]
 
 
 def _find_price(text: str) -> str:
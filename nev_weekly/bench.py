@@ -0,0 +1,206 @@
+"""Offline benchmark of the weekly pipeline stages.
+
+Every outbound call is served by a synthetic replay cassette, so the suite
+needs no API keys or network. Each scale factor multiplies the config lists
+(competitors, VIPs, competitor URLs, dimming target) and the size of every
+search result, and each stage reports wall time, throughput and peak memory.
+
+    python -m nev_weekly.bench --scales 1 10 100 --latency-ms 5
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from . import cassette
+from .aggregators import (
+    get_new_car_launches,
+    get_sales_rankings,
+    get_smart_dimming_news,
+    get_upcoming_releases,
+    get_vip_voices,
+)
+from .competitor_analysis import analyze_competitors
+from .config_loader import load_yaml_list
+from .link_checker import check_links
+from .sales_tables import parse_html
+from .llm_helper import format_competitor_report, format_weekly_report
+from .metrics import METRICS
+from .models_index import DEFAULT_MODELS_PATH, default_index
+from .renderer import render_site
+from .tavily_client import TavilyWrapper
+
+CONFIG_DIR = DEFAULT_MODELS_PATH.parent
+_FILLER = (
+    "Industry coverage of China's premium NEV market, supplier partnerships, factory expansion "
+    "and smart glass technology. 行业 新能源 汽车 市场 动态 合作 技术 工厂 量产 专利。 "
+)
+
+
+class SyntheticCassette(cassette.Cassette):
+    """Replay cassette that fabricates a deterministic response for any request."""
+
+    def __init__(self, size_scale: int = 1, latency: float = 0.0) -> None:
+        super().__init__(cassette.REPLAY, latency=latency)
+        self.size_scale = size_scale
+        self.models = list(default_index().names.values())
+        self.keywords = load_yaml_list(CONFIG_DIR / "keywords.yaml") or ["PDLC"]
+
+    def _rng(self, kind: str, request: Dict[str, Any]) -> random.Random:
+        blob = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return random.Random(hashlib.sha256(f"{kind}\n{blob}".encode("utf-8")).digest())
+
+    def _text(self, rng: random.Random, words: int) -> str:
+        parts = []
+        for _ in range(words):
+            pick = rng.random()
+            if pick < 0.15:
+                parts.append(rng.choice(self.models))
+            elif pick < 0.3:
+                parts.append(rng.choice(self.keywords))
+            elif pick < 0.6:
+                parts.append(_FILLER[rng.randrange(0, len(_FILLER) - 40):][:40])
+            else:
+                # Random vocabulary keeps unrelated results from looking like near-duplicates.
+                parts.append(" ".join(f"w{rng.randrange(50000)}" for _ in range(5)))
+        return " ".join(parts)
+
+    def load(self, kind: str, request: Dict[str, Any]) -> Any:
+        rng = self._rng(kind, request)
+        if kind == "tavily":
+            results = []
+            for i in range(request.get("max_results", 10)):
+                quote = f"“{self._text(rng, 3)}”"
+                content = f"{self._text(rng, 8 * self.size_scale)} {quote} 售价 {rng.randint(20, 80)}万"
+                results.append(
+                    {
+                        "title": f"{rng.choice(self.models)} {self._text(rng, 2)}",
+                        "content": content,
+                        "url": f"https://news{rng.randrange(10 ** 6)}.example.com/{i}",
+                    }
+                )
+            return results
+        if kind == "fetch":
+            body = self._text(rng, 16 * self.size_scale)
+            return [200, body[: request.get("max_bytes", len(body))]]
+        if kind == "sales_page":
+            # A ranking table streamed through the real parser, as a live page would be.
+            rows = "".join(
+                f"<tr><td>{i + 1}</td><td>{rng.choice(self.models)}</td><td>{rng.randint(15, 60)}.98-{rng.randint(61, 90)}.98万</td>"
+                f"<td>{rng.randint(200, 20000):,}</td></tr>"
+                for i in range(30 * self.size_scale)
+            )
+            page = f"<html><body><p>{self._text(rng, 20)}</p><table><tr><th>排名</th><th>车型</th><th>指导价</th><th>周销量</th></tr>{rows}</table></body></html>"
+            page = page[: request.get("max_bytes", len(page))]
+            return {"status": 200, "bytes": len(page.encode("utf-8")), "rows": parse_html(page)}
+        if kind == "link":
+            return [200, f'"{rng.randrange(10 ** 9)}"', None]
+        if kind == "llm":
+            return {"content": self._text(rng, 40), "prompt_tokens": 0, "completion_tokens": 0}
+        raise cassette.CassetteMiss(kind)
+
+
+def _size(value: Any) -> int:
+    if isinstance(value, dict):
+        return sum(_size(v) for v in value.values()) if value else 0
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    return 1
+
+
+def _measure(name: str, fn: Callable[[], Any]) -> Dict[str, Any]:
+    before = METRICS.snapshot()["counters"].get("tavily.requests", 0)
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        result = fn()
+    except Exception as e:
+        result, error = None, f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    queries = METRICS.snapshot()["counters"].get("tavily.requests", 0) - before
+    items = _size(result)
+    row = {
+        "stage": name,
+        "seconds": round(seconds, 4),
+        "queries": int(queries),
+        "items": items,
+        "items_per_s": round(items / seconds, 1) if seconds > 0 else None,
+        "peak_mib": round(peak / 2 ** 20, 2),
+    }
+    if error:
+        row["error"] = error
+    return row
+
+
+def run_scale(scale: int, latency: float = 0.0) -> List[Dict[str, Any]]:
+    competitors = [f"{c} {i}" for i in range(scale) for c in load_yaml_list(CONFIG_DIR / "competitors.yaml")]
+    vips = [f"{v} {i}" for i in range(scale) for v in load_yaml_list(CONFIG_DIR / "vips.yaml")]
+    keywords = load_yaml_list(CONFIG_DIR / "keywords.yaml")
+    url_map = {"EC": [f"https://competitor{i}.example.com/" for i in range(18 * scale)]}
+
+    previous = cassette.use(SyntheticCassette(size_scale=scale, latency=latency))
+    try:
+        tavily = TavilyWrapper(api_key=None)
+        sections: Dict[str, Any] = {"meta": {"generated_at": "benchmark"}}
+        rows = []
+
+        def stage(name: str, fn: Callable[[], Any]) -> None:
+            def run() -> Any:
+                sections[name] = fn()
+                return sections[name]
+
+            row = _measure(name, run)
+            row["scale"] = scale
+            rows.append(row)
+
+        stage("sales", lambda: get_sales_rankings(tavily=tavily, top_n=10))
+        stage("launches", lambda: get_new_car_launches(tavily=tavily, max_items=3 * scale))
+        stage("upcoming", lambda: get_upcoming_releases(tavily=tavily, max_items=5 * scale))
+        stage("vip_voices", lambda: get_vip_voices(tavily=tavily, vip_names=vips))
+        stage("dimming_news", lambda: get_smart_dimming_news(
+            tavily=tavily, competitors=competitors, keywords=keywords, target_count=50 * scale, top_n=10 * scale
+        ))
+        stage("competitors", lambda: analyze_competitors(tavily=tavily, url_map=url_map, min_search=100 * scale))
+        stage("narrative", lambda: format_weekly_report(sections))
+        stage("competitor_report", lambda: format_competitor_report(sections["competitors"] or {}))
+        stage("render", lambda: render_site(narrative=sections.get("narrative") or "", sections=sections))
+        stage("link_check", lambda: check_links((sections["competitors"] or {}).get("links", [])))
+        return rows
+    finally:
+        cassette.use(previous)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="synthetic delay per replayed call")
+    parser.add_argument("--json", type=Path, help="also write the rows to this JSON file")
+    args = parser.parse_args(argv)
+
+    tracemalloc.start()
+    rows: List[Dict[str, Any]] = []
+    print(f"{'scale':>5} {'stage':<18} {'seconds':>9} {'queries':>8} {'items':>7} {'items/s':>10} {'peak MiB':>9}")
+    for scale in args.scales:
+        for row in run_scale(scale, latency=args.latency_ms / 1000.0):
+            rows.append(row)
+            rate = "-" if row["items_per_s"] is None else f"{row['items_per_s']:.1f}"
+            line = (
+                f"{scale:>5} {row['stage']:<18} {row['seconds']:>9.4f} {row['queries']:>8} "
+                f"{row['items']:>7} {rate:>10} {row['peak_mib']:>9.2f}"
+            )
+            print(line + (f"  ERROR {row['error']}" if "error" in row else ""))
+    tracemalloc.stop()
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        args.json.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
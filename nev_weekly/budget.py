@@ -0,0 +1,184 @@
+import contextlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .metrics import METRICS
+
+
+# Per-run Tavily budget shared by every aggregator. Each live query is charged
+# against a query and credit budget, and lower priority classes may not dip
+# into the share reserved for the ones above them. A token bucket smooths the
+# request rate so bursts don't trip provider throttling; when requests queue
+# for tokens, higher priority classes are served first. As the budget runs
+# low, max_results is scaled down.
+
+CORE, STANDARD, BACKFILL = "core", "standard", "backfill"
+PRIORITIES = {CORE: 0, STANDARD: 1, BACKFILL: 2}
+
+DEFAULT_QUERY_BUDGET = 300
+DEFAULT_RATE = 5.0  # queries per second
+DEFAULT_RESERVE = 0.2
+MIN_RESULTS = 3
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised when a query would exceed the run budget for its priority class."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, priority: int = 0) -> float:
+        """Take one token, waiting behind earlier and higher-priority callers; returns seconds waited."""
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill()
+                    first = self._waiters[0] == ticket
+                    if first and self.tokens >= 1:
+                        self.tokens -= 1
+                        heapq.heappop(self._waiters)
+                        self._cond.notify_all()
+                        return time.monotonic() - started
+                    self._cond.wait((1 - self.tokens) / self.rate if first else None)
+            except BaseException:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                self._cond.notify_all()
+                raise
+
+
+def _env_number(name: str, default: Optional[float]) -> Optional[float]:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    value = float(raw)
+    return value if value > 0 else None  # 0 disables the limit
+
+
+class BudgetManager:
+    def __init__(
+        self,
+        max_queries: Optional[int] = None,
+        max_credits: Optional[float] = None,
+        rate: Optional[float] = None,
+        burst: int = 8,
+        reserve: float = DEFAULT_RESERVE,
+        shared: Any = None,
+    ) -> None:
+        self.max_queries = max_queries
+        self.max_credits = max_credits
+        # Lower classes stop this far short of the budget: standard keeps `reserve` for core,
+        # backfill keeps twice that for core and standard.
+        self.floors = {CORE: 0.0, STANDARD: reserve, BACKFILL: min(1.0, 2 * reserve)}
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.used: Dict[str, float] = {"queries": 0, "credits": 0.0}
+        # Optional multiprocessing.Array("d", 2) of [queries, credits] used by every process
+        # sharing this budget (backfill workers); per-process counts stay in self.used.
+        self.shared = shared
+        self.by_priority: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, burst: int = 8, scale: float = 1.0, shared: Any = None, processes: int = 1) -> "BudgetManager":
+        """NEV_QUERY_BUDGET / NEV_CREDIT_BUDGET / NEV_QUERY_RATE; 0 disables a limit.
+
+        The budgets are multiplied by `scale` (e.g. the number of weeks in a backfill)
+        and the rate is split evenly across `processes`.
+        """
+        queries = _env_number("NEV_QUERY_BUDGET", DEFAULT_QUERY_BUDGET)
+        credits = _env_number("NEV_CREDIT_BUDGET", None)
+        rate = _env_number("NEV_QUERY_RATE", DEFAULT_RATE)
+        return cls(
+            max_queries=int(queries * scale) if queries else None,
+            max_credits=credits * scale if credits else None,
+            rate=rate / max(1, processes) if rate else None,
+            burst=burst,
+            shared=shared,
+        )
+
+    def _left(self, used: float, limit: Optional[float]) -> float:
+        return 1.0 if limit is None else max(0.0, 1.0 - used / limit)
+
+    def _shared_lock(self) -> Any:
+        return self.shared.get_lock() if self.shared is not None else contextlib.nullcontext()
+
+    def _spent(self) -> Tuple[float, float]:
+        if self.shared is not None:
+            return self.shared[0], self.shared[1]
+        return self.used["queries"], self.used["credits"]
+
+    def remaining(self) -> float:
+        """Fraction of the tighter of the two budgets still unspent."""
+        with self._lock, self._shared_lock():
+            queries, credits = self._spent()
+        return min(self._left(queries, self.max_queries), self._left(credits, self.max_credits))
+
+    def charge(self, priority: str = CORE, credits: float = 1.0) -> None:
+        """Reserve one query for a live request, or raise BudgetExceeded."""
+        floor = self.floors[priority]
+        with self._lock, self._shared_lock():
+            queries, spent = self._spent()
+            over = (
+                self.max_queries is not None and queries + 1 > self.max_queries * (1 - floor)
+            ) or (
+                self.max_credits is not None and spent + credits > self.max_credits * (1 - floor)
+            )
+            if over:
+                self.denied += 1
+            else:
+                self.used["queries"] += 1
+                self.used["credits"] += credits
+                self.by_priority[priority] += 1
+                if self.shared is not None:
+                    self.shared[0] += 1
+                    self.shared[1] += credits
+        if over:
+            METRICS.incr(f"budget.denied.{priority}")
+            raise BudgetExceeded(f"{priority} query budget exhausted")
+        METRICS.incr(f"budget.queries.{priority}")
+
+    def throttle(self, priority: str = CORE) -> None:
+        """Wait for a rate token; called for every attempt, retries included."""
+        if self.bucket is None:
+            return
+        waited = self.bucket.acquire(PRIORITIES[priority])
+        METRICS.observe("budget.wait_ms", waited * 1000.0)
+
+    def max_results(self, requested: int, priority: str = CORE) -> int:
+        """Shrink max_results linearly once less than half the budget is left."""
+        left = self.remaining()
+        if left >= 0.5:
+            return requested
+        return max(min(MIN_RESULTS, requested), round(requested * left / 0.5))
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "max_queries": self.max_queries,
+                "max_credits": self.max_credits,
+                "used": dict(self.used),
+                "by_priority": dict(self.by_priority),
+                "denied": self.denied,
+            }
@@ -0,0 +1,119 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import METRICS
+
+
+# Persistent key/value cache backed by SQLite. Entries expire after a TTL,
+# the table is capped at max_entries with least-recently-used eviction, and
+# hit/miss/eviction counters are kept per instance.
+
+DEFAULT_TTL = 6 * 24 * 3600  # a little under a week, so Monday runs always refresh
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def cache_dir() -> Path:
+    path = Path(os.getenv("NEV_CACHE_DIR", ".cache"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def refresh_requested() -> bool:
+    return os.getenv("NEV_REFRESH", "").strip().lower() in ("1", "true", "yes")
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().casefold()
+
+
+class DiskCache:
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        namespace: str = "default",
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        refresh: bool = False,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path) if path else cache_dir() / "cache.sqlite"
+        self.namespace = namespace
+        self.clock = clock
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # When refresh is set, reads always miss but writes still land, so the next run is warm.
+        self.refresh = refresh
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed_at)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = self.clock()
+        with self._lock:
+            if self.refresh:
+                self._count("misses")
+                return None
+            row = self._db.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None or row[1] < now:
+                self._count("misses")
+                return None
+            self._db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+            self._db.commit()
+            self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = self.clock()
+        expires = now + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, created_at, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, now, expires, now),
+            )
+            self.stats["writes"] += 1
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM entries WHERE namespace = ? AND expires_at < ?", (self.namespace, now))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM entries WHERE namespace = ?", (self.namespace,)).fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM entries WHERE rowid IN ("
+                " SELECT rowid FROM entries WHERE namespace = ? ORDER BY accessed_at ASC LIMIT ?)",
+                (self.namespace, overflow),
+            )
+            self._count("evictions", overflow)
+
+    def _count(self, stat: str, n: int = 1) -> None:
+        self.stats[stat] += n
+        METRICS.incr(f"cache.{self.namespace}.{stat}", n)
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+# Record/replay of every outbound call (Tavily searches, page fetches, link
+# probes, LLM completions). In record mode live responses are written to a
+# cassette directory, one JSON file per request; in replay mode they are
+# served from there (optionally after a synthetic delay) and nothing touches
+# the network, so runs are reproducible and work offline.
+
+OFF, RECORD, REPLAY = "off", "record", "replay"
+DEFAULT_CASSETTE_DIR = Path("cassettes")
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class Cassette:
+    def __init__(self, mode: str = OFF, directory: Optional[Path] = None, latency: float = 0.0) -> None:
+        if mode not in (OFF, RECORD, REPLAY):
+            raise ValueError(f"unknown cassette mode {mode!r}")
+        self.mode = mode
+        self.directory = Path(directory or DEFAULT_CASSETTE_DIR)
+        self.latency = latency
+        self._lock = threading.Lock()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    def _path(self, kind: str, request: Dict[str, Any]) -> Path:
+        blob = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        key = hashlib.sha256(f"{kind}\n{blob}".encode("utf-8")).hexdigest()[:32]
+        return self.directory / kind / f"{key}.json"
+
+    def load(self, kind: str, request: Dict[str, Any]) -> Any:
+        path = self._path(kind, request)
+        if not path.exists():
+            raise CassetteMiss(f"no recorded {kind} response for {request}")
+        return json.loads(path.read_text(encoding="utf-8"))["response"]
+
+    def save(self, kind: str, request: Dict[str, Any], response: Any) -> None:
+        path = self._path(kind, request)
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            payload = {"kind": kind, "request": request, "response": response}
+            path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    def through(self, kind: str, request: Dict[str, Any], call: Callable[[], Any]) -> Any:
+        """Serve request from the cassette, or make the live call (recording it in record mode)."""
+        if self.mode == REPLAY:
+            if self.latency:
+                time.sleep(self.latency)
+            return self.load(kind, request)
+        response = call()
+        if self.mode == RECORD:
+            self.save(kind, request, response)
+        return response
+
+    async def athrough(self, kind: str, request: Dict[str, Any], call: Callable[[], Awaitable[Any]]) -> Any:
+        if self.mode == REPLAY:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self.load(kind, request)
+        response = await call()
+        if self.mode == RECORD:
+            self.save(kind, request, response)
+        return response
+
+
+def cassette_from_env() -> Cassette:
+    mode = os.getenv("NEV_CASSETTE", OFF).strip().lower() or OFF
+    directory = os.getenv("NEV_CASSETTE_DIR")
+    latency = float(os.getenv("NEV_REPLAY_LATENCY_MS", "0") or 0) / 1000.0
+    return Cassette(mode, Path(directory) if directory else None, latency)
+
+
+_active = cassette_from_env()
+
+
+def active() -> Cassette:
+    return _active
+
+
+def use(cassette: Cassette) -> Cassette:
+    """Install cassette as the process-wide one; returns the previous cassette."""
+    global _active
+    previous, _active = _active, cassette
+    return previous
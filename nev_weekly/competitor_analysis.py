@@ -1,10 +1,17 @@
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 import re
-import httpx
 
+from .budget import BACKFILL, STANDARD
+from .fetcher import DEFAULT_MAX_BYTES, fetch_many
+from .matcher import keyword_matcher
+from .seen import SeenStore
 from .tavily_client import TavilyWrapper
 
 
+# Only the start of each homepage is scanned for feature keywords.
+HOME_CHARS = 2000
+
+
 def _domain(url: str) -> str:
     m = re.search(r"https?://([^/]+)/?", url)
     return m.group(1) if m else url
@@ -27,51 +34,63 @@ def _keywords() -> List[str]:
     ]
 
 
-def fetch_home(url: str, timeout: float = 10.0) -> Tuple[int, str]:
-    try:
-        with httpx.Client(follow_redirects=True, timeout=timeout) as client:
-            r = client.get(url, headers={"User-Agent": "Mozilla/5.0"})
-            return r.status_code, r.text[:2000]
-    except Exception:
-        return 0, ""
+def analyze_competitors(
+    tavily: TavilyWrapper,
+    url_map: Dict[str, List[str]],
+    min_search: int = 100,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    seen: Optional[SeenStore] = None,
+) -> Dict[str, Any]:
+    entries = [(cat, u) for cat, urls in url_map.items() for u in urls]
+    queries = [
+        f"{_domain(u)} electrochromic PDLC SPD smart window automotive architectural factory partnership"
+        for _, u in entries
+    ]
+    searches = tavily.search_many(queries, max_results=10, priority=STANDARD)
 
+    # The same URL may be listed under several categories (e.g. "Others"); fetch and analyze it once.
+    # All homepages are streamed concurrently over one pooled client, reading at most max_bytes each.
+    homes = fetch_many([u for _, u in entries], max_bytes=max_bytes)
+    pages: Dict[str, Tuple[int, List[str]]] = {}
+    for u, (code, text) in homes.items():
+        hits = keyword_matcher(tuple(_keywords())).counts(text[:HOME_CHARS])
+        pages[u] = (code, [k for k in _keywords() if k in hits])
 
-def analyze_competitors(tavily: TavilyWrapper, url_map: Dict[str, List[str]], min_search: int = 100) -> Dict[str, Any]:
     items: List[Dict[str, Any]] = []
-    for cat, urls in url_map.items():
-        for u in urls:
-            code, text = fetch_home(u)
-            feats: List[str] = []
-            low = text.lower()
-            for k in _keywords():
-                if k in low and k not in feats:
-                    feats.append(k)
-            dom = _domain(u)
-            q = f"{dom} electrochromic PDLC SPD smart window automotive architectural factory partnership"
-            res = tavily.search(q, max_results=10)
-            items.append({"category": cat, "url": u, "domain": dom, "status": code, "features": feats[:6], "links": [r.get("url") for r in res][:5]})
+    for (cat, u), batch in zip(entries, searches):
+        code, feats = pages[u]
+        dom = _domain(u)
+        res = batch["results"]
+        items.append({"category": cat, "url": u, "domain": dom, "status": code, "features": feats[:6], "links": [r.get("url") for r in res][:5]})
 
     collected: List[str] = []
     for it in items:
         collected.extend(it["links"])
     collected = [x for x in collected if x]
+    # Links published in earlier runs are skipped, so min_search fills with new ones.
+    fresh = (lambda u: not seen.seen(u)) if seen else (lambda u: True)
     uniq = []
-    seen = set()
+    known = set()
     for x in collected:
-        if x in seen:
+        if x in known:
             continue
-        seen.add(x)
-        uniq.append(x)
+        known.add(x)
+        if fresh(x):
+            uniq.append(x)
 
     if len(uniq) < min_search:
-        for cat, urls in url_map.items():
-            for name in urls:
-                extra = tavily.search(f"site:{_domain(name)} smart window electrochromic", max_results=20)
-                for r in extra:
+        # Backfill in waves of `tavily.concurrency` so the quota stops once min_search is reached.
+        domains = list(dict.fromkeys(_domain(name) for _, name in entries))
+        backfill = [f"site:{dom} smart window electrochromic" for dom in domains]
+        wave = tavily.concurrency
+        for start in range(0, len(backfill), wave):
+            for batch in tavily.search_many(backfill[start : start + wave], max_results=20, priority=BACKFILL):
+                for r in batch["results"]:
                     u = r.get("url")
-                    if u and u not in seen:
-                        seen.add(u)
-                        uniq.append(u)
+                    if u and u not in known:
+                        known.add(u)
+                        if fresh(u):
+                            uniq.append(u)
                     if len(uniq) >= min_search:
                         break
                 if len(uniq) >= min_search:
@@ -0,0 +1,111 @@
+import asyncio
+import codecs
+import re
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+import httpx
+
+from . import cassette, resilience
+from .metrics import METRICS
+
+
+# Streaming page fetcher: reads at most max_bytes of each body over one pooled
+# client and decodes only that prefix. Each host has its own circuit breaker;
+# 5xx/429 responses and errors are retried once within the stage deadline.
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+DEFAULT_MAX_BYTES = 16 * 1024
+
+_META_CHARSET = re.compile(rb"<meta[^>]+charset=[\"']?([A-Za-z0-9_\-]+)", re.I)
+
+
+def _decoder(r: httpx.Response, head: bytes) -> codecs.IncrementalDecoder:
+    encoding = r.charset_encoding
+    if not encoding:
+        m = _META_CHARSET.search(head)
+        encoding = m.group(1).decode("ascii") if m else "utf-8"
+    try:
+        return codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def _decode(r: httpx.Response, body: bytes) -> str:
+    # final=False drops a multi-byte character cut off by the byte budget.
+    return _decoder(r, body).decode(body, final=False)
+
+
+async def _stream_prefix(client: httpx.AsyncClient, url: str, max_bytes: int) -> Tuple[int, str]:
+    async with client.stream("GET", url, headers=HEADERS) as r:
+        buf = bytearray()
+        async for chunk in r.aiter_bytes():
+            buf.extend(chunk)
+            if len(buf) >= max_bytes:
+                break
+    METRICS.observe("http.fetch.bytes", len(buf))
+    return r.status_code, _decode(r, bytes(buf[:max_bytes]))
+
+
+def _retryable_status(result: Tuple[int, str]) -> bool:
+    return result[0] >= 500 or result[0] == 429
+
+
+async def stream_text(
+    client: httpx.AsyncClient, url: str, feed: Callable[[str], bool], max_bytes: int = DEFAULT_MAX_BYTES
+) -> Tuple[int, int]:
+    """Decode the body chunk by chunk into feed(text), stopping at max_bytes or when feed returns True.
+
+    Nothing is buffered beyond the current chunk; returns (status, bytes read).
+    """
+    read = 0
+    async with client.stream("GET", url, headers=HEADERS) as r:
+        decoder = None
+        async for chunk in r.aiter_bytes():
+            chunk = chunk[: max_bytes - read]
+            read += len(chunk)
+            decoder = decoder or _decoder(r, chunk)
+            if feed(decoder.decode(chunk, final=False)) or read >= max_bytes:
+                break
+    METRICS.observe("http.fetch.bytes", read)
+    return r.status_code, read
+
+
+async def fetch_prefix(client: httpx.AsyncClient, url: str, max_bytes: int = DEFAULT_MAX_BYTES) -> Tuple[int, str]:
+    METRICS.incr("http.fetch.requests")
+    try:
+        with METRICS.timer("http.fetch.latency_ms"):
+            code, text = await resilience.acall(
+                lambda: cassette.active().athrough(
+                    "fetch", {"url": url, "max_bytes": max_bytes}, lambda: _stream_prefix(client, url, max_bytes)
+                ),
+                f"host:{urlsplit(url).netloc.lower()}",
+                failed=_retryable_status,
+            )
+        return code, text
+    except Exception as e:
+        METRICS.error("http.fetch", f"{url}: {type(e).__name__}: {e}")
+        return 0, ""
+
+
+async def fetch_many_async(
+    urls: List[str],
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    concurrency: int = 10,
+    timeout: float = 10.0,
+) -> Dict[str, Tuple[int, str]]:
+    unique = list(dict.fromkeys(urls))
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, limits=limits) as client:
+
+        async def one(u: str) -> Tuple[int, str]:
+            async with slots:
+                return await fetch_prefix(client, u, max_bytes)
+
+        results = await asyncio.gather(*(one(u) for u in unique))
+    return dict(zip(unique, results))
+
+
+def fetch_many(urls: List[str], **kwargs) -> Dict[str, Tuple[int, str]]:
+    return asyncio.run(fetch_many_async(urls, **kwargs))
@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .publish import atomic_write
+
+
+# Week-by-week snapshots of the structured newsletter sections. The snapshots
+# live in data/history.jsonl, one line per ISO week in week order, which the
+# weekly workflow commits: a new week appends a line and a re-run replaces
+# only its own line, so the git history stays a readable diff. On open the
+# lines are loaded into an in-memory SQLite database whose indexed tables hold
+# the fields trend queries need (sales ranks, dimming URLs, VIP coverage), so
+# week-over-week movement is a local lookup instead of extra API calls.
+
+DEFAULT_HISTORY_PATH = Path("data") / "history.jsonl"
+# Earlier releases kept the snapshots in a committed SQLite file; it is imported once.
+LEGACY_HISTORY_PATH = Path("data") / "history.sqlite"
+
+
+def week_key(when: datetime) -> str:
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def history_path() -> Path:
+    return Path(os.getenv("NEV_HISTORY_PATH") or DEFAULT_HISTORY_PATH)
+
+
+class HistoryStore:
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path else history_path()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE snapshots ("
+            " week TEXT PRIMARY KEY, generated_at TEXT NOT NULL, sections TEXT NOT NULL);"
+            "CREATE TABLE sales ("
+            " week TEXT NOT NULL, band TEXT NOT NULL, model_id TEXT NOT NULL, model TEXT NOT NULL,"
+            " rank INTEGER NOT NULL, PRIMARY KEY (week, band, model_id));"
+            "CREATE INDEX sales_model ON sales (band, model_id, week);"
+            "CREATE TABLE dimming ("
+            " week TEXT NOT NULL, url TEXT NOT NULL, title TEXT NOT NULL, score INTEGER NOT NULL,"
+            " PRIMARY KEY (week, url));"
+            "CREATE INDEX dimming_url ON dimming (url, week);"
+            "CREATE TABLE vip ("
+            " week TEXT NOT NULL, name TEXT NOT NULL, items INTEGER NOT NULL, PRIMARY KEY (week, name));"
+        )
+        for week, sections in self._snapshots():
+            self._insert(week, sections)
+        self._db.commit()
+
+    def _snapshots(self) -> List[Tuple[str, Dict[str, Any]]]:
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as fh:
+                lines = [json.loads(line) for line in fh if line.strip()]
+            return [(it["week"], it["sections"]) for it in lines]
+        legacy = self.path.with_name(LEGACY_HISTORY_PATH.name)
+        if self.path.suffix != ".jsonl" or not legacy.exists():
+            return []
+        db = sqlite3.connect(str(legacy))
+        try:
+            rows = db.execute("SELECT week, sections FROM snapshots ORDER BY week").fetchall()
+        finally:
+            db.close()
+        self._dirty = bool(rows)
+        return [(week, json.loads(blob)) for week, blob in rows]
+
+    def flush(self) -> None:
+        """Rewrite data/history.jsonl if any week was saved since it was read."""
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = self._db.execute("SELECT week, sections FROM snapshots ORDER BY week").fetchall()
+            # The week leads each line; the sections were stored with sorted keys.
+            lines = [json.dumps({"week": week, "sections": json.loads(blob)}, ensure_ascii=False) for week, blob in rows]
+            atomic_write(self.path, "".join(line + "\n" for line in lines).encode("utf-8"))
+            self._dirty = False
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def save(self, week: str, sections: Dict[str, Any]) -> None:
+        """Store (or replace) one week's snapshot; written to disk on flush()/close()."""
+        with self._lock, self._db:
+            self._insert(week, json.loads(json.dumps(sections, default=str)))
+            self._dirty = True
+
+    def _insert(self, week: str, sections: Dict[str, Any]) -> None:
+        generated = str(sections.get("meta", {}).get("generated_at", ""))
+        sales = [
+            (week, band, r.get("model_id") or r.get("model", ""), r.get("model", ""), int(r.get("rank") or 0))
+            for band, rows in (sections.get("sales") or {}).items()
+            for r in rows
+        ]
+        dimming = [
+            (week, it.get("url", ""), it.get("title", ""), int(it.get("score") or 0))
+            for it in sections.get("dimming_news") or []
+            if it.get("url")
+        ]
+        vips = [
+            (week, it.get("name", ""), len(it.get("sources") or []) + len(it.get("quotes") or []))
+            for it in sections.get("vip_voices") or []
+        ]
+        blob = json.dumps(sections, ensure_ascii=False, sort_keys=True)
+        for table in ("snapshots", "sales", "dimming", "vip"):
+            self._db.execute(f"DELETE FROM {table} WHERE week = ?", (week,))
+        self._db.execute("INSERT INTO snapshots (week, generated_at, sections) VALUES (?, ?, ?)", (week, generated, blob))
+        self._db.executemany("INSERT OR REPLACE INTO sales VALUES (?, ?, ?, ?, ?)", sales)
+        self._db.executemany("INSERT OR REPLACE INTO dimming VALUES (?, ?, ?, ?)", dimming)
+        self._db.executemany("INSERT OR REPLACE INTO vip VALUES (?, ?, ?)", vips)
+
+    def load(self, week: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT sections FROM snapshots WHERE week = ?", (week,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def previous_week(self, week: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT MAX(week) FROM snapshots WHERE week < ?", (week,)).fetchone()
+        return row[0] if row else None
+
+    def rank_changes(self, week: str) -> List[Dict[str, Any]]:
+        """Sales entries of `week` with their rank in the previous stored week.
+
+        delta is positive when a model moved up; status is new/up/down/same.
+        """
+        prev = self.previous_week(week)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT cur.band, cur.model_id, cur.model, cur.rank, old.rank FROM sales cur"
+                " LEFT JOIN sales old ON old.week = ? AND old.band = cur.band AND old.model_id = cur.model_id"
+                " WHERE cur.week = ? ORDER BY cur.band, cur.rank",
+                (prev or "", week),
+            ).fetchall()
+        out = []
+        for band, model_id, model, rank, previous in rows:
+            if previous is None:
+                delta, status = None, "new"
+            else:
+                delta = previous - rank
+                status = "up" if delta > 0 else "down" if delta < 0 else "same"
+            out.append({
+                "band": band, "model_id": model_id, "model": model,
+                "rank": rank, "previous_rank": previous, "delta": delta, "status": status,
+            })
+        return out
+
+    def dimming_novelty(self, week: str) -> List[Dict[str, Any]]:
+        """Dimming items of `week`, marked "new" or "returning" (seen in any earlier week)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT cur.url, cur.title, cur.score,"
+                " (SELECT MIN(week) FROM dimming old WHERE old.url = cur.url AND old.week < cur.week)"
+                " FROM dimming cur WHERE cur.week = ? ORDER BY cur.score DESC",
+                (week,),
+            ).fetchall()
+        return [
+            {"url": url, "title": title, "score": score,
+             "status": "new" if first is None else "returning", "first_seen": first or week}
+            for url, title, score, first in rows
+        ]
+
+    def vip_frequency(self, until: Optional[str] = None, weeks: int = 8) -> List[Dict[str, Any]]:
+        """How many of the last `weeks` stored weeks (up to `until`) each VIP had coverage in."""
+        with self._lock:
+            window = [
+                r[0] for r in self._db.execute(
+                    "SELECT week FROM snapshots WHERE week <= ? ORDER BY week DESC LIMIT ?",
+                    (until or "9999", weeks),
+                )
+            ]
+            if not window:
+                return []
+            marks = ",".join("?" * len(window))
+            rows = self._db.execute(
+                "SELECT name, SUM(items > 0), SUM(items), MAX(CASE WHEN items > 0 THEN week END)"
+                f" FROM vip WHERE week IN ({marks}) GROUP BY name ORDER BY SUM(items > 0) DESC, SUM(items) DESC, name",
+                window,
+            ).fetchall()
+        return [
+            {"name": name, "weeks_covered": int(covered or 0), "weeks": len(window),
+             "items": int(items or 0), "last_seen": last}
+            for name, covered, items, last in rows
+        ]
+
+    def trends(self, week: str) -> Dict[str, Any]:
+        novelty = self.dimming_novelty(week)
+        return {
+            "week": week,
+            "previous_week": self.previous_week(week),
+            "sales": self.rank_changes(week),
+            "dimming": novelty,
+            "dimming_new": sum(1 for it in novelty if it["status"] == "new"),
+            "dimming_returning": sum(1 for it in novelty if it["status"] == "returning"),
+            "vip_frequency": self.vip_frequency(until=week),
+        }
@@ -1,15 +1,148 @@
-from typing import List, Dict
+import asyncio
+import time
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlsplit
 import httpx
 
+from . import cassette, resilience
+from .link_store import LinkStore
+from .metrics import METRICS
 
-def check_links(urls: List[str]) -> List[Dict]:
-    out: List[Dict] = []
-    for u in urls:
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+# Servers that reject or mishandle HEAD; retry these with a one-byte ranged GET.
+_HEAD_FALLBACK = {400, 403, 404, 405, 501}
+# Links that passed within this window are taken from the store without a request.
+DEFAULT_MAX_AGE = 3 * 24 * 3600
+# Results are written to the store in batches of this size, so a run cut short keeps what it checked.
+FLUSH_EVERY = 50
+
+
+def _validators(r: httpx.Response) -> Tuple[int, Optional[str], Optional[str]]:
+    return r.status_code, r.headers.get("etag"), r.headers.get("last-modified")
+
+
+async def _probe(client: httpx.AsyncClient, url: str, headers: Dict[str, str]) -> Tuple[int, Optional[str], Optional[str]]:
+    status, etag, modified = await cassette.active().athrough(
+        "link", {"url": url, "headers": headers}, lambda: _live_probe(client, url, headers)
+    )
+    return status, etag, modified
+
+
+async def _live_probe(client: httpx.AsyncClient, url: str, headers: Dict[str, str]) -> Tuple[int, Optional[str], Optional[str]]:
+    r = await client.head(url, headers=headers)
+    if r.status_code not in _HEAD_FALLBACK:
+        return _validators(r)
+    # Stream so a server that ignores Range still doesn't make us download the body.
+    async with client.stream("GET", url, headers={**headers, "Range": "bytes=0-0"}) as r:
+        return _validators(r)
+
+
+async def check_links_async(
+    urls: List[str],
+    concurrency: int = 20,
+    per_host: int = 2,
+    timeout: float = 8.0,
+    deadline: float = 60.0,
+    store: Optional[LinkStore] = None,
+    max_age: float = DEFAULT_MAX_AGE,
+    full_recheck: bool = False,
+) -> List[Dict]:
+    global_slots = asyncio.Semaphore(concurrency)
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+    stop_at = time.monotonic() + deadline
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, limits=limits) as client:
+
+        async def check(u: str) -> Dict:
+            prev = store.get(u) if store is not None and not full_recheck else None
+            if prev and prev["ok"] and time.time() - prev["checked_at"] < max_age:
+                METRICS.incr("links.store")
+                return {"url": u, "status": prev["status"], "ok": True, "source": "store"}
+
+            headers = dict(HEADERS)
+            if prev and prev["ok"]:
+                if prev["etag"]:
+                    headers["If-None-Match"] = prev["etag"]
+                if prev["last_modified"]:
+                    headers["If-Modified-Since"] = prev["last_modified"]
+            host = urlsplit(u).netloc.lower()
+            slot = host_slots.setdefault(host, asyncio.Semaphore(per_host))
+            try:
+                # Host slot first: a task queued behind a busy host must not hold a global slot.
+                async with slot, global_slots:
+                    # The host's breaker skips the rest of a dead domain's links quickly.
+                    with METRICS.timer("http.link.latency_ms"):
+                        status, etag, modified = await resilience.acall(
+                            lambda: _probe(client, u, headers),
+                            f"host:{host}",
+                            timeout=stop_at - time.monotonic(),
+                            failed=lambda r: r[0] >= 500 or r[0] == 429,
+                        )
+            except resilience.NOT_RETRYABLE as e:
+                # Out of time, breaker open or not recorded: the link was never checked, so it is
+                # neither reported as broken nor stored.
+                METRICS.incr("links.skipped")
+                return {"url": u, "status": 0, "ok": False, "source": "skipped", "reason": type(e).__name__}
+            except Exception as e:
+                METRICS.error("http.link", f"{u}: {type(e).__name__}: {e}")
+                status, etag, modified = 0, None, None
+
+            if status == 304 and prev:
+                result = {"url": u, "status": prev["status"], "ok": True, "source": "revalidated"}
+                etag, modified = etag or prev["etag"], modified or prev["last_modified"]
+            else:
+                result = {"url": u, "status": status, "ok": 200 <= status < 400, "source": "checked"}
+            METRICS.incr(f"links.{result['source']}")
+            updates.append({**result, "etag": etag, "last_modified": modified})
+            if len(updates) >= FLUSH_EVERY:
+                flush()
+            return result
+
+        def flush() -> None:
+            if store is not None and updates:
+                store.put_many(updates)
+            updates.clear()
+
+        # Store writes are batched: one transaction per FLUSH_EVERY results, plus the rest at the end
+        # (also when the check fails or is cancelled partway).
+        updates: List[Dict] = []
         try:
-            with httpx.Client(follow_redirects=True, timeout=8.0) as client:
-                r = client.get(u, headers={"User-Agent": "Mozilla/5.0"})
-                ok = 200 <= r.status_code < 400
-                out.append({"url": u, "status": r.status_code, "ok": ok})
-        except Exception:
-            out.append({"url": u, "status": 0, "ok": False})
-    return out
+            results = list(await asyncio.gather(*(check(u) for u in urls)))
+        finally:
+            flush()
+    return results
+
+
+def check_links(urls: List[str], **kwargs) -> List[Dict]:
+    return asyncio.run(check_links_async(urls, **kwargs))
+
+
+def format_link_report(results: List[Dict]) -> str:
+    by_source: Dict[str, List[Dict]] = {}
+    for x in results:
+        by_source.setdefault(x.get("source", "checked"), []).append(x)
+    skipped = by_source.get("skipped", [])
+    bad = [x for x in results if not x.get("ok") and x.get("source") != "skipped"]
+    lines = [
+        "# Link Validation Report",
+        f"Total checked: {len(results) - len(skipped)}",
+        f"Invalid: {len(bad)}",
+        f"From store: {len(by_source.get('store', []))}",
+        f"Revalidated (not modified): {len(by_source.get('revalidated', []))}",
+        f"Rechecked: {len(by_source.get('checked', []))}",
+        f"Skipped (not checked): {len(skipped)}",
+        "",
+        "## Invalid Links",
+    ]
+    for x in bad:
+        lines.append(f"- {x['url']} status={x['status']}")
+    if skipped:
+        lines.extend(["", "## Skipped (deadline or open circuit; not checked)"])
+        lines.extend(f"- {x['url']} ({x.get('reason', '')})" for x in skipped)
+    for source, title in (("store", "From Store"), ("revalidated", "Revalidated"), ("checked", "Rechecked")):
+        if by_source.get(source):
+            lines.extend(["", f"## {title}"])
+            lines.extend(f"- {x['url']} status={x['status']}" for x in by_source[source])
+    return "\n".join(lines)
@@ -0,0 +1,57 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from .cache import cache_dir
+
+
+# Remembers the last validation result of every link (status, validators,
+# time checked) so steady-state runs can skip or conditionally revalidate.
+
+
+class LinkStore:
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path else cache_dir() / "links.sqlite"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            " url TEXT PRIMARY KEY, status INTEGER NOT NULL, ok INTEGER NOT NULL,"
+            " etag TEXT, last_modified TEXT, checked_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, ok, etag, last_modified, checked_at FROM links WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "url": url,
+            "status": row[0],
+            "ok": bool(row[1]),
+            "etag": row[2],
+            "last_modified": row[3],
+            "checked_at": row[4],
+        }
+
+    def put_many(self, records: Iterable[Dict]) -> None:
+        """Write several {"url", "status", "ok", "etag", "last_modified"} records in one transaction."""
+        now = time.time()
+        rows = [
+            (r["url"], r["status"], int(r["ok"]), r.get("etag"), r.get("last_modified"), r.get("checked_at") or now)
+            for r in records
+        ]
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO links (url, status, ok, etag, last_modified, checked_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
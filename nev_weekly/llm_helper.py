@@ -1,47 +1,220 @@
+import hashlib
+import importlib.util
+import json
 import os
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
 
-try:
-    from openai import OpenAI  # type: ignore
-except Exception:
-    OpenAI = None  # type: ignore
+from . import cassette, resilience
+from .cache import DiskCache, refresh_requested
+from .metrics import METRICS
+from .prompt_builder import SECTIONS, compact_competitors, compact_section, compact_sections
+
+
+def _fallback_section(sections: Dict[str, Any], key: str) -> List[str]:
+    parts: List[str] = []
+    if key == "sales":
+        parts.append("Sales Rankings (>250k and >350k):")
+        for band, items in sections.get("sales", {}).items():
+            parts.append(f"- {band}:")
+            for r in items:
+                parts.append(f"  {r.get('rank','')}. {r.get('model','')} ({r.get('price_hint','')})")
+    elif key == "launches":
+        parts.append("New Car Launches:")
+        for it in sections.get("launches", []):
+            parts.append(f"- {it.get('model','')} | {it.get('price','N/A')} | Highlights: {', '.join(it.get('highlights', []))}")
+    elif key == "upcoming":
+        parts.append("Upcoming (Next Month):")
+        for it in sections.get("upcoming", []):
+            parts.append(f"- {it.get('model','')} | {it.get('notes','')}")
+    elif key == "vip_voices":
+        parts.append("VIP Voices (Last 7 Days):")
+        for it in sections.get("vip_voices", []):
+            parts.append(f"- {it.get('name','')}: {it.get('summary','')}")
+    elif key == "dimming_news":
+        parts.append("Smart Dimming Top 10:")
+        for it in sections.get("dimming_news", []):
+            parts.append(f"- {it.get('title','')} | {it.get('summary','')}")
+    return parts
 
 
 def _fallback_report(sections: Dict[str, Any]) -> str:
     parts = []
     parts.append("NEV Weekly Report")
     parts.append(f"Generated: {sections.get('meta', {}).get('generated_at', '')}")
-    parts.append("")
-    parts.append("Sales Rankings (>250k and >350k):")
-    for band, items in sections.get("sales", {}).items():
-        parts.append(f"- {band}:")
-        for r in items:
-            parts.append(f"  {r.get('rank','')}. {r.get('model','')} ({r.get('price_hint','')})")
-    parts.append("")
-    parts.append("New Car Launches:")
-    for it in sections.get("launches", []):
-        parts.append(f"- {it.get('model','')} | {it.get('price','N/A')} | Highlights: {', '.join(it.get('highlights', []))}")
-    parts.append("")
-    parts.append("Upcoming (Next Month):")
-    for it in sections.get("upcoming", []):
-        parts.append(f"- {it.get('model','')} | {it.get('notes','')}")
-    parts.append("")
-    parts.append("VIP Voices (Last 7 Days):")
-    for it in sections.get("vip_voices", []):
-        parts.append(f"- {it.get('name','')}: {it.get('summary','')}")
-    parts.append("")
-    parts.append("Smart Dimming Top 10:")
-    for it in sections.get("dimming_news", []):
-        parts.append(f"- {it.get('title','')} | {it.get('summary','')}")
+    for key, _, _ in SECTIONS:
+        parts.append("")
+        parts.extend(_fallback_section(sections, key))
     return "\n".join(parts)
 
 
-def format_weekly_report(sections: Dict[str, Any]) -> str:
+MODEL = "gpt-4o-mini"
+# Completions are cached by a hash of model + prompt + payload, so re-runs on unchanged data skip the LLM.
+RESPONSE_TTL = 30 * 24 * 3600
+# Per-request timeout; retries are left to the resilience layer so they respect the stage deadline.
+REQUEST_TIMEOUT = float(os.getenv("NEV_LLM_TIMEOUT", "90"))
+
+_lock = threading.Lock()
+_client: Any = None
+_cache: Optional[DiskCache] = None
+
+
+def _openai_installed() -> bool:
+    # The SDK is only imported when a live client is built; checking for it is cheap.
+    return importlib.util.find_spec("openai") is not None
+
+
+def _llm_available() -> bool:
+    return bool(os.getenv("OPENAI_API_KEY") and _openai_installed()) or cassette.active().replaying
+
+
+def _get_client() -> Any:
+    """One OpenAI client per process, created on first use."""
+    global _client
     api_key = os.getenv("OPENAI_API_KEY")
-    if not (OpenAI and api_key):
+    # No live client is needed when every completion is replayed from a cassette.
+    if not (api_key and _openai_installed()):
+        return None
+    with _lock:
+        if _client is None:
+            from openai import OpenAI  # type: ignore
+
+            _client = OpenAI(api_key=api_key, timeout=REQUEST_TIMEOUT, max_retries=0)
+        return _client
+
+
+def _response_cache() -> DiskCache:
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = DiskCache(namespace="llm", ttl=RESPONSE_TTL, refresh=refresh_requested())
+        return _cache
+
+
+def _live_chat(client: Any, messages: List[Dict[str, str]], temperature: float, stream: bool = False) -> Dict[str, Any]:
+    if not stream:
+        resp = client.chat.completions.create(model=MODEL, messages=messages, temperature=temperature)
+        usage = getattr(resp, "usage", None)
+        return {
+            "content": resp.choices[0].message.content or "",
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
+    started = time.perf_counter()
+    chunks: List[str] = []
+    usage = None
+    resp = client.chat.completions.create(
+        model=MODEL,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    for event in resp:
+        if getattr(event, "usage", None) is not None:
+            usage = event.usage
+        for choice in getattr(event, "choices", None) or []:
+            delta = getattr(choice.delta, "content", None)
+            if delta:
+                if not chunks:
+                    METRICS.observe("llm.first_token_ms", (time.perf_counter() - started) * 1000.0)
+                chunks.append(delta)
+    return {
+        "content": "".join(chunks),
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+
+def _chat(messages: List[Dict[str, str]], temperature: float, stream: bool = False) -> str:
+    blob = json.dumps({"model": MODEL, "messages": messages, "temperature": temperature}, sort_keys=True, ensure_ascii=False)
+    key = hashlib.sha256(blob.encode("utf-8")).hexdigest()
+    # Record/replay runs go straight to the cassette so recordings stay authoritative.
+    cache = _response_cache() if cassette.active().mode == cassette.OFF else None
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return cached
+
+    client = _get_client()
+    METRICS.incr("llm.calls")
+    with METRICS.timer("llm.latency_ms"):
+        # Completions cost tokens, so they are retried but never hedged.
+        out = resilience.call(
+            lambda: cassette.active().through(
+                "llm",
+                {"model": MODEL, "messages": messages, "temperature": temperature},
+                lambda: _live_chat(client, messages, temperature, stream=stream),
+            ),
+            "llm",
+            attempts=2,
+            base=2.0,
+            idempotent=False,
+        )
+    METRICS.incr("llm.prompt_tokens", out["prompt_tokens"])
+    METRICS.incr("llm.completion_tokens", out["completion_tokens"])
+    if cache is not None and out["content"]:
+        cache.set(key, out["content"])
+    return out["content"]
+
+
+def _guarded(fn: Callable[[], str], fallback: Callable[[], str]) -> str:
+    try:
+        return fn() or fallback()
+    except Exception as e:
+        METRICS.error("llm", f"{type(e).__name__}: {e}")
+        return fallback()
+
+
+def _summarize_section(sections: Dict[str, Any], key: str, title: str) -> str:
+    fallback = lambda: "\n".join(_fallback_section(sections, key)[1:]) or "- No items this week."
+    payload = compact_section(sections, key)
+    if "\n" not in payload:
+        return fallback()  # nothing but the heading: no data, no request
+    prompt = (
+        "You are an automotive industry analyst writing one section of an NEV weekly newsletter. "
+        f"Summarize the {title} data as 3-6 factual bullet points. Do not add a heading."
+    )
+    return _guarded(
+        lambda: _chat([{"role": "system", "content": prompt}, {"role": "user", "content": payload}], temperature=0.3, stream=True),
+        fallback,
+    )
+
+
+def _format_weekly_report_mapreduce(sections: Dict[str, Any]) -> str:
+    # Map: every section is summarized concurrently and falls back on its own.
+    with ThreadPoolExecutor(max_workers=len(SECTIONS), thread_name_prefix="llm") as pool:
+        futures = [(title, pool.submit(resilience.bind(_summarize_section), sections, key, title)) for key, title, _ in SECTIONS]
+        summaries = [(title, fut.result()) for title, fut in futures]
+
+    # Reduce: a short executive summary over the section summaries only.
+    digest = "\n\n".join(f"## {title}\n{body}" for title, body in summaries)
+    prompt = (
+        "You are an automotive industry analyst. Write a 3-4 sentence executive summary "
+        "of this NEV weekly newsletter. Keep it factual."
+    )
+    executive = _guarded(
+        lambda: _chat([{"role": "system", "content": prompt}, {"role": "user", "content": digest}], temperature=0.3, stream=True),
+        lambda: "",
+    )
+
+    parts = ["NEV Weekly Report", f"Generated: {sections.get('meta', {}).get('generated_at', '')}"]
+    if executive:
+        parts.extend(["", "Executive Summary", executive])
+    for title, body in summaries:
+        parts.extend(["", f"{title}:", body])
+    return "\n".join(parts)
+
+
+def format_weekly_report(sections: Dict[str, Any], mode: Optional[str] = None) -> str:
+    """Narrative for the newsletter; mode "mapreduce" (default) or "single" (NEV_LLM_MODE)."""
+    if not _llm_available():
         return _fallback_report(sections)
+    mode = (mode or os.getenv("NEV_LLM_MODE") or "mapreduce").strip().lower()
+    if mode == "mapreduce":
+        return _format_weekly_report_mapreduce(sections)
     try:
-        client = OpenAI(api_key=api_key)
         prompt = (
             "You are an automotive industry analyst. "
             "Generate a concise, professional NEV Weekly report with clear sections: "
@@ -50,21 +223,16 @@ def format_weekly_report(sections: Dict[str, Any]) -> str:
         )
         content = {
             "role": "user",
-            "content": f"Summarize this structured data into a weekly report:\n{sections}",
+            "content": f"Summarize this structured data into a weekly report:\n{compact_sections(sections)}",
         }
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "system", "content": prompt}, content],
-            temperature=0.3,
-        )
-        return resp.choices[0].message.content or _fallback_report(sections)
-    except Exception:
+        return _chat([{"role": "system", "content": prompt}, content], temperature=0.3) or _fallback_report(sections)
+    except Exception as e:
+        METRICS.error("llm", f"{type(e).__name__}: {e}")
         return _fallback_report(sections)
 
 
 def format_competitor_report(data: Dict[str, Any]) -> str:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not (OpenAI and api_key):
+    if not _llm_available():
         lines = []
         lines.append("# Competitor Analysis")
         lines.append(f"Total competitors: {data.get('total_competitors', 0)}")
@@ -74,17 +242,12 @@ def format_competitor_report(data: Dict[str, Any]) -> str:
             lines.append(f"- [{it.get('category','')}] {it.get('domain','')} status={it.get('status',0)} features={', '.join(it.get('features', []))}")
         return "\n".join(lines)
     try:
-        client = OpenAI(api_key=api_key)
         prompt = (
             "Generate a concise competitor analysis in Markdown with headings per category, "
             "bulleted features per company, and note notable partnerships, manufacturing, and patents."
         )
-        content = {"role": "user", "content": f"Analyze this competitor dataset:\n{data}"}
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "system", "content": prompt}, content],
-            temperature=0.2,
-        )
-        return resp.choices[0].message.content or ""
-    except Exception:
+        content = {"role": "user", "content": f"Analyze this competitor dataset:\n{compact_competitors(data)}"}
+        return _chat([{"role": "system", "content": prompt}, content], temperature=0.2)
+    except Exception as e:
+        METRICS.error("llm", f"{type(e).__name__}: {e}")
         return ""
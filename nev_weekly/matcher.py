@@ -0,0 +1,69 @@
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+# Aho-Corasick automaton for case-insensitive multi-keyword matching: one pass
+# over the text finds every occurrence of every pattern, so cost stays linear
+# in the text length no matter how many keywords are configured.
+
+
+class KeywordMatcher:
+    def __init__(self, patterns: Iterable[str]) -> None:
+        # Several configured spellings may normalize to the same key ("PDLC" / "pdlc").
+        self.originals: Dict[str, List[str]] = {}
+        for p in patterns:
+            key = p.lower()
+            if key and p not in self.originals.setdefault(key, []):
+                self.originals[key].append(p)
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+        for key in self.originals:
+            node = 0
+            for ch in key:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(key)
+
+        # Breadth-first failure links; depth-1 nodes keep the root (0) as their failure link.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[child] = self._goto[f].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, key) for every, possibly overlapping, match; key is the lower-cased pattern."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text.lower()):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for key in out[node]:
+                yield i + 1 - len(key), i + 1, key
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """Occurrence count per configured pattern (original spelling) found in text."""
+        hits: Dict[str, int] = {}
+        for _, _, key in self.finditer(text):
+            hits[key] = hits.get(key, 0) + 1
+        return {orig: n for key, n in hits.items() for orig in self.originals[key]}
+
+
+@lru_cache(maxsize=32)
+def keyword_matcher(patterns: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(patterns)
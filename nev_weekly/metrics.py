@@ -0,0 +1,140 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+# Process-wide run metrics: counters, value distributions (count/sum/min/max),
+# free-form gauges and recent errors, dumped as JSON at the end of a run.
+# Optional per-stage cProfile capture is merged into one pstats file; stages
+# overlapping a profiled one run unprofiled.
+
+DEFAULT_METRICS_PATH = Path("build") / "run_metrics.json"
+DEFAULT_PROFILE_PATH = Path("build") / "profile.pstats"
+MAX_ERRORS = 50
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self.counters: Dict[str, float] = {}
+            self.observations: Dict[str, Dict[str, float]] = {}
+            self.gauges: Dict[str, Any] = {}
+            self.errors: List[Dict[str, str]] = []
+            self.profiles: List[cProfile.Profile] = []
+
+    def incr(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            o = self.observations.get(name)
+            if o is None:
+                self.observations[name] = {"count": 1, "sum": value, "min": value, "max": value}
+            else:
+                o["count"] += 1
+                o["sum"] += value
+                o["min"] = min(o["min"], value)
+                o["max"] = max(o["max"], value)
+
+    def gauge(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.gauges[name] = value
+
+    def error(self, scope: str, message: str) -> None:
+        self.incr(f"{scope}.errors")
+        with self._lock:
+            if len(self.errors) < MAX_ERRORS:
+                self.errors.append({"scope": scope, "error": message[:300]})
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Observe the wall time of the block in milliseconds under name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            observations = {
+                k: {**v, "mean": v["sum"] / v["count"]} for k, v in sorted(self.observations.items())
+            }
+            return {
+                "started_at": self.started,
+                "wall_seconds": round(time.time() - self.started, 3),
+                "counters": dict(sorted(self.counters.items())),
+                "observations": observations,
+                "gauges": dict(self.gauges),
+                "errors": list(self.errors),
+            }
+
+    def write(self, path: Optional[Path] = None) -> Path:
+        path = Path(path or os.getenv("NEV_METRICS_PATH") or DEFAULT_METRICS_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.snapshot(), ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        return path
+
+    # --- profiling ---------------------------------------------------------
+
+    def profiled(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call fn, capturing a cProfile of it when NEV_PROFILE is set.
+
+        Only one profiler may be active at a time (Python 3.12+ refuses a
+        second one), so a stage that starts while another is being profiled
+        runs unprofiled and is counted under profile.skipped.
+        """
+        if not profiling_enabled():
+            return fn(*args, **kwargs)
+        if not self._profiling.acquire(blocking=False):
+            self.incr("profile.skipped")
+            return fn(*args, **kwargs)
+        try:
+            prof = cProfile.Profile()
+            try:
+                prof.enable()
+            except ValueError:
+                # Another profiling tool (debugger, coverage) already owns the hook.
+                self.incr("profile.skipped")
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                with self._lock:
+                    self.profiles.append(prof)
+        finally:
+            self._profiling.release()
+
+    def dump_profile(self, path: Optional[Path] = None) -> Optional[Path]:
+        with self._lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+        path = Path(path or os.getenv("NEV_PROFILE_PATH") or DEFAULT_PROFILE_PATH)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        stats = pstats.Stats(profiles[0])
+        for prof in profiles[1:]:
+            stats.add(prof)
+        stats.dump_stats(str(path))
+        return path
+
+
+def profiling_enabled() -> bool:
+    return os.getenv("NEV_PROFILE", "").strip().lower() in ("1", "true", "yes")
+
+
+METRICS = Metrics()
@@ -0,0 +1,67 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .config_loader import load_yaml_map
+from .matcher import KeywordMatcher
+
+
+# Gazetteer of NEV models: every alias in config/models.yaml resolves to one
+# canonical model ID, and a single automaton pass finds them all in a text.
+
+DEFAULT_MODELS_PATH = Path(__file__).resolve().parent.parent / "config" / "models.yaml"
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+class ModelIndex:
+    def __init__(self, table: Dict[str, Any]) -> None:
+        self.names: Dict[str, str] = {}
+        self._alias_ids: Dict[str, str] = {}
+        for model_id, entry in table.items():
+            entry = entry or {}
+            name = str(entry.get("name") or model_id)
+            self.names[model_id] = name
+            for alias in [name] + [str(a) for a in entry.get("aliases") or []]:
+                self._alias_ids.setdefault(alias.lower(), model_id)
+        self._matcher = KeywordMatcher(self._alias_ids)
+
+    @classmethod
+    def from_yaml(cls, path: Path) -> "ModelIndex":
+        return cls(load_yaml_map(path))
+
+    def find(self, text: str) -> List[Dict[str, Any]]:
+        """Non-overlapping, leftmost-longest alias hits as {"id", "name", "start", "end"}, in text order."""
+        hits = []
+        for start, end, key in self._matcher.finditer(text):
+            # Latin aliases must not be glued to other letters/digits ("L9" is not in "XL90").
+            if _is_word_char(key[0]) and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if _is_word_char(key[-1]) and end < len(text) and _is_word_char(text[end]):
+                continue
+            hits.append((start, -end, key))
+        hits.sort()
+        out: List[Dict[str, Any]] = []
+        pos = 0
+        for start, neg_end, key in hits:
+            if start < pos:
+                continue
+            model_id = self._alias_ids[key]
+            out.append({"id": model_id, "name": self.names[model_id], "start": start, "end": -neg_end})
+            pos = -neg_end
+        return out
+
+    def extract(self, text: str) -> List[Dict[str, Any]]:
+        """Distinct models in order of first mention, each with the positions of all its mentions."""
+        models: Dict[str, Dict[str, Any]] = {}
+        for hit in self.find(text):
+            entry = models.setdefault(hit["id"], {"id": hit["id"], "name": hit["name"], "positions": []})
+            entry["positions"].append((hit["start"], hit["end"]))
+        return list(models.values())
+
+
+@lru_cache(maxsize=4)
+def default_index(path: Optional[Path] = None) -> ModelIndex:
+    return ModelIndex.from_yaml(path or DEFAULT_MODELS_PATH)
@@ -0,0 +1,116 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .metrics import METRICS
+from .resilience import bind, deadline
+
+
+# Minimal DAG scheduler for the weekly run. Each stage names the stages whose
+# results it needs; a stage starts as soon as those are done, independent
+# stages run concurrently, and a stage that fails or exceeds its timeout is
+# replaced by its default/fallback so the rest of the run still completes.
+# A stage's timeout is also its deadline for outbound calls (see resilience.py),
+# so retries stop when the stage would be abandoned anyway.
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        deps: Sequence[str] = (),
+        timeout: Optional[float] = None,
+        default: Any = None,
+        fallback: Optional[Callable[..., Any]] = None,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.timeout = timeout
+        self.default = default
+        # fallback(**deps) takes precedence over default when the stage fails.
+        self.fallback = fallback
+
+
+def _validate(stages: List[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate stage names")
+    known = set(names)
+    for s in stages:
+        missing = [d for d in s.deps if d not in known]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown stages {missing}")
+    # Kahn's algorithm to reject cycles up front instead of deadlocking later.
+    indegree = {s.name: len(s.deps) for s in stages}
+    ready = [n for n, d in indegree.items() if d == 0]
+    visited = 0
+    while ready:
+        n = ready.pop()
+        visited += 1
+        for s in stages:
+            if n in s.deps:
+                indegree[s.name] -= 1
+                if indegree[s.name] == 0:
+                    ready.append(s.name)
+    if visited != len(stages):
+        raise ValueError("stage dependencies contain a cycle")
+
+
+def _call_stage(stage: Stage, inputs: Dict[str, Any]) -> Any:
+    with deadline(stage.timeout):
+        return METRICS.profiled(stage.fn, **inputs)
+
+
+def run_pipeline(stages: List[Stage], max_workers: Optional[int] = None) -> Tuple[Dict[str, Any], Dict[str, Dict]]:
+    """Run stages in dependency order; returns (results by stage name, per-stage report)."""
+    _validate(stages)
+    pending = {s.name: s for s in stages}
+    results: Dict[str, Any] = {}
+    report: Dict[str, Dict] = {}
+    running: Dict[Future, Tuple[Stage, float, Dict[str, Any]]] = {}
+    pool = ThreadPoolExecutor(max_workers=max_workers or len(stages), thread_name_prefix="stage")
+
+    def finish(stage: Stage, started: float, inputs: Dict[str, Any], status: str, value: Any = None, error: str = "") -> None:
+        if status != "ok":
+            try:
+                value = stage.fallback(**inputs) if stage.fallback else stage.default
+            except Exception as e:
+                value = stage.default
+                error = f"{error}; fallback failed: {type(e).__name__}: {e}"
+        results[stage.name] = value
+        report[stage.name] = {"status": status, "seconds": round(time.monotonic() - started, 3)}
+        METRICS.observe(f"stage.{stage.name}.seconds", report[stage.name]["seconds"])
+        if error:
+            report[stage.name]["error"] = error
+
+    try:
+        while pending or running:
+            for name in [n for n, s in pending.items() if all(d in results for d in s.deps)]:
+                stage = pending.pop(name)
+                inputs = {d: results[d] for d in stage.deps}
+                running[pool.submit(bind(_call_stage), stage, inputs)] = (stage, time.monotonic(), inputs)
+
+            now = time.monotonic()
+            deadlines = [started + st.timeout for st, started, _ in running.values() if st.timeout is not None]
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                stage, started, inputs = running.pop(fut)
+                try:
+                    finish(stage, started, inputs, "ok", fut.result())
+                except Exception as e:
+                    finish(stage, started, inputs, "failed", error=f"{type(e).__name__}: {e}")
+
+            now = time.monotonic()
+            for fut, (stage, started, inputs) in list(running.items()):
+                if stage.timeout is not None and now - started >= stage.timeout:
+                    # The worker thread cannot be killed; its eventual result is discarded.
+                    running.pop(fut)
+                    fut.cancel()
+                    finish(stage, started, inputs, "timeout", error=f"exceeded {stage.timeout}s")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, report
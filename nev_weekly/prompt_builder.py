@@ -0,0 +1,113 @@
+import re
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+# Compact, deterministic serialization of pipeline output for LLM prompts.
+# Only the fields the model needs are kept (no URLs, no duplicate category
+# entries, no run metadata) and each section is cut to a token budget, so the
+# same data always yields byte-identical prompts that can be cached.
+
+DEFAULT_SECTION_BUDGET = 600
+
+_CJK = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: one per CJK character, one per ~4 other characters."""
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _clip(text: Any, limit: int = 200) -> str:
+    s = re.sub(r"\s+", " ", str(text or "")).strip()
+    return s if len(s) <= limit else s[:limit] + "…"
+
+
+def _budgeted(title: str, lines: Iterable[str], budget: int) -> str:
+    out: List[str] = [f"## {title}"]
+    used = estimate_tokens(out[0])
+    dropped = 0
+    for line in lines:
+        # Lines arrive in rank order: once one doesn't fit, drop it and everything after it.
+        cost = estimate_tokens(line) + 1
+        if dropped or used + cost > budget:
+            dropped += 1
+            continue
+        out.append(line)
+        used += cost
+    if dropped:
+        out.append(f"(+{dropped} more omitted)")
+    return "\n".join(out)
+
+
+def _sales(data: Dict[str, List[Dict]]) -> Iterable[str]:
+    for band, rows in (data or {}).items():
+        for r in rows:
+            units = f" units={r['units']}" if r.get("units") is not None else ""
+            yield f"{band} #{r.get('rank', '')} {r.get('model', '')}{units} mentions={r.get('mentions', 1)}"
+
+
+def _launches(items: List[Dict]) -> Iterable[str]:
+    for it in items or []:
+        highlights = "; ".join(_clip(h, 80) for h in (it.get("highlights") or [])[:2])
+        yield f"- {it.get('model', '')} | {it.get('price', 'N/A')} | {highlights}"
+
+
+def _upcoming(items: List[Dict]) -> Iterable[str]:
+    for it in items or []:
+        notes = "; ".join(_clip(n, 80) for n in (it.get("notes") or [])[:2])
+        yield f"- {it.get('model', '')} | {it.get('window', '')} | {notes}"
+
+
+def _vips(items: List[Dict]) -> Iterable[str]:
+    for it in items or []:
+        quotes = " / ".join(_clip(q, 100) for q in (it.get("quotes") or [])[:2])
+        line = f"- {it.get('name', '')}: {_clip(it.get('summary'), 160)}"
+        yield line + (f" | quotes: {quotes}" if quotes else "")
+
+
+def _dimming(items: List[Dict]) -> Iterable[str]:
+    for it in items or []:
+        yield f"- [{it.get('score', 0)}] {_clip(it.get('title'), 120)} | {_clip(it.get('summary'), 160)}"
+
+
+SECTIONS: List[Tuple[str, str, Callable[[Any], Iterable[str]]]] = [
+    ("sales", "Sales Rankings", _sales),
+    ("launches", "New Launches", _launches),
+    ("upcoming", "Upcoming Releases", _upcoming),
+    ("vip_voices", "VIP Voices", _vips),
+    ("dimming_news", "Smart Dimming Intelligence", _dimming),
+]
+
+
+def compact_sections(sections: Dict[str, Any], budget: int = DEFAULT_SECTION_BUDGET) -> str:
+    """Newsletter sections as compact text, each trimmed to roughly `budget` tokens."""
+    return "\n\n".join(
+        _budgeted(title, render(sections.get(key)), budget) for key, title, render in SECTIONS
+    )
+
+
+def compact_section(sections: Dict[str, Any], key: str, budget: int = DEFAULT_SECTION_BUDGET) -> str:
+    for k, title, render in SECTIONS:
+        if k == key:
+            return _budgeted(title, render(sections.get(key)), budget)
+    raise KeyError(key)
+
+
+def compact_competitors(data: Dict[str, Any], budget: int = 4 * DEFAULT_SECTION_BUDGET) -> str:
+    """One line per competitor domain with all its categories merged; collected links are dropped."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for it in data.get("items", []):
+        entry = merged.setdefault(it.get("domain", ""), {"categories": [], "status": it.get("status", 0), "features": []})
+        if it.get("category") and it["category"] not in entry["categories"]:
+            entry["categories"].append(it["category"])
+        for f in it.get("features", []):
+            if f not in entry["features"]:
+                entry["features"].append(f)
+    lines = (
+        f"- {dom} [{', '.join(e['categories'])}] status={e['status']} features={', '.join(e['features']) or 'none'}"
+        for dom, e in merged.items()
+    )
+    header = f"competitors={len(merged)} unique_links={data.get('unique_links', 0)}"
+    return header + "\n" + _budgeted("Competitors", lines, budget)
+
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from .metrics import METRICS
+
+try:
+    import brotli  # type: ignore
+except Exception:
+    brotli = None  # type: ignore
+
+
+# Incremental, content-addressed output for public/. Files are written
+# atomically (temp file + rename) and only when their content hash changed,
+# so an unchanged week produces no git diff and no Pages redeploy. Stylesheets
+# get fingerprinted copies under assets/ that can be cached forever, and every
+# text file gets precompressed .gz (and .br when brotli is installed) siblings.
+# public/manifest.json records hashes, sizes and the asset name mapping.
+
+MANIFEST = "manifest.json"
+ASSETS_DIR = "assets"
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".md", ".svg", ".txt"}
+HEADERS = "/assets/*\n  Cache-Control: public, max-age=31536000, immutable\n"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class Publisher:
+    def __init__(self, out_dir: Path) -> None:
+        self.out_dir = Path(out_dir)
+        self._lock = threading.Lock()
+        path = self.out_dir / MANIFEST
+        try:
+            self.manifest = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            self.manifest = {}
+        self.manifest.setdefault("files", {})
+        self.manifest.setdefault("assets", {})
+        self._original = json.dumps(self.manifest, sort_keys=True)
+        self.stats = {"written": 0, "unchanged": 0}
+
+    def write(self, name: str, content: Union[str, bytes], volatile: Iterable[str] = ()) -> bool:
+        """Publish one file; returns False when it was left untouched.
+
+        Substrings in `volatile` (the run timestamp) are masked out of the change
+        hash, so a page that differs only by when it was generated is not rewritten.
+        """
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        stable = data
+        for v in volatile:
+            if v:
+                stable = stable.replace(v.encode("utf-8"), b"")
+        digest = _sha256(stable)
+        path = self.out_dir / name
+        with self._lock:
+            entry = self.manifest["files"].get(name)
+            if entry and entry.get("sha256") == digest and path.exists() and self._siblings_ok(path):
+                self.stats["unchanged"] += 1
+                METRICS.incr("publish.unchanged")
+                return False
+            atomic_write(path, data)
+            entry = {"sha256": digest, "bytes": len(data)}
+            entry.update(self._compress(path, data))
+            self.manifest["files"][name] = entry
+            self.stats["written"] += 1
+            METRICS.incr("publish.written")
+            return True
+
+    def _siblings_ok(self, path: Path) -> bool:
+        if path.suffix not in COMPRESSIBLE:
+            return True
+        if not path.with_name(path.name + ".gz").exists():
+            return False
+        return brotli is None or path.with_name(path.name + ".br").exists()
+
+    def _compress(self, path: Path, data: bytes) -> Dict[str, int]:
+        if path.suffix not in COMPRESSIBLE:
+            return {}
+        # mtime=0 keeps the .gz bytes deterministic, so unchanged inputs give unchanged outputs.
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        atomic_write(path.with_name(path.name + ".gz"), gz)
+        sizes = {"gz": len(gz)}
+        if brotli is not None:
+            br = brotli.compress(data, quality=11)
+            atomic_write(path.with_name(path.name + ".br"), br)
+            sizes["br"] = len(br)
+        return sizes
+
+    def fingerprint(self, name: str) -> Optional[str]:
+        """Publish a hashed copy of an existing asset (style.css -> assets/style.<hash>.css).
+
+        Earlier hashed copies are kept: archived pages and HTML still held in
+        CDN or browser caches keep referencing them.
+        """
+        src = self.out_dir / name
+        if not src.exists():
+            return None
+        data = src.read_bytes()
+        stem, suffix = os.path.splitext(os.path.basename(name))
+        hashed = f"{ASSETS_DIR}/{stem}.{_sha256(data)[:10]}{suffix}"
+        self.write(hashed, data)
+        with self._lock:
+            self.manifest["assets"][name] = hashed
+        return hashed
+
+    def rewrite_assets(self, html_text: str, prefix: str = "") -> str:
+        """Point stylesheet references at the fingerprinted copies."""
+        for name, hashed in self.manifest["assets"].items():
+            pattern = r'(href=["\'])(?:\./)?' + re.escape(name) + r'(["\'])'
+            html_text = re.sub(pattern, lambda m: m.group(1) + prefix + hashed + m.group(2), html_text)
+        return html_text
+
+    def finish(self) -> bool:
+        """Write _headers and the manifest; both are left alone when nothing changed."""
+        self.write("_headers", HEADERS)
+        with self._lock:
+            blob = json.dumps(self.manifest, sort_keys=True)
+            if blob == self._original and (self.out_dir / MANIFEST).exists():
+                return False
+            atomic_write(self.out_dir / MANIFEST, json.dumps(self.manifest, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+            self._original = blob
+            return True
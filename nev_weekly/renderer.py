@@ -1,10 +1,214 @@
-from typing import Dict, Any
+import html
+import io
+import re
+from typing import Any, Callable, Dict, List, Union
 
 
-def render_html(narrative: str, sections: Dict[str, Any]) -> str:
-    meta = sections.get("meta", {})
-    generated = meta.get("generated_at", "")
-    return f"""
+# Site renderer. Templates are compiled once at import into literal/slot
+# parts; each run builds one pre-escaped view model from `sections` and then
+# streams every registered layout (index, apple, masonry, ...) into a write
+# buffer, so render cost tracks output size rather than layouts x data.
+#
+# Template syntax (a small Mustache subset):
+#   {{name}}              insert a view-model value (already HTML-escaped)
+#   {{#name}}...{{/name}} repeat for each item of a list, or render once if truthy
+
+Part = Union[str, tuple]
+
+_TOKEN = re.compile(r"\{\{([#/]?)\s*([\w.]+)\s*\}\}")
+
+
+def _compile(source: str) -> List[Part]:
+    root: List[Part] = []
+    stack: List[tuple] = [("", root)]
+    pos = 0
+    for m in _TOKEN.finditer(source):
+        if m.start() > pos:
+            stack[-1][1].append(source[pos : m.start()])
+        kind, name = m.group(1), m.group(2)
+        if kind == "#":
+            body: List[Part] = []
+            stack[-1][1].append(("section", name, body))
+            stack.append((name, body))
+        elif kind == "/":
+            if len(stack) == 1 or stack[-1][0] != name:
+                raise ValueError(f"unbalanced template section {name!r}")
+            stack.pop()
+        else:
+            stack[-1][1].append(("var", name))
+        pos = m.end()
+    if len(stack) != 1:
+        raise ValueError(f"unclosed template section {stack[-1][0]!r}")
+    if pos < len(source):
+        root.append(source[pos:])
+    # Merge adjacent literals so rendering does one write per literal run.
+    merged: List[Part] = []
+    for part in root:
+        if isinstance(part, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += part
+        else:
+            merged.append(part)
+    return merged
+
+
+def _lookup(stack: List[Dict[str, Any]], name: str) -> Any:
+    for ctx in reversed(stack):
+        if isinstance(ctx, dict) and name in ctx:
+            return ctx[name]
+    return ""
+
+
+def _render(parts: List[Part], write: Callable[[str], Any], stack: List[Dict[str, Any]]) -> None:
+    for part in parts:
+        if isinstance(part, str):
+            write(part)
+        elif part[0] == "var":
+            write(_lookup(stack, part[1]))
+        else:
+            value = _lookup(stack, part[1])
+            if isinstance(value, list):
+                for item in value:
+                    stack.append(item)
+                    _render(part[2], write, stack)
+                    stack.pop()
+            elif value:
+                _render(part[2], write, stack)
+
+
+class Template:
+    def __init__(self, source: str) -> None:
+        self.parts = _compile(source)
+
+    def render_into(self, write: Callable[[str], Any], view: Dict[str, Any]) -> None:
+        _render(self.parts, write, [view])
+
+    def render(self, view: Dict[str, Any]) -> str:
+        buf = io.StringIO()
+        self.render_into(buf.write, view)
+        return buf.getvalue()
+
+
+def _e(value: Any) -> str:
+    return html.escape("" if value is None else str(value), quote=True)
+
+
+def build_view_model(narrative: str, sections: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything the layouts need, derived from sections once and HTML-escaped up front."""
+    sales = sections.get("sales", {}) or {}
+
+    def ranking(rows: List[Dict]) -> List[Dict[str, str]]:
+        return [
+            {
+                "model": _e(r.get("model", "")),
+                "rank": _e(r.get("rank", "")),
+                "units": "" if r.get("units") is None else f"{r['units']:,}",
+                "source": _e(r.get("source", "")),
+            }
+            for r in rows
+        ]
+
+    top = (sales.get("over_250k", []) + sales.get("over_350k", []))[:10]
+    chart = [
+        {
+            "label": _e(r.get("model", "")),
+            "y": str(10 + i * 16),
+            "text_y": str(20 + i * 16),
+            "w": str(w),
+            "text_x": str(w + 18),
+        }
+        for i, r in enumerate(top)
+        for w in [60 + round(420 * (len(top) - i) / len(top))]
+    ]
+    launches = [
+        {
+            "model": _e(it.get("model", "")),
+            "price": _e(it.get("price", "N/A")),
+            "highlights": _e(", ".join(it.get("highlights", []))),
+            "highlights_short": _e("、".join(it.get("highlights", [])[:2])),
+            "source": _e(it.get("source", "")),
+            "alternates": [{"url": _e(u)} for u in it.get("alternates", [])],
+        }
+        for it in sections.get("launches", []) or []
+    ]
+    upcoming = [
+        {
+            "model": _e(it.get("model", "")),
+            "window": _e(it.get("window", "")),
+            "notes": _e(", ".join(it.get("notes", []))),
+            "source": _e(it.get("source", "")),
+        }
+        for it in sections.get("upcoming", []) or []
+    ]
+    vips = [
+        {
+            "name": _e(it.get("name", "")),
+            "summary": _e(it.get("summary", "")),
+            "quotes": [{"text": _e(q)} for q in it.get("quotes", [])],
+            "quotes_short": [{"text": _e(q)} for q in it.get("quotes", [])[:2]],
+            "sources": [{"url": _e(s)} for s in it.get("sources", [])],
+        }
+        for it in sections.get("vip_voices", []) or []
+    ]
+    dimming = [
+        {
+            "title": _e(it.get("title", "")),
+            "url": _e(it.get("url", "")),
+            "summary": _e(it.get("summary", "")),
+            "alternates": [{"url": _e(u)} for u in it.get("alternates", [])],
+        }
+        for it in sections.get("dimming_news", []) or []
+    ]
+    competitors = [
+        {
+            "category": _e(it.get("category", "")),
+            "domain": _e(it.get("domain", "")),
+            "status": _e(it.get("status", 0)),
+            "features": _e(", ".join(it.get("features", []))),
+        }
+        for it in (sections.get("competitors") or {}).get("items", [])
+    ]
+    trends = sections.get("trends") or {}
+    movement = {"up": "▲{}", "down": "▼{}", "same": "=", "new": "NEW"}
+    trend_sales = [
+        {
+            "band": _e(r["band"]),
+            "model": _e(r["model"]),
+            "rank": _e(r["rank"]),
+            "move": _e(movement[r["status"]].format(abs(r["delta"] or 0))),
+        }
+        for r in trends.get("sales", [])
+    ]
+    vip_freq = [
+        {"name": _e(v["name"]), "covered": _e(v["weeks_covered"]), "weeks": _e(v["weeks"])}
+        for v in trends.get("vip_frequency", [])
+    ]
+    return {
+        "generated": _e(sections.get("meta", {}).get("generated_at", "")),
+        "has_trends": bool(trends.get("previous_week")),
+        "previous_week": _e(trends.get("previous_week") or ""),
+        "trend_sales": trend_sales,
+        "dimming_new": _e(trends.get("dimming_new", 0)),
+        "dimming_returning": _e(trends.get("dimming_returning", 0)),
+        "vip_freq": vip_freq,
+        "narrative": _e(narrative),
+        "sales_250": ranking(sales.get("over_250k", [])),
+        "sales_350": ranking(sales.get("over_350k", [])),
+        "sales_top3": ranking(top[:3]),
+        "chart": chart,
+        "launches": launches,
+        "launches_top3": launches[:3],
+        "upcoming": upcoming,
+        "vips": vips,
+        "vips_top3": vips[:3],
+        "dimming": dimming,
+        "dimming_top3": dimming[:3],
+        "competitors": competitors,
+        "has_competitors": bool(competitors),
+        "competitor_count": str(len(competitors)),
+    }
+
+
+INDEX = """
 <!doctype html>
 <html lang="en">
 <head>
@@ -17,53 +221,65 @@ def render_html(narrative: str, sections: Dict[str, Any]) -> str:
   <div class="container">
     <header>
       <h1>NEV Weekly Newsletter</h1>
-      <p class="meta">Generated at {generated}</p>
+      <p class="meta">Generated at {{generated}}</p>
     </header>
 
     <section class="section">
       <h2>Executive Summary</h2>
-      <pre style="white-space:pre-wrap">{narrative}</pre>
+      <pre style="white-space:pre-wrap">{{narrative}}</pre>
     </section>
 
-    <section class="section">
+    {{#has_trends}}<section class="section" id="trends">
+      <h2>Week over Week</h2>
+      <p class="meta">Compared with {{previous_week}}</p>
+      <ol>
+        {{#trend_sales}}<li>[{{band}}] {{model}} — rank {{rank}} ({{move}})</li>{{/trend_sales}}
+      </ol>
+      <p>Smart dimming: {{dimming_new}} new, {{dimming_returning}} returning items.</p>
+      <ul>
+        {{#vip_freq}}<li>{{name}}: covered {{covered}} of the last {{weeks}} weeks</li>{{/vip_freq}}
+      </ul>
+    </section>{{/has_trends}}
+
+    <section class="section" id="sales">
       <h2>Sales Rankings</h2>
       <div class="item">
         <strong>&gt; 250k RMB</strong>
         <ol>
-          {''.join([f'<li>{r.get('model','')} (rank {r.get('rank','')}) <a href="{r.get('source','')}">source</a></li>' for r in sections.get('sales', {}).get('over_250k', [])])}
+          {{#sales_250}}<li>{{model}} (rank {{rank}}{{#units}}, {{units}} units{{/units}}) <a href="{{source}}">source</a></li>{{/sales_250}}
         </ol>
       </div>
       <div class="item">
         <strong>&gt; 350k RMB</strong>
         <ol>
-          {''.join([f'<li>{r.get('model','')} (rank {r.get('rank','')}) <a href="{r.get('source','')}">source</a></li>' for r in sections.get('sales', {}).get('over_350k', [])])}
+          {{#sales_350}}<li>{{model}} (rank {{rank}}{{#units}}, {{units}} units{{/units}}) <a href="{{source}}">source</a></li>{{/sales_350}}
         </ol>
       </div>
     </section>
 
-    <section class="section">
+    <section class="section" id="launches">
       <h2>New Car Launches</h2>
-      {''.join([f"<div class='item'><strong>{it.get('model','')}</strong> — {it.get('price','N/A')}<br/><small>{', '.join(it.get('highlights', []))}</small> <a href='{it.get('source','')}'>source</a></div>" for it in sections.get('launches', [])])}
+      {{#launches}}<div class='item'><strong>{{model}}</strong> — {{price}}<br/><small>{{highlights}}</small> <a href='{{source}}'>source</a>{{#alternates}} <a href='{{url}}'>also</a>{{/alternates}}</div>{{/launches}}
     </section>
 
-    <section class="section">
+    <section class="section" id="upcoming">
       <h2>Upcoming Releases (Next Month)</h2>
-      {''.join([f"<div class='item'><strong>{it.get('model','')}</strong> — {it.get('window','')}<br/><small>{', '.join(it.get('notes', []))}</small> <a href='{it.get('source','')}'>source</a></div>" for it in sections.get('upcoming', [])])}
+      {{#upcoming}}<div class='item'><strong>{{model}}</strong> — {{window}}<br/><small>{{notes}}</small> <a href='{{source}}'>source</a></div>{{/upcoming}}
     </section>
 
-    <section class="section">
+    <section class="section" id="vip">
       <h2>VIP Voices</h2>
-      {''.join([f"<div class='item'><strong>{it.get('name','')}</strong><br/><small>{it.get('summary','')}</small>" + ''.join([f"<blockquote>{q}</blockquote>" for q in it.get('quotes', [])]) + ''.join([f" <a href='{s}'>source</a>" for s in it.get('sources', [])]) + "</div>" for it in sections.get('vip_voices', [])])}
+      {{#vips}}<div class='item'><strong>{{name}}</strong><br/><small>{{summary}}</small>{{#quotes}}<blockquote>{{text}}</blockquote>{{/quotes}}{{#sources}} <a href='{{url}}'>source</a>{{/sources}}</div>{{/vips}}
     </section>
 
-    <section class="section">
+    <section class="section" id="dimming">
       <h2>Smart Dimming Intelligence</h2>
       <ol>
-        {''.join([f"<li><a href='{it.get('url','')}'>{it.get('title','')}</a><br/><small>{it.get('summary','')}</small></li>" for it in sections.get('dimming_news', [])])}
+        {{#dimming}}<li><a href='{{url}}'>{{title}}</a>{{#alternates}} <a href='{{url}}'>also</a>{{/alternates}}<br/><small>{{summary}}</small></li>{{/dimming}}
       </ol>
     </section>
 
-    {'' if not sections.get('competitors') else f"<section class='section'><h2>Competitor Analysis</h2>" + ''.join([f"<div class='item'><strong>[{it.get('category','')}] {it.get('domain','')}</strong> — status {it.get('status',0)}<br/><small>{', '.join(it.get('features', []))}</small></div>" for it in sections.get('competitors', {}).get('items', [])]) + "</section>"}
+    {{#has_competitors}}<section class='section' id='competitors'><h2>Competitor Analysis</h2>{{#competitors}}<div class='item'><strong>[{{category}}] {{domain}}</strong> — status {{status}}<br/><small>{{features}}</small></div>{{/competitors}}</section>{{/has_competitors}}
 
     <footer class="section">
       <small>Powered by Tavily search + LLM summarization. This page updates weekly via GitHub Actions.</small>
@@ -72,3 +288,238 @@ def render_html(narrative: str, sections: Dict[str, Any]) -> str:
 </body>
 </html>
 """
+
+APPLE = """<!doctype html>
+<html lang="zh-CN">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>NEV Weekly · 极简风</title>
+  <link rel="stylesheet" href="apple.css" />
+</head>
+<body>
+  <header class="nav">
+    <div class="wrap">
+      <div class="brand">NEV Weekly</div>
+      <nav>
+        <a href="index.html">周报</a>
+        <span style="margin:0 .5rem;color:#c7c7cc">•</span>
+        <a href="competitor_report.md">竞品</a>
+        <span style="margin:0 .5rem;color:#c7c7cc">•</span>
+        <a href="link_report.md">链接验证</a>
+      </nav>
+    </div>
+  </header>
+
+  <section class="hero">
+    <h1>更简洁的新能源周报</h1>
+    <p>以极简的苹果风格呈现本周重点：销量榜单、新车发布、VIP 观点与智能调光行业资讯。</p>
+    <p>更新于 {{generated}}</p>
+    <div class="cta">
+      <a class="btn primary" href="index.html">查看最新周报</a>
+      <a class="btn" href="competitor_report.md">阅读竞品分析</a>
+    </div>
+  </section>
+
+  <main class="container">
+    <section class="section">
+      <h2>本周亮点</h2>
+      <div class="grid">
+        <article class="card">
+          <div class="pad">
+            <h3>销量榜单</h3>
+            <p>聚焦 >250k / >350k RMB 的 SUV/轿车，来源乘联会与懂车帝汇总。</p>
+            <ol>{{#sales_top3}}<li>{{model}}</li>{{/sales_top3}}</ol>
+            <p><a href="index.html#sales">前往</a></p>
+          </div>
+        </article>
+        <article class="card">
+          <div class="pad">
+            <h3>新车发布</h3>
+            <p>过去一周重磅车型：名称、价格区间与核心卖点一览。</p>
+            <ul>{{#launches_top3}}<li>{{model}} · {{price}}</li>{{/launches_top3}}</ul>
+            <p><a href="index.html#launches">前往</a></p>
+          </div>
+        </article>
+        <article class="card">
+          <div class="pad">
+            <h3>VIP 声音</h3>
+            <p>行业领袖近 7 天观点提炼，洞察战略方向与市场判断。</p>
+            <ul>{{#vips_top3}}<li>{{name}}</li>{{/vips_top3}}</ul>
+            <p><a href="index.html#vip">前往</a></p>
+          </div>
+        </article>
+      </div>
+    </section>
+
+    <section class="section">
+      <h2>智能调光资讯</h2>
+      <div class="grid">
+        <article class="card">
+          <div class="pad">
+            <h3>Top 10 新闻</h3>
+            <p>围绕技术、合作与工厂动态，自动筛选高相关度内容。</p>
+            <ul>{{#dimming_top3}}<li><a href="{{url}}">{{title}}</a></li>{{/dimming_top3}}</ul>
+            <p><a href="index.html#dimming">前往</a></p>
+          </div>
+        </article>
+        <article class="card">
+          <div class="pad">
+            <h3>竞品研究</h3>
+            <p>EC/PDLC/SPD/LC 全品类聚合不少于 100 个相关链接。本周跟踪 {{competitor_count}} 个竞品条目。</p>
+            <p><a href="competitor_report.md">查看</a></p>
+          </div>
+        </article>
+        <article class="card">
+          <div class="pad">
+            <h3>链接验证</h3>
+            <p>自动检测外链有效性，快速定位不可达或限制访问条目。</p>
+            <p><a href="link_report.md">查看</a></p>
+          </div>
+        </article>
+      </div>
+    </section>
+  </main>
+
+  <footer class="footer container">
+    <div>© 2025 NEV Weekly · 以搜索与摘要技术驱动的极简信息呈现</div>
+  </footer>
+</body>
+</html>
+"""
+
+MASONRY = """<!doctype html>
+<html lang="zh-CN">
+<head>
+  <meta charset="utf-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1" />
+  <title>NEV Weekly · 瀑布流可视化</title>
+  <link rel="stylesheet" href="masonry.css" />
+</head>
+<body>
+  <header class="nav">
+    <div class="wrap">
+      <div class="brand">NEV Weekly</div>
+      <nav>
+        <a href="apple.html">首页</a>
+        <span style="margin:0 .5rem;color:#c7c7cc">•</span>
+        <a href="index.html">周报</a>
+      </nav>
+    </div>
+  </header>
+
+  <section class="hero">
+    <h1>瀑布流 · 四大板块</h1>
+    <p>在同一页面中，以苹果风格呈现销量、新车、VIP 与智能调光板块的图形化内容。</p>
+  </section>
+
+  <main id="app" class="container">
+    <div class="masonry" aria-label="瀑布流布局">
+      <!-- 销量榜单 -->
+      <section class="card" aria-labelledby="sales-title">
+        <div class="pad">
+          <h2 id="sales-title">销量榜单（Top 10）</h2>
+          <p>价格带：>250k / >350k RMB</p>
+          <svg class="chart" viewBox="0 0 600 180" role="img" aria-label="销量柱状图">
+            <g>{{#chart}}<rect x="10" y="{{y}}" width="{{w}}" height="12" fill="#000" rx="6" /><text x="{{text_x}}" y="{{text_y}}" font-size="12" fill="#1d1d1f">{{label}}</text>{{/chart}}</g>
+          </svg>
+          <div class="badge">数据来源：乘联会/懂车帝</div>
+        </div>
+      </section>
+
+      <!-- 新车发布 -->
+      <section class="card" aria-labelledby="launch-title">
+        <div class="pad">
+          <h2 id="launch-title">新车发布（过去 7 天）</h2>
+          <div class="list">
+            {{#launches}}<div class="card" style="border-radius:12px"><div class="pad"><strong>{{model}}</strong><p>价格：{{price}}</p><p>卖点：{{highlights_short}}</p><a href="{{source}}" target="_blank" rel="noopener">来源</a></div></div>{{/launches}}
+          </div>
+        </div>
+      </section>
+
+      <!-- VIP 声音 -->
+      <section class="card" aria-labelledby="vip-title">
+        <div class="pad">
+          <h2 id="vip-title">VIP 观点（近 7 天）</h2>
+          <div class="list">
+            {{#vips}}<div class="card" style="border-radius:12px"><div class="pad"><strong>{{name}}</strong><p>{{summary}}</p><ul>{{#quotes_short}}<li>“{{text}}”</li>{{/quotes_short}}</ul></div></div>{{/vips}}
+          </div>
+        </div>
+      </section>
+
+      <!-- 智能调光资讯 -->
+      <section class="card" aria-labelledby="dimming-title">
+        <div class="pad">
+          <h2 id="dimming-title">智能调光资讯（Top 10）</h2>
+          <div class="list">
+            {{#dimming}}<div class="card" style="border-radius:12px"><div class="pad"><a href="{{url}}" target="_blank" rel="noopener"><strong>{{title}}</strong></a><p>{{summary}}</p></div></div>{{/dimming}}
+          </div>
+        </div>
+      </section>
+    </div>
+  </main>
+
+  <footer class="footer">© 2025 NEV Weekly · 可视化瀑布流页面</footer>
+</body>
+</html>
+"""
+
+ARCHIVE = """<!doctype html>
+<html lang="en">
+<head>
+  <meta charset="utf-8"/>
+  <meta name="viewport" content="width=device-width,initial-scale=1"/>
+  <title>NEV Weekly Newsletter · Archive</title>
+  <link rel="stylesheet" href="./style.css"/>
+</head>
+<body>
+  <div class="container">
+    <header>
+      <h1>NEV Weekly Newsletter Archive</h1>
+      <p class="meta">{{count}} issues · <a href="../index.html">latest issue</a> · <a href="../search/index.html">search</a></p>
+    </header>
+
+    <section class="section">
+      <ol reversed>
+        {{#issues}}<li><a href="./{{week}}/index.html">{{week}}</a> <small class="meta">{{generated}}</small></li>{{/issues}}
+      </ol>
+    </section>
+  </div>
+</body>
+</html>
+"""
+
+# Output filename -> compiled layout. Register new layouts (archive pages, ...) here.
+LAYOUTS: Dict[str, Template] = {
+    "index.html": Template(INDEX),
+    "apple.html": Template(APPLE),
+    "masonry.html": Template(MASONRY),
+}
+
+
+def render_site(narrative: str, sections: Dict[str, Any]) -> Dict[str, str]:
+    """Render every layout from one shared view model; the caller publishes the pages."""
+    view = build_view_model(narrative, sections)
+    pages: Dict[str, str] = {}
+    for name, layout in LAYOUTS.items():
+        buf = io.StringIO()
+        layout.render_into(buf.write, view)
+        pages[name] = buf.getvalue()
+    return pages
+
+
+def render_html(narrative: str, sections: Dict[str, Any]) -> str:
+    return LAYOUTS["index.html"].render(build_view_model(narrative, sections))
+
+
+_ARCHIVE = Template(ARCHIVE)
+
+
+def render_archive_index(issues: List[Dict[str, str]]) -> str:
+    """archive/index.html for {"week", "generated_at"} issues, newest first."""
+    ordered = sorted(issues, key=lambda it: it["week"], reverse=True)
+    view = {
+        "count": str(len(ordered)),
+        "issues": [{"week": _e(it["week"]), "generated": _e(it.get("generated_at", ""))} for it in ordered],
+    }
+    return _ARCHIVE.render(view)
@@ -0,0 +1,418 @@
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, Type
+
+from . import cassette
+from .metrics import METRICS
+
+
+# Shared resilience layer for every outbound call (Tavily, page fetches, link
+# probes, LLM completions).
+#
+# - Deadlines: the run and each pipeline stage set a deadline in a context
+#   variable; retries, backoff sleeps and waits never go past it, so a
+#   degraded provider costs at most the stage's budget instead of stacking
+#   timeouts.
+# - Circuit breakers: one per provider ("tavily", "llm") or host
+#   ("host:example.com"). After NEV_BREAKER_FAILURES consecutive failures
+#   calls fail fast for NEV_BREAKER_RESET seconds, then a single probe decides
+#   whether to close again.
+# - Hedging: with NEV_HEDGE_AFTER set, an idempotent read still running after
+#   that many seconds gets a second identical request; whichever answers first
+#   wins.
+# - Abandoned work: a blocking call cut off by its deadline cannot be killed.
+#   It keeps running on a daemon helper thread (so it never holds up
+#   interpreter exit) and its result is dropped; at most MAX_HELPER_THREADS
+#   such threads exist at once, and a call that finds them all busy waits for
+#   one within its deadline.
+#
+# Counters go to METRICS as <kind>.retries, <kind>.hedges, <kind>.hedge_wins,
+# <kind>.deadline_exceeded, <kind>.abandoned, breaker.opened and breaker.rejected, where kind is
+# the breaker key up to the first colon.
+
+DEFAULT_RUN_DEADLINE = 1800.0
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET = 30.0
+MAX_HELPER_THREADS = 32
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the run or stage deadline leaves no time for a call."""
+
+
+class CircuitOpen(RuntimeError):
+    """Raised without making a request while a breaker is open."""
+
+
+# Never retried and never counted against a breaker.
+NOT_RETRYABLE: Tuple[Type[BaseException], ...] = (cassette.CassetteMiss, DeadlineExceeded, CircuitOpen)
+
+
+def _env_seconds(name: str, default: float) -> float:
+    raw = os.getenv(name, "").strip()
+    return float(raw) if raw else default
+
+
+# ---- deadlines ----
+
+_DEADLINE: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("nev_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Limit everything inside to `seconds` (never extends an enclosing deadline)."""
+    if seconds is None:
+        yield
+        return
+    current = _DEADLINE.get()
+    at = time.monotonic() + seconds
+    token = _DEADLINE.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def run_deadline() -> float:
+    return _env_seconds("NEV_RUN_DEADLINE", DEFAULT_RUN_DEADLINE)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one."""
+    at = _DEADLINE.get()
+    return None if at is None else at - time.monotonic()
+
+
+def bind(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Carry the caller's deadline into work submitted to a thread pool."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+# ---- circuit breakers ----
+
+
+class CircuitBreaker:
+    def __init__(self, key: str, failures: int, reset_after: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.key = key
+        self.clock = clock
+        self.threshold = max(1, failures)
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self) -> None:
+        with self._lock:
+            state = self.state
+            if state == "closed" or (state == "half-open" and not self.probing):
+                self.probing = state == "half-open"
+                return
+            self.rejected += 1
+        METRICS.incr("breaker.rejected")
+        raise CircuitOpen(f"circuit open for {self.key}")
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release(self) -> None:
+        # A half-open probe that ended without a verdict (deadline, replay miss) frees the slot.
+        with self._lock:
+            self.probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            reopen = self.probing or (self.opened_at is None and self.failures >= self.threshold)
+            self.probing = False
+            if reopen:
+                self.opened_at = self.clock()
+        if reopen:
+            METRICS.incr("breaker.opened")
+            METRICS.error("breaker", f"{self.key} opened after {self.failures} failures")
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(key: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(
+                key,
+                int(_env_seconds("NEV_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES)),
+                _env_seconds("NEV_BREAKER_RESET", DEFAULT_BREAKER_RESET),
+            )
+        return _breakers[key]
+
+
+def breaker_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Breakers that saw failures or rejected calls, for run metrics."""
+    with _breakers_lock:
+        items = list(_breakers.items())
+    return {
+        key: {"state": b.state, "failures": b.failures, "rejected": b.rejected}
+        for key, b in items
+        if b.failures or b.rejected or b.opened_at is not None
+    }
+
+
+# ---- retries and hedging ----
+
+
+def hedge_after() -> Optional[float]:
+    seconds = _env_seconds("NEV_HEDGE_AFTER", 0.0)
+    return seconds if seconds > 0 else None
+
+
+def _backoff(attempt: int, base: float, cap: float) -> float:
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _budget(kind: str) -> Optional[float]:
+    left = remaining()
+    if left is not None and left <= 0:
+        METRICS.incr(f"{kind}.deadline_exceeded")
+        raise DeadlineExceeded("deadline reached")
+    return left
+
+
+_helpers = threading.BoundedSemaphore(MAX_HELPER_THREADS)
+
+
+def _spawn(fn: Callable[[], Any], kind: str, wait_for: Optional[float], before: Optional[Callable[[], Any]] = None) -> "Optional[Future[Any]]":
+    # A daemon thread per request rather than a pool: pool workers are joined at
+    # interpreter exit, so one hung request would hold up the end of the run.
+    # None when no helper thread frees up within `wait_for` seconds; `before`
+    # runs once a thread is secured and may raise to call the request off.
+    if not _helpers.acquire(timeout=wait_for):
+        return None
+    fut: "Future[Any]" = Future()
+    run = bind(fn)
+
+    def target() -> None:
+        try:
+            if fut.set_running_or_notify_cancel():
+                try:
+                    fut.set_result(run())
+                except BaseException as e:
+                    fut.set_exception(e)
+        finally:
+            _helpers.release()
+
+    try:
+        if before is not None:
+            before()
+        threading.Thread(target=target, name=f"resilience-{kind}", daemon=True).start()
+    except BaseException:
+        _helpers.release()
+        raise
+    return fut
+
+
+def _run_bounded(fn: Callable[[], Any], kind: str, left: Optional[float], hedge: Optional[float], on_hedge: Optional[Callable[[], Any]]) -> Any:
+    # Runs on a helper thread so the caller can stop waiting at the deadline;
+    # an abandoned request finishes in the background and its result is dropped.
+    stop_at = None if left is None else time.monotonic() + left
+    first = _spawn(fn, kind, left)
+    if first is None:
+        METRICS.incr(f"{kind}.deadline_exceeded")
+        raise DeadlineExceeded("deadline reached while waiting for a helper thread")
+    futures = [first]
+    if hedge is not None:
+        done, _ = wait(futures, timeout=hedge if left is None else min(hedge, left))
+        if not done and (stop_at is None or time.monotonic() < stop_at):
+            # Hedge only when a helper thread is free right away.
+            try:
+                second = _spawn(fn, kind, 0, before=on_hedge)
+                if second is not None:
+                    futures.append(second)
+                    METRICS.incr(f"{kind}.hedges")
+            except Exception:
+                pass  # e.g. no budget left for a duplicate request
+    pending = list(futures)
+    error: Optional[BaseException] = None
+    while pending:
+        timeout = None if stop_at is None else max(0.0, stop_at - time.monotonic())
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            METRICS.incr(f"{kind}.deadline_exceeded")
+            METRICS.incr(f"{kind}.abandoned", len(pending))
+            raise DeadlineExceeded("deadline reached while waiting for a response")
+        for fut in done:
+            pending.remove(fut)
+            if fut.exception() is None:
+                if fut is not first:
+                    METRICS.incr(f"{kind}.hedge_wins")
+                for other in pending:
+                    other.cancel()
+                return fut.result()
+            error = fut.exception()
+    assert error is not None
+    raise error
+
+
+def call(
+    fn: Callable[[], Any],
+    key: str,
+    attempts: int = 3,
+    base: float = 1.0,
+    cap: float = 8.0,
+    idempotent: bool = True,
+    failed: Optional[Callable[[Any], bool]] = None,
+    on_hedge: Optional[Callable[[], Any]] = None,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    on_retry: Optional[Callable[[], Any]] = None,
+) -> Any:
+    """Call fn() through the breaker for `key`, retrying with backoff inside the current deadline.
+
+    `failed(result)` marks a returned value (e.g. an HTTP 503) as a failure; if
+    every attempt fails that way, the last result is returned. Hedging applies
+    to idempotent calls only; `on_hedge` runs before a duplicate is sent and
+    may raise to veto it. `on_retry` runs before each retry; if it raises, the
+    failed attempt's error (or result) is what the caller gets.
+    """
+    kind = key.split(":", 1)[0]
+    gate = breaker(key)
+    hedge = hedge_after() if idempotent else None
+    for attempt in range(attempts):
+        left = _budget(kind)
+        gate.allow()
+        try:
+            if left is None and hedge is None:
+                result = fn()
+            else:
+                result = _run_bounded(fn, kind, left, hedge, on_hedge)
+        except NOT_RETRYABLE:
+            gate.release()
+            raise
+        except retry_on as e:
+            gate.failure()
+            if attempt + 1 >= attempts:
+                raise
+            error: Optional[BaseException] = e
+        else:
+            if failed is None or not failed(result):
+                gate.success()
+                return result
+            gate.failure()
+            if attempt + 1 >= attempts:
+                return result
+            error = None
+        pause = _backoff(attempt, base, cap)
+        left = remaining()
+        if left is not None and pause >= left:
+            METRICS.incr(f"{kind}.deadline_exceeded")
+            raise DeadlineExceeded(f"no time left to retry {key}")
+        if on_retry is not None:
+            try:
+                on_retry()
+            except Exception:
+                # Vetoed (e.g. no query budget left): give up with this attempt's outcome.
+                if error is not None:
+                    raise error
+                return result
+        METRICS.incr(f"{kind}.retries")
+        time.sleep(pause)
+    raise AssertionError("unreachable")
+
+
+async def _await_bounded(make: Callable[[], Awaitable[Any]], kind: str, left: Optional[float], hedge: Optional[float]) -> Any:
+    first = asyncio.ensure_future(make())
+    tasks = [first]
+    stop_at = None if left is None else time.monotonic() + left
+    try:
+        if hedge is not None:
+            done, _ = await asyncio.wait(tasks, timeout=hedge if left is None else min(hedge, left))
+            if not done and (stop_at is None or time.monotonic() < stop_at):
+                tasks.append(asyncio.ensure_future(make()))
+                METRICS.incr(f"{kind}.hedges")
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            timeout = None if stop_at is None else max(0.0, stop_at - time.monotonic())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                METRICS.incr(f"{kind}.deadline_exceeded")
+                raise DeadlineExceeded("deadline reached while waiting for a response")
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        METRICS.incr(f"{kind}.hedge_wins")
+                    return task.result()
+                error = task.exception()
+        assert error is not None
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def acall(
+    make: Callable[[], Awaitable[Any]],
+    key: str,
+    attempts: int = 2,
+    base: float = 0.5,
+    cap: float = 4.0,
+    idempotent: bool = True,
+    failed: Optional[Callable[[Any], bool]] = None,
+    timeout: Optional[float] = None,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+) -> Any:
+    """Async counterpart of call(); `make()` builds a fresh awaitable per attempt.
+
+    `timeout` caps this call in addition to the context deadline.
+    """
+    kind = key.split(":", 1)[0]
+    gate = breaker(key)
+    hedge = hedge_after() if idempotent else None
+    with deadline(timeout):
+        for attempt in range(attempts):
+            left = _budget(kind)
+            gate.allow()
+            try:
+                if left is None and hedge is None:
+                    result = await make()
+                else:
+                    result = await _await_bounded(make, kind, left, hedge)
+            except NOT_RETRYABLE:
+                gate.release()
+                raise
+            except retry_on:
+                gate.failure()
+                if attempt + 1 >= attempts:
+                    raise
+            else:
+                if failed is None or not failed(result):
+                    gate.success()
+                    return result
+                gate.failure()
+                if attempt + 1 >= attempts:
+                    return result
+            pause = _backoff(attempt, base, cap)
+            left = remaining()
+            if left is not None and pause >= left:
+                METRICS.incr(f"{kind}.deadline_exceeded")
+                raise DeadlineExceeded(f"no time left to retry {key}")
+            METRICS.incr(f"{kind}.retries")
+            await asyncio.sleep(pause)
+    raise AssertionError("unreachable")
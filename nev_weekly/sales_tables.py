@@ -0,0 +1,283 @@
+import asyncio
+import re
+import statistics
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from . import cassette, resilience
+from .fetcher import stream_text
+from .metrics import METRICS
+from .models_index import ModelIndex, default_index
+
+
+# Sales figures from CPCA (乘联会) / Dongchedi (懂车帝) ranking pages. Each page
+# is streamed through an HTMLParser chunk by chunk: table rows are evaluated
+# as soon as they close and only the extracted rows are kept, so memory stays
+# bounded by the byte cap and the row limit rather than the page size. A row
+# counts when one cell names a known model (config/models.yaml) and another
+# holds a unit count; a header row, when present, tells which column is units
+# and which is price. Tables or columns labelled monthly, yearly or cumulative
+# are skipped and weekly ones are preferred. Rows from several pages are merged
+# into one numeric ranking.
+
+DEFAULT_PAGE_BYTES = 256 * 1024
+MAX_ROWS = 200
+MAX_CELL_CHARS = 200
+# Plausible weekly units for one model; anything outside is a year, a price or a total.
+MIN_WEEKLY_UNITS = 10
+MAX_WEEKLY_UNITS = 100_000
+
+_PRICE_HEADER = re.compile(r"价|price|msrp", re.I)
+_UNITS_HEADER = re.compile(r"销量|上险|units|volume|sales", re.I)
+_NOT_UNITS_HEADER = re.compile(r"排名|名次|rank|同比|环比|占比|share|%", re.I)
+_DATE_HEADER = re.compile(r"日期|时间|年份|date|year", re.I)
+_WEEKLY = re.compile(r"周|week", re.I)
+_OTHER_PERIOD = re.compile(r"月|年|累计|month|year|ytd|cumulative", re.I)
+_YEAR = re.compile(r"^(?:19|20)\d\d$")
+_UNITS = re.compile(r"^(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d+))?\s*(万)?\s*(?:辆|台)?$")
+_PRICE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:(?:-|~|–|—|至)\s*(\d+(?:\.\d+)?))?\s*万")
+
+
+def parse_units(cell: str, allow_wan: bool = False) -> Optional[int]:
+    """12,345 / 12345辆 / (with allow_wan) 1.2万 -> int; anything else -> None."""
+    m = _UNITS.match(cell.strip())
+    if not m or (m.group(3) and not allow_wan):
+        return None
+    whole, frac, wan = m.group(1).replace(",", ""), m.group(2) or "", m.group(3)
+    if wan:
+        return round(float(f"{whole}.{frac or 0}") * 10000)
+    return None if frac else int(whole)
+
+
+def _period(label: str) -> Optional[str]:
+    """"week" for weekly labels, "other" for monthly/yearly/cumulative ones, else None."""
+    if _WEEKLY.search(label):
+        return "week"
+    return "other" if _OTHER_PERIOD.search(label) else None
+
+
+def parse_price(cell: str) -> Optional[Tuple[float, float]]:
+    """'25.98-32.98万' / '29.99万' -> (low, high) in 万元."""
+    m = _PRICE.search(cell)
+    if not m:
+        return None
+    low = float(m.group(1))
+    high = float(m.group(2)) if m.group(2) else low
+    return (min(low, high), max(low, high))
+
+
+class SalesTableParser(HTMLParser):
+    def __init__(self, index: Optional[ModelIndex] = None, max_rows: int = MAX_ROWS) -> None:
+        super().__init__(convert_charrefs=True)
+        self.index = index or default_index()
+        self.max_rows = max_rows
+        self.rows: List[Dict[str, Any]] = []
+        self._columns: Dict[str, int] = {}
+        self._caption: Optional[List[str]] = None
+        self._period: Optional[str] = None  # of the current table: "week", "other" or unknown
+        self._weekly_column = False
+        self._row: Optional[List[str]] = None
+        self._cell: Optional[List[str]] = None
+        self._cell_chars = 0
+
+    @property
+    def done(self) -> bool:
+        return len(self.rows) >= self.max_rows
+
+    def feed_chunk(self, text: str) -> bool:
+        """Feed one decoded chunk; True once enough rows were found to stop reading."""
+        self.feed(text)
+        return self.done
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == "table":
+            self._columns, self._period, self._weekly_column = {}, None, False
+        elif tag == "caption":
+            self._caption = []
+        elif tag == "tr":
+            self._end_row()
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._end_cell()  # </td> is optional in HTML
+            self._cell, self._cell_chars = [], 0
+        elif tag == "br" and self._cell is not None:
+            self._cell.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "caption" and self._caption is not None:
+            self._period = _period("".join(self._caption))
+            self._caption = None
+        elif tag in ("td", "th"):
+            self._end_cell()
+        elif tag in ("tr", "table"):
+            self._end_row()
+
+    def handle_data(self, data: str) -> None:
+        if self._caption is not None and len(self._caption) < 20:
+            self._caption.append(data[:MAX_CELL_CHARS])
+        if self._cell is not None and self._cell_chars < MAX_CELL_CHARS:
+            self._cell.append(data[: MAX_CELL_CHARS - self._cell_chars])
+            self._cell_chars += len(data)
+
+    def close(self) -> None:
+        super().close()
+        self._end_row()
+
+    def _end_cell(self) -> None:
+        if self._cell is not None and self._row is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+        self._cell = None
+
+    def _end_row(self) -> None:
+        self._end_cell()
+        cells, self._row = self._row, None
+        if cells and not self.done:
+            self._evaluate(cells)
+
+    def _header(self, cells: List[str]) -> None:
+        # Price is tested first: "销售价" is a price, not a sales volume.
+        header: Dict[str, int] = {}
+        units: List[int] = []
+        weekly: List[int] = []
+        for i, c in enumerate(cells):
+            if _PRICE_HEADER.search(c):
+                header.setdefault("price", i)
+            elif _DATE_HEADER.search(c):
+                header.setdefault("date", i)
+            elif _UNITS_HEADER.search(c) and not _NOT_UNITS_HEADER.search(c):
+                units.append(i)
+        if units:
+            # Prefer a weekly column; monthly/yearly/cumulative ones are never used.
+            periods = {i: _period(cells[i]) or self._period for i in units}
+            weekly = [i for i in units if periods[i] == "week"]
+            usable = weekly or [i for i in units if periods[i] != "other"]
+            header["units"] = usable[0] if usable else -1
+        if header:
+            self._columns = header
+            self._weekly_column = bool(units) and bool(weekly)
+
+    def _evaluate(self, cells: List[str]) -> None:
+        models = [(i, hits[0]) for i, c in enumerate(cells) for hits in [self.index.find(c)] if hits]
+        if not models:
+            self._header(cells)
+            return
+        if self._columns.get("units") == -1 or (self._period == "other" and not self._weekly_column):
+            return  # a monthly/yearly/cumulative table
+        col, hit = models[0]
+        units: Optional[int] = None
+        price: Optional[Tuple[float, float]] = None
+        if "units" in self._columns and self._columns["units"] < len(cells):
+            units = parse_units(cells[self._columns["units"]], allow_wan=True)
+        if "price" in self._columns and self._columns["price"] < len(cells):
+            price = parse_price(cells[self._columns["price"]])
+        skip = {col, self._columns.get("price"), self._columns.get("date")}
+        others = [c for i, c in enumerate(cells) if i not in skip]
+        if units is None and "units" not in self._columns:
+            # Without a units header the largest plausible plain integer wins; rank
+            # columns are small, and bare 19xx/20xx values are taken to be years.
+            counts = [n for c in others if not _YEAR.match(c.strip()) for n in [parse_units(c)] if n is not None]
+            units = max((n for n in counts if MIN_WEEKLY_UNITS <= n <= MAX_WEEKLY_UNITS), default=None)
+        if price is None and "price" not in self._columns:
+            price = next((p for p in (parse_price(c) for c in others) if p), None)
+        if units is None or not MIN_WEEKLY_UNITS <= units <= MAX_WEEKLY_UNITS:
+            return
+        self.rows.append({
+            "model_id": hit["id"],
+            "model": hit["name"],
+            "units": units,
+            "weekly": self._period == "week" or self._weekly_column,
+            "price_low": price[0] if price else None,
+            "price_high": price[1] if price else None,
+        })
+
+
+def parse_html(text: str, index: Optional[ModelIndex] = None, chunk: int = 8192) -> List[Dict[str, Any]]:
+    """Rows from an already-fetched page, fed in chunks like a live stream."""
+    parser = SalesTableParser(index)
+    for start in range(0, len(text), chunk):
+        if parser.feed_chunk(text[start : start + chunk]):
+            break
+    parser.close()
+    return parser.rows
+
+
+async def _live_page(client: httpx.AsyncClient, url: str, max_bytes: int) -> Dict[str, Any]:
+    parser = SalesTableParser()  # fresh per attempt
+    status, read = await stream_text(client, url, parser.feed_chunk, max_bytes=max_bytes)
+    parser.close()
+    return {"status": status, "bytes": read, "rows": parser.rows}
+
+
+async def fetch_sales_tables_async(
+    urls: List[str],
+    max_bytes: int = DEFAULT_PAGE_BYTES,
+    concurrency: int = 4,
+    timeout: float = 10.0,
+) -> Dict[str, List[Dict[str, Any]]]:
+    unique = list(dict.fromkeys(urls))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    slots = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(follow_redirects=True, timeout=timeout, limits=limits) as client:
+
+        async def one(u: str) -> List[Dict[str, Any]]:
+            async with slots:
+                METRICS.incr("sales.pages")
+                try:
+                    with METRICS.timer("sales.page_ms"):
+                        page = await resilience.acall(
+                            lambda: cassette.active().athrough(
+                                "sales_page", {"url": u, "max_bytes": max_bytes}, lambda: _live_page(client, u, max_bytes)
+                            ),
+                            f"host:{urlsplit(u).netloc.lower()}",
+                            failed=lambda p: p["status"] >= 500 or p["status"] == 429,
+                        )
+                except Exception as e:
+                    METRICS.error("sales.page", f"{u}: {type(e).__name__}: {e}")
+                    return []
+                rows = page["rows"] if 200 <= page["status"] < 300 else []
+                METRICS.incr("sales.rows", len(rows))
+                return rows
+
+        results = await asyncio.gather(*(one(u) for u in unique))
+    return dict(zip(unique, results))
+
+
+def fetch_sales_tables(urls: List[str], **kwargs) -> Dict[str, List[Dict[str, Any]]]:
+    return asyncio.run(fetch_sales_tables_async(urls, **kwargs))
+
+
+def merge_tables(pages: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """One entry per model with the median of its per-page unit counts, highest first.
+
+    When a page lists a model more than once, a figure from a table or column
+    labelled weekly beats an unlabelled one, and otherwise the first figure on
+    the page is used. The price band spans every page's range.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for url, rows in pages.items():
+        per_page: Dict[str, Dict[str, Any]] = {}
+        for r in rows:
+            entry = merged.setdefault(
+                r["model_id"],
+                {"model_id": r["model_id"], "model": r["model"], "counts": [], "sources": [], "price_low": None, "price_high": None},
+            )
+            current = per_page.get(r["model_id"])
+            if current is None or (r.get("weekly") and not current.get("weekly")):
+                per_page[r["model_id"]] = r
+            if r.get("price_low") is not None:
+                low, high = entry["price_low"], entry["price_high"]
+                entry["price_low"] = r["price_low"] if low is None else min(low, r["price_low"])
+                entry["price_high"] = r["price_high"] if high is None else max(high, r["price_high"])
+        for model_id, r in per_page.items():
+            merged[model_id]["counts"].append(r["units"])
+            merged[model_id]["sources"].append(url)
+    out = []
+    for entry in merged.values():
+        counts = entry.pop("counts")
+        out.append({**entry, "units": int(statistics.median(counts))})
+    out.sort(key=lambda r: (-r["units"], r["model"]))
+    return out
@@ -0,0 +1,220 @@
+import json
+import re
+from typing import Any, Dict, Iterable, List, Set
+
+from .publish import Publisher
+
+
+# Client-side search over every published issue. Rendered items (sales models,
+# launches, upcoming releases, VIP quotes, smart dimming news, competitor
+# features) become small documents stored per week under public/search/docs/.
+# Their tokens (lowercase English words plus Chinese character bigrams) go
+# into an inverted index split into shards by the token's first character, so
+# a query only downloads the shards its own tokens fall into. Postings are
+# grouped by week: adding or re-rendering a week rewrites only the shards that
+# week touches, and unchanged shards are left alone by the publisher.
+
+SEARCH_DIR = "search"
+WEEKS_FILE = f"{SEARCH_DIR}/weeks.json"
+SNIPPET_CHARS = 160
+
+_TOKEN = re.compile(r"[a-z0-9]+|[㐀-鿿]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """English words of two or more characters, and character bigrams of Chinese runs."""
+    out: List[str] = []
+    for tok in _TOKEN.findall((text or "").lower()):
+        if tok[0] >= "㐀":
+            out.extend(tok[i : i + 2] for i in range(max(1, len(tok) - 1)))
+        elif len(tok) > 1:
+            out.append(tok)
+    return out
+
+
+def shard_key(token: str) -> str:
+    # ASCII tokens shard by their first letter/digit; CJK ones by the low byte of their first character.
+    first = token[0]
+    return first if first.isascii() else f"u{ord(first) & 0xFF:02x}"
+
+
+def _docs(week: str, sections: Dict[str, Any]) -> List[Dict[str, Any]]:
+    page = f"archive/{week}/index.html"
+    docs: List[Dict[str, Any]] = []
+
+    def add(anchor: str, title: str, url: str, snippet: str, *extra: str) -> None:
+        docs.append({
+            "doc": [anchor, title, url or "", (snippet or "")[:SNIPPET_CHARS], f"{page}#{anchor}"],
+            "text": " ".join([title, snippet or "", *extra]),
+        })
+
+    for band, rows in (sections.get("sales") or {}).items():
+        for r in rows:
+            add("sales", r.get("model", ""), r.get("source", ""), f"{band} rank {r.get('rank', '')}", r.get("model_id") or "")
+    for it in sections.get("launches") or []:
+        add("launches", it.get("model", ""), it.get("source", ""), ", ".join(it.get("highlights", [])), it.get("price", ""))
+    for it in sections.get("upcoming") or []:
+        add("upcoming", it.get("model", ""), it.get("source", ""), ", ".join(it.get("notes", [])), it.get("window", ""))
+    for it in sections.get("vip_voices") or []:
+        quotes = it.get("quotes") or []
+        sources = it.get("sources") or [""]
+        add("vip", it.get("name", ""), sources[0], quotes[0] if quotes else it.get("summary", ""), *quotes[1:], it.get("summary", ""))
+    for it in sections.get("dimming_news") or []:
+        add("dimming", it.get("title", ""), it.get("url", ""), it.get("summary", ""))
+    for it in (sections.get("competitors") or {}).get("items", []):
+        add("competitors", it.get("domain", ""), it.get("url", ""), ", ".join(it.get("features", [])), it.get("category", ""))
+    return docs
+
+
+class SearchIndex:
+    def __init__(self, publisher: Publisher) -> None:
+        self.publisher = publisher
+        self.root = publisher.out_dir
+        # week -> {"docs": count, "shards": [keys holding its postings]}
+        self.weeks: Dict[str, Dict[str, Any]] = self._read(WEEKS_FILE)
+        self._shards: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+        self._dirty: Set[str] = set()
+
+    def _read(self, name: str) -> Dict[str, Any]:
+        try:
+            return json.loads((self.root / name).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _shard(self, key: str) -> Dict[str, Dict[str, List[int]]]:
+        if key not in self._shards:
+            self._shards[key] = self._read(f"{SEARCH_DIR}/shards/{key}.json")
+        return self._shards[key]
+
+    def add_week(self, week: str, sections: Dict[str, Any]) -> int:
+        """Index (or re-index) one week's issue; returns the number of documents."""
+        docs = _docs(week, sections)
+        postings: Dict[str, List[int]] = {}
+        for i, d in enumerate(docs):
+            for tok in dict.fromkeys(tokenize(d["text"])):
+                postings.setdefault(tok, []).append(i)
+        shards = {shard_key(tok) for tok in postings}
+        # Drop the week's old postings from every shard it touched before, then add the new ones.
+        for key in shards | set(self.weeks.get(week, {}).get("shards", [])):
+            shard = self._shard(key)
+            for tok in [t for t, weeks in shard.items() if week in weeks]:
+                del shard[tok][week]
+                if not shard[tok]:
+                    del shard[tok]
+            self._dirty.add(key)
+        for tok, ids in postings.items():
+            self._shard(shard_key(tok)).setdefault(tok, {})[week] = ids
+        self.publisher.write(f"{SEARCH_DIR}/docs/{week}.json", _dump([d["doc"] for d in docs]))
+        self.weeks[week] = {"docs": len(docs), "shards": sorted(shards)}
+        return len(docs)
+
+    def finish(self) -> int:
+        """Write the changed shards, the week list and the search page; returns shards rewritten."""
+        written = 0
+        for key in sorted(self._dirty):
+            written += self.publisher.write(f"{SEARCH_DIR}/shards/{key}.json", _dump(self._shards[key]))
+        self._dirty.clear()
+        self.publisher.write(WEEKS_FILE, _dump(self.weeks))
+        self.publisher.write(f"{SEARCH_DIR}/search.js", SEARCH_JS)
+        self.publisher.write(f"{SEARCH_DIR}/index.html", self.publisher.rewrite_assets(SEARCH_PAGE, prefix="../"))
+        return written
+
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def index_issues(publisher: Publisher, issues: Iterable[Dict[str, Any]]) -> int:
+    """Add {"week", "sections"} issues to public/search/; returns the number of documents indexed."""
+    index = SearchIndex(publisher)
+    count = sum(index.add_week(it["week"], it["sections"]) for it in issues)
+    index.finish()
+    return count
+
+
+# Same tokenizer and shard keys as above; results are newest week first.
+SEARCH_JS = r"""(function () {
+  var cache = {};
+  function load(path) {
+    if (!cache[path]) cache[path] = fetch(path).then(function (r) { return r.ok ? r.json() : {}; }).catch(function () { return {}; });
+    return cache[path];
+  }
+  function tokenize(text) {
+    var out = [];
+    (text.toLowerCase().match(/[a-z0-9]+|[\u3400-\u9fff]+/g) || []).forEach(function (tok) {
+      if (tok.charCodeAt(0) >= 0x3400) {
+        for (var i = 0; i < Math.max(1, tok.length - 1); i++) out.push(tok.slice(i, i + 2));
+      } else if (tok.length > 1) out.push(tok);
+    });
+    return out.filter(function (t, i) { return out.indexOf(t) === i; });
+  }
+  function shardKey(tok) {
+    var c = tok.charCodeAt(0);
+    return c < 128 ? tok[0] : "u" + ("0" + (c & 255).toString(16)).slice(-2);
+  }
+  function search(query, limit) {
+    var toks = tokenize(query);
+    if (!toks.length) return Promise.resolve([]);
+    return Promise.all(toks.map(function (t) { return load("shards/" + shardKey(t) + ".json"); })).then(function (shards) {
+      // Every query token must match; each posting is week -> document numbers.
+      var hits = null;
+      toks.forEach(function (t, i) {
+        var postings = shards[i][t] || {}, keys = {};
+        Object.keys(postings).forEach(function (w) { postings[w].forEach(function (d) { keys[w + "/" + d] = true; }); });
+        hits = hits === null ? keys : Object.keys(hits).reduce(function (acc, k) { if (keys[k]) acc[k] = true; return acc; }, {});
+      });
+      var found = Object.keys(hits).map(function (k) { var p = k.split("/"); return [p[0], +p[1]]; });
+      found.sort(function (a, b) { return a[0] === b[0] ? a[1] - b[1] : (a[0] < b[0] ? 1 : -1); });
+      found = found.slice(0, limit || 50);
+      var weeks = found.map(function (f) { return f[0]; }).filter(function (w, i, all) { return all.indexOf(w) === i; });
+      return Promise.all(weeks.map(function (w) { return load("docs/" + w + ".json"); })).then(function (docs) {
+        return found.map(function (f) {
+          var d = docs[weeks.indexOf(f[0])][f[1]] || [];
+          return { week: f[0], section: d[0], title: d[1], url: d[2], snippet: d[3], page: "../" + d[4] };
+        });
+      });
+    });
+  }
+  window.nevSearch = search;
+  var input = document.getElementById("q"), list = document.getElementById("results");
+  if (!input || !list) return;
+  var seq = 0;
+  input.addEventListener("input", function () {
+    var mine = ++seq;
+    search(input.value).then(function (results) {
+      if (mine !== seq) return;
+      list.innerHTML = "";
+      results.forEach(function (r) {
+        var li = document.createElement("li"), a = document.createElement("a"), meta = document.createElement("small");
+        a.href = r.page; a.textContent = r.title || r.url;
+        meta.className = "meta"; meta.textContent = " " + r.week + " · " + r.section + " — " + (r.snippet || "");
+        li.appendChild(a); li.appendChild(meta); list.appendChild(li);
+      });
+    });
+  });
+})();
+"""
+
+SEARCH_PAGE = """<!doctype html>
+<html lang="en">
+<head>
+  <meta charset="utf-8"/>
+  <meta name="viewport" content="width=device-width,initial-scale=1"/>
+  <title>NEV Weekly Newsletter · Search</title>
+  <link rel="stylesheet" href="./style.css"/>
+</head>
+<body>
+  <div class="container">
+    <header>
+      <h1>Search past issues</h1>
+      <p class="meta"><a href="../index.html">latest issue</a> · <a href="../archive/index.html">archive</a></p>
+    </header>
+    <section class="section">
+      <input id="q" type="search" placeholder="Model, person, company… / 车型、人物、公司" autofocus style="width:100%;padding:.5rem"/>
+      <ol id="results"></ol>
+    </section>
+  </div>
+  <script src="./search.js"></script>
+</body>
+</html>
+"""
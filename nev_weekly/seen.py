@@ -0,0 +1,173 @@
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .metrics import METRICS
+from .publish import atomic_write
+
+
+# Cross-run "already published" set for news and competitor links. Exact keys
+# (normalized URL, normalized title fingerprint) are kept in data/seen.jsonl,
+# which the weekly workflow commits next to the history, so the set survives
+# between scheduled runs. Each line holds one key with its first and last
+# publication time, oldest first; keys not published again within the
+# retention window are pruned when the file is rewritten. On open, the keys
+# go into an in-memory Bloom filter so the common "never seen" answer costs a
+# few bit probes and only a Bloom hit consults the exact set. Items published
+# within the grace window (the current week's earlier runs) are not treated as
+# seen, so re-running a week reproduces the same issue.
+
+DEFAULT_SEEN_PATH = Path("data") / "seen.jsonl"
+DEFAULT_RETENTION_DAYS = 28
+DEFAULT_GRACE_DAYS = 3
+
+
+def seen_path() -> Path:
+    return Path(os.getenv("NEV_SEEN_PATH") or DEFAULT_SEEN_PATH)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+_TRACKING = re.compile(r"^(utm_|spm$|from$|share|fbclid$|gclid$)")
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING.match(k.lower())))
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
+
+
+def title_fingerprint(title: str) -> str:
+    text = re.sub(r"[\W_]+", "", title.casefold())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16] if text else ""
+
+
+def _keys(url: Optional[str], title: Optional[str]) -> List[str]:
+    keys = []
+    if url:
+        keys.append("u:" + normalize_url(url))
+    fp = title_fingerprint(title or "")
+    if fp:
+        keys.append("t:" + fp)
+    return keys
+
+
+class SeenStore:
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        retention_days: Optional[float] = None,
+        grace_days: float = DEFAULT_GRACE_DAYS,
+        now: Optional[float] = None,
+    ) -> None:
+        self.path = Path(path) if path else seen_path()
+        if retention_days is None:
+            retention_days = float(os.getenv("NEV_SEEN_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+        self.now = time.time() if now is None else now
+        self.cutoff = self.now - grace_days * 86400
+        self.stats: Dict[str, int] = {"checked": 0, "seen": 0, "false_positives": 0}
+        self._lock = threading.Lock()
+        # key -> [first_seen, last_seen]
+        self._entries: Dict[str, List[float]] = {}
+        self._dirty = False
+        for key, first, last in self._load():
+            entry = self._entries.setdefault(key, [first, last])
+            entry[0], entry[1] = min(entry[0], first), max(entry[1], last)
+        expired = self.now - retention_days * 86400
+        for key in [k for k, (_, last) in self._entries.items() if last < expired]:
+            del self._entries[key]
+            self._dirty = True
+        published = [k for k, (first, _) in self._entries.items() if first < self.cutoff]
+        self.bloom = BloomFilter(max(1000, 2 * len(published)))
+        for key in published:
+            self.bloom.add(key)
+
+    def _load(self) -> List[Tuple[str, float, float]]:
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as fh:
+                lines = [json.loads(line) for line in fh if line.strip()]
+            return [(it["key"], float(it["first_seen"]), float(it["last_seen"])) for it in lines]
+        # Earlier releases kept the set in .cache/seen.sqlite; it is imported once.
+        legacy = Path(os.getenv("NEV_CACHE_DIR", ".cache")) / "seen.sqlite"
+        if self.path != DEFAULT_SEEN_PATH or not legacy.exists():
+            return []
+        db = sqlite3.connect(str(legacy))
+        try:
+            rows = db.execute("SELECT key, first_seen, last_seen FROM seen").fetchall()
+        except sqlite3.Error:
+            rows = []
+        finally:
+            db.close()
+        self._dirty = bool(rows)
+        return rows
+
+    def _known(self, key: str) -> bool:
+        if key not in self.bloom:
+            return False
+        with self._lock:
+            entry = self._entries.get(key)
+            known = entry is not None and entry[0] < self.cutoff
+            if not known:
+                self.stats["false_positives"] += 1
+        return known
+
+    def seen(self, url: Optional[str] = None, title: Optional[str] = None) -> bool:
+        """True when the URL or the title was published in an earlier run within retention."""
+        hit = any(self._known(k) for k in _keys(url, title))
+        with self._lock:
+            self.stats["checked"] += 1
+            self.stats["seen"] += int(hit)
+        if hit:
+            METRICS.incr("seen.skipped")
+        return hit
+
+    def mark(self, items: Iterable[Dict[str, str]]) -> None:
+        """Record published {"url", "title"} items; the first publication time is kept."""
+        keys = [k for it in items for k in _keys(it.get("url"), it.get("title"))]
+        with self._lock:
+            for key in keys:
+                self._entries.setdefault(key, [self.now, self.now])[1] = self.now
+            self._dirty = self._dirty or bool(keys)
+
+    def flush(self) -> None:
+        """Rewrite data/seen.jsonl when keys were marked or pruned since it was read."""
+        with self._lock:
+            if not self._dirty:
+                return
+            ordered = sorted(self._entries.items(), key=lambda kv: (kv[1][0], kv[0]))
+            lines = [json.dumps({"key": k, "first_seen": round(first), "last_seen": round(last)}) for k, (first, last) in ordered]
+            atomic_write(self.path, "".join(line + "\n" for line in lines).encode("utf-8"))
+            self._dirty = False
+
+    def close(self) -> None:
+        self.flush()
@@ -0,0 +1,95 @@
+import hashlib
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Near-duplicate detection for search results. Each text gets a 64-bit SimHash
+# over word tokens, CJK character bigrams and adjacent-token shingles; two
+# texts are near-duplicates when their fingerprints differ in at most
+# max_distance bits. The index splits fingerprints into max_distance + 1 bands
+# and only compares against items sharing a band (by the pigeonhole principle
+# any match shares at least one), so clustering n results is roughly linear
+# instead of n² pairwise comparisons.
+
+BITS = 64
+DEFAULT_MAX_DISTANCE = 6  # unrelated texts sit around 32 bits apart
+
+_TOKEN = re.compile(r"[a-z0-9]+|[㐀-鿿]+")
+
+
+def _tokens(text: str) -> List[str]:
+    out: List[str] = []
+    for tok in _TOKEN.findall(text.casefold()):
+        if tok[0] >= "㐀":
+            # CJK runs have no spaces: use overlapping character bigrams.
+            out.extend(tok[i : i + 2] for i in range(max(1, len(tok) - 1)))
+        else:
+            out.append(tok)
+    return out
+
+
+# Per-bit vote counting is done in parallel: each feature hash is spread into
+# 64 counter lanes of a single big int (one lane per bit), so summing features
+# is one big-int addition instead of a 64-step loop.
+_LANE = 32
+# _BYTE_LANES[j][b]: the lanes of byte value b at byte position j of the hash.
+_BYTE_LANES = [
+    [sum(1 << (_LANE * (8 * j + i)) for i in range(8) if (b >> i) & 1) for b in range(256)] for j in range(8)
+]
+
+
+@lru_cache(maxsize=1 << 12)
+def _spread(feature: str) -> int:
+    d = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    t = _BYTE_LANES
+    return t[0][d[0]] | t[1][d[1]] | t[2][d[2]] | t[3][d[3]] | t[4][d[4]] | t[5][d[5]] | t[6][d[6]] | t[7][d[7]]
+
+
+def simhash(text: str) -> int:
+    tokens = _tokens(text)
+    feats = Counter(tokens)
+    feats.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    total = sum(feats.values())
+    ones = sum(count * _spread(feat) for feat, count in feats.items())
+    # A bit is set when more than half of the (weighted) features have it set.
+    mask = (1 << _LANE) - 1
+    return sum(1 << bit for bit in range(BITS) if 2 * ((ones >> (_LANE * bit)) & mask) > total)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE) -> None:
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.width = BITS // self.bands
+        self._buckets: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        self.clusters = 0
+
+    def _keys(self, fp: int) -> Iterable[Tuple[int, int]]:
+        mask = (1 << self.width) - 1
+        return ((band, (fp >> (band * self.width)) & mask) for band in range(self.bands))
+
+    def find(self, fp: int) -> Optional[int]:
+        """Cluster id of an indexed near-duplicate of fp, if any."""
+        for key in self._keys(fp):
+            for other, cluster in self._buckets.get(key, ()):
+                if hamming(fp, other) <= self.max_distance:
+                    return cluster
+        return None
+
+    def assign(self, fp: int) -> Tuple[int, bool]:
+        """Add fp and return (cluster id, whether it started a new cluster)."""
+        cluster = self.find(fp)
+        created = cluster is None
+        if created:
+            cluster = self.clusters
+            self.clusters += 1
+        for key in self._keys(fp):
+            self._buckets.setdefault(key, []).append((fp, cluster))
+        return cluster, created
+
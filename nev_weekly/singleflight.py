@@ -0,0 +1,41 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+# Coalesces identical calls within one run: the first caller for a key does
+# the work, concurrent callers wait for it, and later callers reuse the result.
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException = None  # type: ignore
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.value = fn()
+            except BaseException as e:
+                call.error = e
+                # Failures are not memoized, so a later caller may retry.
+                with self._lock:
+                    self._calls.pop(key, None)
+            finally:
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.value
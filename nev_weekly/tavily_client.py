@@ -1,19 +1,74 @@
-from typing import List, Dict, Optional
-from tenacity import retry, stop_after_attempt, wait_exponential
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Dict, Optional, Tuple
 
-try:
-    from tavily import TavilyClient  # type: ignore
-except Exception:
-    TavilyClient = None  # type: ignore
+from . import cassette, resilience
+from .budget import CORE, BudgetManager
+from .cache import DiskCache, normalize_query
+from .metrics import METRICS
+from .singleflight import SingleFlight
+
+
+DEFAULT_CONCURRENCY = 8
+
+
+def _tavily_client(api_key: Optional[str]) -> Any:
+    # The SDK is imported only when there is a key to use it with.
+    if not api_key:
+        return None
+    try:
+        from tavily import TavilyClient  # type: ignore
+    except Exception:
+        return None
+    return TavilyClient(api_key=api_key)
+
+
+def _cache_key(query: str, max_results: int) -> str:
+    return f"{normalize_query(query)}|{max_results}"
 
 
 class TavilyWrapper:
-    def __init__(self, api_key: Optional[str] = None) -> None:
-        self.enabled = bool(api_key and TavilyClient)
-        self.client = TavilyClient(api_key=api_key) if self.enabled else None
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        cache: Optional[DiskCache] = None,
+        budget: Optional[BudgetManager] = None,
+    ) -> None:
+        self.client = _tavily_client(api_key)
+        # In replay mode searches are served from the cassette, so no key is needed.
+        self.enabled = self.client is not None or cassette.active().replaying
+        self.cache = cache
+        # Identical queries within a run share one request (in flight or already completed).
+        self._flights = SingleFlight()
+        # Upper bound on in-flight requests across every search_many call sharing this wrapper.
+        self.concurrency = max(1, concurrency or int(os.getenv("TAVILY_CONCURRENCY", DEFAULT_CONCURRENCY)))
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        # Optional run-wide query budget and rate limit; cache hits are never charged.
+        self.budget = budget
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
-    def _search(self, query: str, max_results: int = 10) -> List[Dict]:
+    def _search(self, query: str, max_results: int = 10, priority: str = CORE) -> List[Dict]:
+        # Retries back off within the stage deadline, and the "tavily" breaker fails fast
+        # once the provider keeps erroring. Every retry and hedged duplicate is a query
+        # of its own and is charged to the budget; when none is left, retrying stops.
+        charge = (lambda: self.budget.charge(priority)) if self.budget is not None else None
+        return resilience.call(
+            lambda: self._attempt(query, max_results, priority), "tavily", attempts=3, on_hedge=charge, on_retry=charge
+        )
+
+    def _attempt(self, query: str, max_results: int, priority: str) -> List[Dict]:
+        if self.budget is not None:
+            self.budget.throttle(priority)
+        METRICS.incr("tavily.requests")
+        with METRICS.timer("tavily.latency_ms"):
+            return cassette.active().through(
+                "tavily",
+                {"query": query, "max_results": max_results},
+                lambda: self._live_search(query, max_results),
+            )
+
+    def _live_search(self, query: str, max_results: int) -> List[Dict]:
         assert self.client is not None
         res = self.client.search(query=query, max_results=max_results)
         items = []
@@ -27,10 +82,57 @@ class TavilyWrapper:
             )
         return items
 
-    def search(self, query: str, max_results: int = 10) -> List[Dict]:
+    def _fetch(self, key: str, query: str, max_results: int, priority: str) -> List[Dict]:
+        # Record/replay runs go straight to the cassette: a cache hit while recording
+        # would leave the query out of the recording and make replay miss it.
+        cache = self.cache if cassette.active().mode == cassette.OFF else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
         if not self.enabled:
             return []
+        if self.budget is not None:
+            self.budget.charge(priority)
+            effective = self.budget.max_results(max_results, priority)
+            if effective != max_results:
+                # A shrunken result list is stored under its own size, never as the full answer.
+                key, max_results = _cache_key(query, effective), effective
+        with self._slots:
+            items = self._search(query=query, max_results=max_results, priority=priority)
+        METRICS.incr("tavily.queries")
+        METRICS.incr("tavily.results", len(items))
+        if cache is not None:
+            try:
+                cache.set(key, items)
+            except Exception as e:
+                # The results were paid for; a cache write failure must not lose them.
+                METRICS.error("tavily.cache", f"{type(e).__name__}: {e}")
+        return items
+
+    def _search_safe(self, query: str, max_results: int, priority: str = CORE) -> Tuple[List[Dict], Optional[str]]:
+        key = _cache_key(query, max_results)
         try:
-            return self._search(query=query, max_results=max_results)
-        except Exception:
+            return self._flights.do(key, lambda: self._fetch(key, query, max_results, priority)), None
+        except Exception as e:
+            err = f"{type(e).__name__}: {e}"
+            METRICS.error("tavily", f"{query!r}: {err}")
+            return [], err
+
+    def search(self, query: str, max_results: int = 10, priority: str = CORE) -> List[Dict]:
+        items, _ = self._search_safe(query, max_results, priority)
+        return items
+
+    def search_many(self, queries: List[str], max_results: int = 10, priority: str = CORE) -> List[Dict]:
+        """Run queries concurrently; returns one {"query", "results", "error"} dict per query, in input order.
+
+        priority is the budget class (core, standard, backfill) the queries are charged to.
+        """
+        if not queries:
             return []
+        unique = list(dict.fromkeys(queries))
+        workers = min(self.concurrency, len(unique))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tavily") as pool:
+            search = resilience.bind(lambda q: self._search_safe(q, max_results, priority))
+            outcomes = dict(zip(unique, pool.map(search, unique)))
+        return [{"query": q, "results": outcomes[q][0], "error": outcomes[q][1]} for q in queries]
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import pytest
+
+from nev_weekly import cassette, resilience
+from nev_weekly.budget import BACKFILL, CORE, STANDARD, BudgetExceeded, BudgetManager, TokenBucket
+from nev_weekly.tavily_client import TavilyWrapper
+
+
+def spend(budget, priority):
+    n = 0
+    while True:
+        try:
+            budget.charge(priority)
+        except BudgetExceeded:
+            return n
+        n += 1
+
+
+def test_lower_priorities_leave_a_reserve_for_higher_ones():
+    budget = BudgetManager(max_queries=10, reserve=0.2)
+    assert spend(budget, BACKFILL) == 6  # keeps 40% back
+    assert spend(budget, STANDARD) == 2  # up to 80%
+    assert spend(budget, CORE) == 2  # the rest
+    snap = budget.snapshot()
+    assert snap["by_priority"] == {CORE: 2, STANDARD: 2, BACKFILL: 6}
+    assert snap["denied"] == 3
+
+
+def test_credit_budget_is_enforced_too():
+    budget = BudgetManager(max_credits=5)
+    budget.charge(CORE, credits=4)
+    with pytest.raises(BudgetExceeded):
+        budget.charge(CORE, credits=2)
+
+
+def test_max_results_shrinks_once_half_the_budget_is_spent():
+    budget = BudgetManager(max_queries=10)
+    for _ in range(5):
+        budget.charge(CORE)
+    assert budget.max_results(10) == 10
+    for _ in range(3):
+        budget.charge(CORE)
+    assert budget.max_results(10) == 4  # 20% left
+    budget.charge(CORE)
+    budget.charge(CORE)
+    assert budget.max_results(10) == 3  # never below MIN_RESULTS
+    assert budget.max_results(2) == 2
+
+
+def test_unlimited_budget_never_shrinks():
+    budget = BudgetManager()
+    for _ in range(1000):
+        budget.charge(BACKFILL)
+    assert budget.max_results(10) == 10
+
+
+def test_token_bucket_respects_the_rate():
+    bucket = TokenBucket(rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # Two tokens come from the burst; the other four need 4 / 20 = 0.2 s.
+    assert 0.18 <= time.monotonic() - started < 1.0
+
+
+def test_queued_waiters_are_ordered_by_priority():
+    bucket = TokenBucket(rate=5, burst=1)
+    bucket.acquire()
+    order = []
+    threads = []
+    for priority, name in ((2, "backfill"), (1, "standard"), (0, "core")):
+        t = threading.Thread(target=lambda p=priority, n=name: (bucket.acquire(p), order.append(n)))
+        t.start()
+        threads.append(t)
+        time.sleep(0.02)  # all three queue while the bucket is empty
+    for t in threads:
+        t.join()
+    assert order == ["core", "standard", "backfill"]
+
+
+def test_every_retry_is_charged(monkeypatch):
+    monkeypatch.setattr(resilience, "_backoff", lambda attempt, base, cap: 0.0)
+    previous = cassette.use(cassette.Cassette(cassette.OFF))
+    try:
+        budget = BudgetManager(max_queries=10)
+        w = TavilyWrapper(budget=budget)
+        w.enabled = True
+        calls = []
+
+        def flaky(query, max_results):
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("reset")
+            return [{"title": "", "content": "", "url": "u"}]
+
+        w._live_search = flaky
+        assert w.search("retry me") == [{"title": "", "content": "", "url": "u"}]
+        assert len(calls) == 3
+        assert budget.snapshot()["used"]["queries"] == 3
+    finally:
+        cassette.use(previous)
+
+
+def test_retries_stop_when_the_budget_runs_out(monkeypatch):
+    monkeypatch.setattr(resilience, "_backoff", lambda attempt, base, cap: 0.0)
+    previous = cassette.use(cassette.Cassette(cassette.OFF))
+    try:
+        budget = BudgetManager(max_queries=1)
+        w = TavilyWrapper(budget=budget)
+        w.enabled = True
+        calls = []
+
+        def down(query, max_results):
+            calls.append(1)
+            raise ConnectionError("reset")
+
+        w._live_search = down
+        assert w.search("budget stop") == []
+        assert len(calls) == 1
+        assert budget.snapshot()["used"]["queries"] == 1
+    finally:
+        cassette.use(previous)
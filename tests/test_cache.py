@@ -0,0 +1,58 @@
+from nev_weekly.cache import DiskCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entry_expires_after_its_ttl(tmp_path):
+    clock = FakeClock()
+    cache = DiskCache(tmp_path / "cache.sqlite", ttl=60, clock=clock)
+    cache.set("q", [1, 2])
+    clock.now += 59
+    assert cache.get("q") == [1, 2]
+    clock.now += 2
+    assert cache.get("q") is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_per_entry_ttl_overrides_the_default(tmp_path):
+    clock = FakeClock()
+    cache = DiskCache(tmp_path / "cache.sqlite", ttl=3600, clock=clock)
+    cache.set("short", "x", ttl=5)
+    clock.now += 10
+    assert cache.get("short") is None
+
+
+def test_least_recently_used_entry_is_evicted_first(tmp_path):
+    clock = FakeClock()
+    cache = DiskCache(tmp_path / "cache.sqlite", max_entries=2, clock=clock)
+    cache.set("a", 1)
+    clock.now += 1
+    cache.set("b", 2)
+    clock.now += 1
+    assert cache.get("a") == 1  # "a" is now more recent than "b"
+    clock.now += 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats["evictions"] == 1
+
+
+def test_namespaces_are_separate(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    DiskCache(path, namespace="tavily").set("q", "search")
+    assert DiskCache(path, namespace="llm").get("q") is None
+    assert DiskCache(path, namespace="tavily").get("q") == "search"
+
+
+def test_refresh_misses_but_still_writes(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    fresh = DiskCache(path, refresh=True)
+    fresh.set("q", "new")
+    assert fresh.get("q") is None
+    assert DiskCache(path).get("q") == "new"
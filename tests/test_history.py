@@ -0,0 +1,62 @@
+import json
+import sqlite3
+
+from nev_weekly.history import HistoryStore
+
+
+def sections(*models, generated_at="2026-01-05 08:00:00Z"):
+    rows = [{"model_id": m, "model": m.upper(), "rank": i + 1} for i, m in enumerate(models)]
+    return {"meta": {"generated_at": generated_at}, "sales": {"20-30万": rows}}
+
+
+def test_snapshots_round_trip_through_jsonl(tmp_path):
+    path = tmp_path / "history.jsonl"
+    store = HistoryStore(path)
+    store.save("2026-W02", sections("b", "a"))
+    store.save("2026-W01", sections("a", "b"))
+    store.close()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["week"] for line in lines] == ["2026-W01", "2026-W02"]
+
+    store = HistoryStore(path)
+    try:
+        changes = {c["model_id"]: c for c in store.rank_changes("2026-W02")}
+        assert changes["b"]["status"] == "up" and changes["a"]["delta"] == -1
+        assert store.load("2026-W01")["meta"]["generated_at"] == "2026-01-05 08:00:00Z"
+    finally:
+        store.close()
+
+
+def test_resaving_a_week_only_changes_its_line(tmp_path):
+    path = tmp_path / "history.jsonl"
+    store = HistoryStore(path)
+    store.save("2026-W01", sections("a"))
+    store.save("2026-W02", sections("a"))
+    store.close()
+    before = path.read_text(encoding="utf-8").splitlines()
+
+    store = HistoryStore(path)
+    store.save("2026-W02", sections("a", "b"))
+    store.close()
+    after = path.read_text(encoding="utf-8").splitlines()
+    assert after[0] == before[0] and after[1] != before[1]
+
+
+def test_reading_without_saving_leaves_the_file_alone(tmp_path):
+    path = tmp_path / "history.jsonl"
+    HistoryStore(path).close()
+    assert not path.exists()
+
+
+def test_legacy_sqlite_is_imported(tmp_path):
+    db = sqlite3.connect(str(tmp_path / "history.sqlite"))
+    db.execute("CREATE TABLE snapshots (week TEXT PRIMARY KEY, generated_at TEXT NOT NULL, sections TEXT NOT NULL)")
+    db.execute("INSERT INTO snapshots VALUES (?, ?, ?)", ("2025-W52", "", json.dumps(sections("a"))))
+    db.commit()
+    db.close()
+
+    store = HistoryStore(tmp_path / "history.jsonl")
+    assert store.previous_week("2026-W01") == "2025-W52"
+    store.close()
+    assert (tmp_path / "history.jsonl").exists()
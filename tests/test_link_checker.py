@@ -0,0 +1,34 @@
+from nev_weekly import link_checker, resilience
+from nev_weekly.link_checker import check_links, format_link_report
+from nev_weekly.link_store import LinkStore
+
+
+def test_links_cut_off_by_the_deadline_are_skipped_not_stored(tmp_path):
+    store = LinkStore(tmp_path / "links.sqlite")
+    results = check_links(["https://a.example/x", "https://b.example/y"], deadline=0, store=store)
+    assert [r["source"] for r in results] == ["skipped", "skipped"]
+    assert store.get("https://a.example/x") is None
+
+    report = format_link_report(results)
+    assert "Invalid: 0" in report and "Skipped (not checked): 2" in report
+    assert "- https://a.example/x (DeadlineExceeded)" in report
+
+
+def test_open_breaker_skips_the_host(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEV_BREAKER_FAILURES", "1")
+    resilience.breaker("host:dead.example").failure()
+    results = check_links(["https://dead.example/"], store=LinkStore(tmp_path / "links.sqlite"))
+    assert results[0]["source"] == "skipped" and results[0]["reason"] == "CircuitOpen"
+
+
+def test_failed_probe_is_reported_and_stored(tmp_path, monkeypatch):
+    async def refuse(client, url, headers):
+        raise ConnectionError("refused")
+
+    monkeypatch.setattr(link_checker, "_probe", refuse)
+    monkeypatch.setattr(resilience, "_backoff", lambda attempt, base, cap: 0.0)
+    store = LinkStore(tmp_path / "links.sqlite")
+    results = check_links(["https://down.example/"], store=store)
+    assert results == [{"url": "https://down.example/", "status": 0, "ok": False, "source": "checked"}]
+    assert store.get("https://down.example/")["ok"] is False
+    assert "Invalid: 1" in format_link_report(results)
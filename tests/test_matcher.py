@@ -0,0 +1,50 @@
+from nev_weekly.matcher import KeywordMatcher
+from nev_weekly.models_index import ModelIndex
+
+
+def test_overlapping_and_nested_patterns_all_match():
+    m = KeywordMatcher(["he", "she", "his", "hers"])
+    assert sorted(m.finditer("ushers")) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_pattern_inside_another_pattern():
+    m = KeywordMatcher(["智能调光", "调光", "光"])
+    hits = sorted(m.finditer("智能调光玻璃"))
+    assert hits == [(0, 4, "智能调光"), (2, 4, "调光"), (3, 4, "光")]
+
+
+def test_failure_links_recover_after_a_partial_match():
+    m = KeywordMatcher(["abcd", "bce"])
+    assert list(m.finditer("abce")) == [(1, 4, "bce")]
+
+
+def test_case_insensitive_counts_keep_every_original_spelling():
+    m = KeywordMatcher(["PDLC", "pdlc", "SPD"])
+    assert m.counts("PDLC film, pdlc glass and spd") == {"PDLC": 2, "pdlc": 2, "SPD": 1}
+
+
+def test_no_patterns_match_nothing():
+    assert list(KeywordMatcher([]).finditer("anything")) == []
+
+
+def index():
+    return ModelIndex({
+        "li-l9": {"name": "理想L9", "aliases": ["L9"]},
+        "li-l": {"name": "理想", "aliases": ["Li Auto"]},
+        "aito-m9": {"name": "问界M9", "aliases": ["M9"]},
+    })
+
+
+def test_model_index_prefers_the_longest_alias():
+    hits = index().find("理想L9 上市")
+    assert [(h["id"], h["start"], h["end"]) for h in hits] == [("li-l9", 0, 4)]
+
+
+def test_model_index_hits_do_not_overlap_and_stay_in_text_order():
+    hits = index().find("M9 vs 理想L9 vs 理想")
+    assert [h["id"] for h in hits] == ["aito-m9", "li-l9", "li-l"]
+
+
+def test_latin_alias_must_not_be_glued_to_other_letters():
+    assert index().find("XL90 and M90") == []
+    assert [h["id"] for h in index().find("(L9)")] == ["li-l9"]
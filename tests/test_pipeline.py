@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from nev_weekly.pipeline import Stage, run_pipeline
+from nev_weekly.resilience import remaining
+
+
+def test_rejects_unknown_dependency():
+    with pytest.raises(ValueError, match="unknown stages"):
+        run_pipeline([Stage("a", lambda missing: 1, deps=["missing"])])
+
+
+def test_rejects_cycle():
+    stages = [Stage("a", lambda b: 1, deps=["b"]), Stage("b", lambda a: 1, deps=["a"])]
+    with pytest.raises(ValueError, match="cycle"):
+        run_pipeline(stages)
+
+
+def test_rejects_duplicate_names():
+    with pytest.raises(ValueError, match="duplicate"):
+        run_pipeline([Stage("a", lambda: 1), Stage("a", lambda: 2)])
+
+
+def test_results_flow_along_dependencies():
+    stages = [
+        Stage("total", lambda x, y: x + y, deps=["x", "y"]),
+        Stage("x", lambda: 2),
+        Stage("y", lambda x: x * 10, deps=["x"]),
+    ]
+    results, report = run_pipeline(stages)
+    assert results == {"x": 2, "y": 20, "total": 22}
+    assert {r["status"] for r in report.values()} == {"ok"}
+
+
+def test_failed_stage_uses_default_and_dependents_still_run():
+    def boom():
+        raise RuntimeError("provider down")
+
+    stages = [Stage("news", boom, default=[]), Stage("count", lambda news: len(news), deps=["news"])]
+    results, report = run_pipeline(stages)
+    assert results == {"news": [], "count": 0}
+    assert report["news"]["status"] == "failed"
+    assert report["news"]["error"] == "RuntimeError: provider down"
+    assert report["count"]["status"] == "ok"
+
+
+def test_fallback_takes_precedence_over_default():
+    def boom(x):
+        raise RuntimeError("llm down")
+
+    stages = [Stage("x", lambda: 3), Stage("text", boom, deps=["x"], default="", fallback=lambda x: f"plain {x}")]
+    results, report = run_pipeline(stages)
+    assert results["text"] == "plain 3" and report["text"]["status"] == "failed"
+
+
+def test_failing_fallback_falls_back_to_default():
+    def boom():
+        raise RuntimeError("first")
+
+    def worse():
+        raise ValueError("second")
+
+    results, report = run_pipeline([Stage("text", boom, default="", fallback=worse)])
+    assert results["text"] == ""
+    assert "fallback failed: ValueError: second" in report["text"]["error"]
+
+
+def test_timeout_substitutes_default_without_waiting_for_the_stage():
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "late"
+
+    started = time.monotonic()
+    try:
+        results, report = run_pipeline([Stage("slow", slow, timeout=0.2, default="none"), Stage("fast", lambda: "ok")])
+    finally:
+        release.set()
+    assert time.monotonic() - started < 2
+    assert results == {"slow": "none", "fast": "ok"}
+    assert report["slow"]["status"] == "timeout"
+    assert report["slow"]["error"] == "exceeded 0.2s"
+
+
+def test_stage_timeout_is_the_deadline_for_its_calls():
+    results, _ = run_pipeline([Stage("a", lambda: remaining(), timeout=30), Stage("b", lambda: remaining())])
+    assert 0 < results["a"] <= 30
+    assert results["b"] is None
+
+
+def test_profiling_does_not_change_concurrent_stage_results(monkeypatch, tmp_path):
+    from nev_weekly.metrics import METRICS
+
+    monkeypatch.setenv("NEV_PROFILE", "1")
+    METRICS.reset()
+    together = threading.Barrier(3, timeout=5)
+
+    def stage(n):
+        def fn():
+            together.wait()  # all three run at the same time
+            return n * 2
+
+        return fn
+
+    results, report = run_pipeline([Stage(f"s{n}", stage(n), timeout=10) for n in range(3)])
+    assert results == {"s0": 0, "s1": 2, "s2": 4}
+    assert {r["status"] for r in report.values()} == {"ok"}
+    assert len(METRICS.profiles) + METRICS.counters.get("profile.skipped", 0) == 3
+    assert METRICS.dump_profile(tmp_path / "profile.pstats").exists()
@@ -0,0 +1,20 @@
+from nev_weekly.publish import Publisher
+
+
+def test_fingerprint_keeps_earlier_hashed_copies(tmp_path):
+    (tmp_path / "style.css").write_text("body{color:red}", encoding="utf-8")
+    publisher = Publisher(tmp_path)
+    old = publisher.fingerprint("style.css")
+    (tmp_path / "style.css").write_text("body{color:blue}", encoding="utf-8")
+    new = publisher.fingerprint("style.css")
+
+    assert old != new
+    assert (tmp_path / old).exists() and (tmp_path / new).exists()
+    assert old in publisher.manifest["files"]
+    assert publisher.rewrite_assets('<link href="./style.css"/>') == f'<link href="{new}"/>'
+
+
+def test_unchanged_content_is_not_rewritten(tmp_path):
+    publisher = Publisher(tmp_path)
+    assert publisher.write("index.html", "<p>Generated 08:00</p>", volatile=["08:00"])
+    assert not publisher.write("index.html", "<p>Generated 09:30</p>", volatile=["09:30"])
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from nev_weekly import resilience
+from nev_weekly.resilience import CircuitBreaker, CircuitOpen, DeadlineExceeded, acall, bind, call, deadline, remaining
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    b = CircuitBreaker("tavily", failures=2, reset_after=30, clock=clock)
+    b.allow()
+    b.failure()
+    assert b.state == "closed"
+    b.failure()
+    assert b.state == "open"
+    with pytest.raises(CircuitOpen):
+        b.allow()
+
+    clock.now += 30
+    assert b.state == "half-open"
+    b.allow()  # the single probe
+    with pytest.raises(CircuitOpen):
+        b.allow()
+    b.success()
+    assert b.state == "closed" and b.failures == 0
+    assert b.rejected == 2
+
+
+def test_failed_probe_reopens_for_a_full_period():
+    clock = FakeClock()
+    b = CircuitBreaker("llm", failures=1, reset_after=10, clock=clock)
+    b.failure()
+    clock.now += 10
+    b.allow()
+    b.failure()
+    assert b.state == "open"
+    clock.now += 9
+    assert b.state == "open"
+    clock.now += 1
+    assert b.state == "half-open"
+
+
+def test_released_probe_frees_the_slot():
+    clock = FakeClock()
+    b = CircuitBreaker("host:a", failures=1, reset_after=5, clock=clock)
+    b.failure()
+    clock.now += 5
+    b.allow()
+    b.release()
+    b.allow()
+    assert b.state == "half-open"
+
+
+def test_nested_deadline_never_extends_the_outer_one():
+    assert remaining() is None
+    with deadline(10):
+        with deadline(100):
+            assert remaining() <= 10
+        with deadline(1):
+            assert remaining() <= 1
+        assert 1 < remaining() <= 10
+    assert remaining() is None
+
+
+def test_bind_carries_the_deadline_into_other_threads():
+    seen = {}
+    with deadline(5):
+        fn = bind(lambda: seen.setdefault("left", remaining()))
+    thread = threading.Thread(target=fn)
+    thread.start()
+    thread.join()
+    assert 0 < seen["left"] <= 5
+    assert remaining() is None
+
+
+def test_call_stops_waiting_at_the_deadline():
+    release = threading.Event()
+    started = time.monotonic()
+    try:
+        with deadline(0.2), pytest.raises(DeadlineExceeded):
+            call(lambda: release.wait(5), "test-deadline", attempts=1)
+    finally:
+        release.set()
+    assert time.monotonic() - started < 2
+
+
+def test_abandoned_calls_run_on_daemon_threads():
+    release = threading.Event()
+    names = []
+
+    def slow():
+        names.append(threading.current_thread())
+        release.wait(5)
+
+    try:
+        with deadline(0.1), pytest.raises(DeadlineExceeded):
+            call(slow, "test-daemon", attempts=1)
+        assert names and names[0].daemon
+    finally:
+        release.set()
+
+
+def test_sync_hedge_wins_when_the_first_request_stalls(monkeypatch):
+    monkeypatch.setenv("NEV_HEDGE_AFTER", "0.05")
+    release = threading.Event()
+    calls = []
+    hedges = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    try:
+        assert call(fn, "test-hedge", attempts=1, on_hedge=lambda: hedges.append(1)) == "fast"
+    finally:
+        release.set()
+    assert len(calls) == 2 and hedges == [1]
+
+
+def test_hedge_veto_keeps_waiting_for_the_first_request(monkeypatch):
+    monkeypatch.setenv("NEV_HEDGE_AFTER", "0.02")
+
+    def veto():
+        raise RuntimeError("budget exhausted")
+
+    def fn():
+        time.sleep(0.1)
+        return "first"
+
+    assert call(fn, "test-veto", attempts=1, on_hedge=veto) == "first"
+
+
+def test_async_hedge_cancels_the_losing_request(monkeypatch):
+    monkeypatch.setenv("NEV_HEDGE_AFTER", "0.05")
+    cancelled = []
+    attempts = []
+
+    async def request():
+        attempts.append(1)
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "slow"
+        return "fast"
+
+    async def run():
+        result = await acall(request, "test-async-hedge", attempts=1)
+        await asyncio.sleep(0)  # let the cancellation land
+        return result
+
+    assert asyncio.run(run()) == "fast"
+    assert cancelled == [1]
+
+
+def test_non_idempotent_calls_are_never_hedged(monkeypatch):
+    monkeypatch.setenv("NEV_HEDGE_AFTER", "0.01")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.05)
+        return "once"
+
+    assert call(fn, "test-no-hedge", attempts=1, idempotent=False) == "once"
+    assert calls == [1]
+
+
+def test_open_breaker_fails_fast_without_calling(monkeypatch):
+    monkeypatch.setenv("NEV_BREAKER_FAILURES", "1")
+    calls = []
+
+    def boom():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        call(boom, "test-open", attempts=1)
+    with pytest.raises(CircuitOpen):
+        call(boom, "test-open", attempts=1)
+    assert calls == [1]
+    assert resilience.breaker_snapshot()["test-open"]["state"] == "open"
@@ -0,0 +1,69 @@
+from nev_weekly.sales_tables import merge_tables, parse_html, parse_units
+
+
+def table(*rows, caption=""):
+    cap = f"<caption>{caption}</caption>" if caption else ""
+    body = "".join("<tr>" + "".join(f"<td>{c}</td>" for c in row) + "</tr>" for row in rows)
+    return f"<table>{cap}{body}</table>"
+
+
+def test_price_header_is_not_units():
+    rows = parse_html(table(["车型", "销售价", "周销量"], ["问界M9", "35.98万", "1,200"]))
+    assert rows[0]["units"] == 1200
+    assert (rows[0]["price_low"], rows[0]["price_high"]) == (35.98, 35.98)
+
+
+def test_price_range_next_to_units():
+    rows = parse_html(table(["排名", "车型", "指导价", "销量"], ["1", "理想L9", "40.98-43.98万", "3,456辆"]))
+    assert [(r["model"], r["units"], r["price_low"], r["price_high"]) for r in rows] == [("理想L9", 3456, 40.98, 43.98)]
+
+
+def test_headerless_row_skips_year():
+    rows = parse_html(table(["1", "问界M9", "2025", "1,200"]))
+    assert rows[0]["units"] == 1200
+
+
+def test_headerless_row_skips_implausible_values():
+    assert parse_html(table(["1", "问界M9", "5"])) == []
+    assert parse_html(table(["1", "问界M9", "250000"])) == []
+
+
+def test_weekly_table_beats_monthly_on_one_page():
+    page = table(["车型", "销量"], ["问界M9", "16,500"], caption="3月销量") + table(["车型", "销量"], ["问界M9", "4,120"], caption="第12周销量")
+    rows = parse_html(page)
+    assert [r["units"] for r in rows] == [4120]
+    assert merge_tables({"u": rows})[0]["units"] == 4120
+
+
+def test_weekly_column_beats_monthly_column():
+    rows = parse_html(table(["车型", "月销量", "周销量", "累计销量"], ["问界M9", "16,500", "4,120", "80,000"]))
+    assert rows[0]["units"] == 4120 and rows[0]["weekly"]
+
+
+def test_merge_prefers_weekly_row_not_max():
+    rows = [
+        {"model_id": "m9", "model": "问界M9", "units": 9000, "weekly": False, "price_low": None, "price_high": None},
+        {"model_id": "m9", "model": "问界M9", "units": 4120, "weekly": True, "price_low": None, "price_high": None},
+    ]
+    assert merge_tables({"u": rows})[0]["units"] == 4120
+
+
+def test_merge_takes_median_across_pages():
+    row = lambda n: [{"model_id": "m9", "model": "问界M9", "units": n, "weekly": True, "price_low": None, "price_high": None}]
+    merged = merge_tables({"a": row(1000), "b": row(1200), "c": row(5000)})
+    assert merged[0]["units"] == 1200 and merged[0]["sources"] == ["a", "b", "c"]
+
+
+def test_units_parsing():
+    assert parse_units("12,345") == 12345
+    assert parse_units("12345辆") == 12345
+    assert parse_units("1.2万") is None
+    assert parse_units("1.2万", allow_wan=True) == 12000
+    assert parse_units("3万台", allow_wan=True) == 30000
+    assert parse_units("35.98") is None
+
+
+def test_wan_units_under_header_and_chunked_stream():
+    page = table(["车型", "周销量"], ["理想L6", "1.2万"], ["问界M9", "8,800"])
+    for chunk in (3, 7, 8192):
+        assert [r["units"] for r in parse_html(page, chunk=chunk)] == [12000, 8800]
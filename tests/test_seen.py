@@ -0,0 +1,61 @@
+import json
+
+from nev_weekly.seen import SeenStore
+
+DAY = 86400.0
+T0 = 1_790_000_000.0
+
+
+def test_published_items_are_seen_in_a_later_run(tmp_path):
+    path = tmp_path / "seen.jsonl"
+    store = SeenStore(path, now=T0)
+    store.mark([{"url": "https://www.example.com/a?utm_source=x", "title": "PDLC film deal"}])
+    store.close()
+
+    later = SeenStore(path, now=T0 + 7 * DAY)
+    assert later.seen(url="https://example.com/a")
+    assert later.seen(title="pdlc  film deal!")
+    assert not later.seen(url="https://example.com/b", title="Another story")
+    assert later.stats == {"checked": 3, "seen": 2, "false_positives": 0}
+
+
+def test_same_week_reruns_are_not_filtered(tmp_path):
+    path = tmp_path / "seen.jsonl"
+    store = SeenStore(path, now=T0)
+    store.mark([{"url": "https://example.com/a"}])
+    store.close()
+    assert not SeenStore(path, now=T0 + DAY).seen(url="https://example.com/a")
+
+
+def test_expired_keys_are_pruned_from_the_file(tmp_path):
+    path = tmp_path / "seen.jsonl"
+    store = SeenStore(path, retention_days=28, now=T0)
+    store.mark([{"url": "https://example.com/old"}])
+    store.close()
+    store = SeenStore(path, retention_days=28, now=T0 + 21 * DAY)
+    store.mark([{"url": "https://example.com/new"}])
+    store.close()
+
+    store = SeenStore(path, retention_days=28, now=T0 + 35 * DAY)
+    assert not store.seen(url="https://example.com/old")
+    assert store.seen(url="https://example.com/new")
+    store.close()
+    assert [json.loads(line)["key"] for line in path.read_text(encoding="utf-8").splitlines()] == ["u://example.com/new"]
+
+
+def test_new_keys_are_appended_oldest_first(tmp_path):
+    path = tmp_path / "seen.jsonl"
+    store = SeenStore(path, now=T0)
+    store.mark([{"url": "https://example.com/a"}])
+    store.close()
+    before = path.read_text(encoding="utf-8")
+    store = SeenStore(path, now=T0 + 7 * DAY)
+    store.mark([{"url": "https://example.com/b"}])
+    store.close()
+    assert path.read_text(encoding="utf-8").startswith(before)
+
+
+def test_unchanged_set_is_not_rewritten(tmp_path):
+    path = tmp_path / "seen.jsonl"
+    SeenStore(path, now=T0).close()
+    assert not path.exists()
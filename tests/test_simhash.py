@@ -0,0 +1,64 @@
+import random
+
+from nev_weekly.simhash import BITS, NearDuplicateIndex, hamming, simhash
+
+
+def flip(fp, *bits):
+    for b in bits:
+        fp ^= 1 << b
+    return fp
+
+
+def test_hamming():
+    assert hamming(0b1011, 0b0001) == 2
+    assert hamming(5, 5) == 0
+
+
+def test_bands_cover_the_fingerprint():
+    index = NearDuplicateIndex(max_distance=6)
+    assert index.bands == 7 and index.width == BITS // 7
+    assert len(list(index._keys(2**64 - 1))) == 7
+
+
+def test_within_threshold_joins_the_cluster():
+    index = NearDuplicateIndex(max_distance=6)
+    base = random.Random(1).getrandbits(64)
+    assert index.assign(base) == (0, True)
+    # Six flips, one in each of six bands: the seventh band still matches exactly.
+    near = flip(base, *(band * index.width for band in range(6)))
+    assert hamming(base, near) == 6
+    assert index.assign(near) == (0, False)
+
+
+def test_over_threshold_starts_a_new_cluster():
+    index = NearDuplicateIndex(max_distance=6)
+    base = random.Random(2).getrandbits(64)
+    index.assign(base)
+    # Seven flips all inside one band share the other six bands but are too far apart.
+    far = flip(base, *range(7))
+    assert hamming(base, far) == 7
+    assert index.find(far) is None
+    assert index.assign(far) == (1, True)
+
+
+def test_no_shared_band_is_never_compared():
+    index = NearDuplicateIndex(max_distance=6)
+    base = random.Random(3).getrandbits(64)
+    index.assign(base)
+    assert index.find(flip(base, *(band * index.width for band in range(7)))) is None
+
+
+def test_near_duplicate_texts_cluster_and_unrelated_ones_do_not():
+    a = "BYD launches the Seal 06 with a new blade battery and 800 km range, priced from 139,800 yuan"
+    b = "BYD launches the Seal 06 with a new blade battery and 800 km range, priced from 139,800 yuan."
+    c = "Smart dimming glass supplier signs a panoramic roof deal with a German premium carmaker"
+    index = NearDuplicateIndex()
+    ids = [index.assign(simhash(t))[0] for t in (a, b, c)]
+    assert ids == [0, 0, 1]
+    assert hamming(simhash(a), simhash(c)) > 6
+
+
+def test_cjk_text_is_fingerprinted_by_bigrams():
+    a = "问界M9本周销量突破一万辆，继续领跑五十万以上豪华车市场"
+    b = "问界M9本周销量突破一万辆，继续领跑五十万以上豪华车市场！"
+    assert simhash(a) != 0 and hamming(simhash(a), simhash(b)) <= 6
@@ -0,0 +1,63 @@
+from nev_weekly import cassette
+from nev_weekly.cache import DiskCache
+from nev_weekly.tavily_client import TavilyWrapper
+
+
+class FakeCache:
+    def __init__(self, fail=False):
+        self.entries = {}
+        self.fail = fail
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        if self.fail:
+            raise OSError("disk full")
+        self.entries[key] = value
+
+
+class LowBudget:
+    def charge(self, priority):
+        pass
+
+    def max_results(self, requested, priority):
+        return 3
+
+
+def wrapper(cache, budget=None):
+    w = TavilyWrapper(cache=cache, budget=budget)
+    w.enabled = True
+    w._search = lambda query, max_results, priority: [{"url": f"u{i}"} for i in range(max_results)]
+    return w
+
+
+def test_reduced_results_are_not_cached_under_the_full_key():
+    cache = FakeCache()
+    items = wrapper(cache, LowBudget()).search("NEV sales", max_results=10)
+    assert len(items) == 3
+    assert set(cache.entries) == {"nev sales|3"}
+    # A later run with budget to spare still asks for the full list.
+    assert len(wrapper(cache).search("NEV sales", max_results=10)) == 10
+
+
+def test_cache_write_failure_keeps_the_results():
+    assert len(wrapper(FakeCache(fail=True)).search("NEV sales", max_results=5)) == 5
+
+
+def test_recording_with_a_warm_cache_still_replays(tmp_path):
+    cache = DiskCache(tmp_path / "cache.sqlite", namespace="tavily")
+    cache.set("nev sales|5", [{"url": "stale"}])
+    live = [{"title": "t", "content": "c", "url": "live"}]
+
+    previous = cassette.use(cassette.Cassette(cassette.RECORD, tmp_path / "cassettes"))
+    try:
+        w = TavilyWrapper(cache=cache)
+        w.enabled = True
+        w._live_search = lambda query, max_results: live
+        assert w.search("NEV sales", max_results=5) == live
+
+        cassette.use(cassette.Cassette(cassette.REPLAY, tmp_path / "cassettes"))
+        assert TavilyWrapper(cache=DiskCache(tmp_path / "other.sqlite")).search("NEV sales", max_results=5) == live
+    finally:
+        cassette.use(previous)